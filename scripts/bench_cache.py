@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Benchmarks for :func:`ptools.utils.cache.disk_cache` storage.
+
+Each case compares the previous storage - one JSON file per function,
+loaded whole on first access and rewritten whole on flush - with
+:class:`~ptools.utils.cache.CacheStore`. Cases run once per cache size:
+
+.. code-block:: bash
+
+    python scripts/bench_cache.py                       # 10k, 100k and 1M entries
+    python scripts/bench_cache.py startup update -n 100000
+    python scripts/bench_cache.py populate -n 10000 -n 100000
+
+``startup`` is the first lookup of a run against an existing cache,
+``update`` is one new entry plus the exit flush, ``populate`` fills an
+empty cache (per entry), ``lookup`` is a warm hit on a random key and
+``hot`` a warm hit within a working set that fits the memory tier (per
+lookup). ``key`` times building one cache key and ``stale`` one call
+to an expired entry of a 10 ms function, recomputed inline vs. served
+stale while it revalidates; both ignore ``-n``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+
+LOOKUPS = 10_000
+HOT_KEYS = 200
+
+
+def _timed(fn, n: int = 1) -> float:
+    """Run ``fn`` once and return its wall time per item in microseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _report(name: str, before: float, after: float) -> None:
+    print(f"{name:<24} before {before:12.3f} us/item   after {after:12.3f} us/item   ({before / after:7.1f}x)")
+
+
+def _key(i: int) -> str:
+    return f"{i:032x}"
+
+
+def _entry(i: int) -> tuple[float, int]:
+    return time.time(), i * 4096
+
+
+def _json_save(path: Path, data: dict) -> None:
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    Path(tmp).replace(path)
+
+
+def _json_load(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fill(tmp: Path, n: int):
+    """Write an ``n``-entry cache in both formats; return their paths."""
+    from ptools.utils.cache import CacheStore
+
+    json_path = tmp / "cache.json"
+    _json_save(json_path, {_key(i): {"t": t, "r": r} for i, (t, r) in ((i, _entry(i)) for i in range(n))})
+    store = CacheStore(tmp / "cache.sqlite3")
+    for i in range(n):
+        store.put(_key(i), *_entry(i))
+    store.close()
+    return json_path, store.path
+
+
+def bench_startup(tmp: Path, n: int) -> None:
+    """Load the whole JSON file vs. open the database and read one row."""
+    from ptools.utils.cache import CacheStore
+
+    json_path, db_path = _fill(tmp, n)
+    key = _key(n // 2)
+
+    def before():
+        _json_load(json_path).get(key)
+
+    def after():
+        store = CacheStore(db_path)
+        store.get(key)
+        store.close()
+
+    _report(f"startup (n={n})", _timed(before), _timed(after))
+
+
+def bench_update(tmp: Path, n: int) -> None:
+    """Rewrite the whole JSON file vs. commit one row."""
+    from ptools.utils.cache import CacheStore
+
+    json_path, db_path = _fill(tmp, n)
+    data = _json_load(json_path)
+    store = CacheStore(db_path)
+    store.get(_key(0))
+
+    def before():
+        t, r = _entry(n)
+        data[_key(n)] = {"t": t, "r": r}
+        _json_save(json_path, data)
+
+    def after():
+        store.put(_key(n), *_entry(n))
+        store.flush(max_age=3600)
+
+    _report(f"update (n={n})", _timed(before), _timed(after))
+    store.close()
+
+
+def bench_populate(tmp: Path, n: int) -> None:
+    """Fill a dict and dump it vs. buffered inserts into the database."""
+    from ptools.utils.cache import CacheStore
+
+    def before():
+        data = {}
+        for i in range(n):
+            t, r = _entry(i)
+            data[_key(i)] = {"t": t, "r": r}
+        _json_save(tmp / "populate.json", data)
+
+    def after():
+        store = CacheStore(tmp / "populate.sqlite3")
+        for i in range(n):
+            store.put(_key(i), *_entry(i))
+        store.close()
+
+    _report(f"populate (n={n})", _timed(before, n), _timed(after, n))
+
+
+def bench_lookup(tmp: Path, n: int) -> None:
+    """Warm hits: in-memory dict vs. one indexed row per lookup."""
+    from ptools.utils.cache import CacheStore
+
+    json_path, db_path = _fill(tmp, n)
+    keys = [_key(random.randrange(n)) for _ in range(LOOKUPS)]
+    data = _json_load(json_path)
+    store = CacheStore(db_path)
+    store.get(keys[0])
+
+    def before():
+        for key in keys:
+            data.get(key)
+
+    def after():
+        for key in keys:
+            store.get(key)
+
+    _report(f"lookup (n={n})", _timed(before, LOOKUPS), _timed(after, LOOKUPS))
+    store.close()
+
+
+def bench_hot(tmp: Path, n: int) -> None:
+    """Warm hits on a small working set: database reads vs. the memory tier."""
+    from ptools.utils.cache import CacheStore
+
+    _, db_path = _fill(tmp, n)
+    keys = [_key(random.randrange(HOT_KEYS)) for _ in range(LOOKUPS)]
+    uncached = CacheStore(db_path, memory_entries=0)
+    store = CacheStore(db_path)
+    store.get(keys[0])
+
+    def before():
+        for key in keys:
+            uncached.get(key)
+
+    def after():
+        for key in keys:
+            store.get(key)
+
+    _report(f"hot (n={n})", _timed(before, LOOKUPS), _timed(after, LOOKUPS))
+    uncached.close()
+    store.close()
+
+
+def bench_key(tmp: Path, n: int) -> None:
+    """Key of a ``get_size``-style call: JSON + SHA-256 vs. :func:`structural_key`."""
+    import hashlib
+    from ptools.utils.cache import structural_key
+
+    calls = [((f"/home/user/project/dir{i}",), {"ignore_hidden": True, "disk": False}) for i in range(LOOKUPS)]
+
+    def before():
+        for args, kwargs in calls:
+            key_str = json.dumps({'args': args, 'kwargs': kwargs}, sort_keys=True)
+            hashlib.sha256(key_str.encode()).hexdigest()[:32]
+
+    def after():
+        for args, kwargs in calls:
+            structural_key(args, kwargs)
+
+    _report("key", _timed(before, LOOKUPS), _timed(after, LOOKUPS))
+
+
+def bench_stale(tmp: Path, n: int) -> None:
+    """Expired entry of a slow function: wait for it vs. stale-while-revalidate."""
+    from ptools.utils.cache import disk_cache
+
+    def slow(x):
+        time.sleep(0.01)
+        return x
+
+    inline = disk_cache(cache_dir=tmp / "inline", max_cache_age=0.001)(slow)
+    stale = disk_cache(cache_dir=tmp / "stale", max_cache_age=0.001, stale_while_revalidate=3600)(slow)
+    inline(1), stale(1)
+    time.sleep(0.01)
+
+    _report("stale", _timed(lambda: inline(1)), _timed(lambda: stale(1)))
+    time.sleep(0.05)
+
+
+BENCHMARKS = {
+    'startup': bench_startup,
+    'update': bench_update,
+    'populate': bench_populate,
+    'lookup': bench_lookup,
+    'hot': bench_hot,
+    'key': bench_key,
+    'stale': bench_stale,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "cases",
+        nargs="*",
+        help=f"Benchmarks to run (default: all). One of: {', '.join(BENCHMARKS)}.",
+    )
+    parser.add_argument(
+        "-n",
+        "--items",
+        type=int,
+        action="append",
+        default=None,
+        help="Cache size in entries; repeat for several (default: 10k, 100k and 1M).",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    sys.path.insert(0, str(SRC_DIR))
+
+    for n in args.items or [10_000, 100_000, 1_000_000]:
+        for name in args.cases or BENCHMARKS:
+            tmp = Path(tempfile.mkdtemp(prefix="ptools-bench-cache-"))
+            try:
+                BENCHMARKS[name](tmp, n)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the :command:`ptools flow` evaluation pipeline.
+
+Each case times an old and a new code path over the same synthetic
+input and prints the per-item cost of both, so regressions (or wins)
+are visible without running the full CLI:
+
+.. code-block:: bash
+
+    python scripts/bench_flow.py            # every case
+    python scripts/bench_flow.py eval -n 200000
+    python scripts/bench_flow.py parse -n 1000000
+    python scripts/bench_flow.py jsonl -n 20000
+    python scripts/bench_flow.py scope
+    python scripts/bench_flow.py import
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+
+
+def _timed(fn, n: int) -> float:
+    """Run ``fn`` once and return its wall time per item in microseconds."""
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _report(name: str, before: float, after: float) -> None:
+    print(f"{name:<24} before {before:8.3f} us/item   after {after:8.3f} us/item   ({before / after:5.1f}x)")
+
+
+def bench_eval(n: int) -> None:
+    """Raw-source :func:`eval` vs. a cached code object per item."""
+    from ptools.lib.flow.compiler import compile_expression
+    from ptools.lib.flow.utils import create_global_scope
+
+    globals = create_global_scope()
+    expression = "x * 2 + 1 if x % 3 else sqrt(x)"
+    scopes = [{'x': i, 'i': 0, 'arr': [i]} for i in range(n)]
+
+    def before():
+        for scope in scopes:
+            eval(expression, globals, scope)
+
+    def after():
+        code = compile_expression(expression)
+        for scope in scopes:
+            eval(code, globals, scope)
+
+    _report("eval", _timed(before, n), _timed(after, n))
+
+
+def bench_parse(n: int) -> None:
+    """Earley-only :class:`StreamValue` parsing vs. the tiered fast path."""
+    import random
+    from ptools.lib.flow.grammar import StreamTransformer, parse_value, parser
+
+    samples = [
+        "42", "-7", "3.14", "1e3", "true", "null", "hello", "GET /index.html",
+        '"quoted"', '[1, 2, 3]', '{"user": "ada", "age": 36, "tags": ["a", "b"]}',
+        "(1, 2)", "{1, 2}",
+    ]
+    random.seed(0)
+    lines = [random.choice(samples) for _ in range(n)]
+
+    def before():
+        for line in lines:
+            StreamTransformer().transform(parser.parse(line))
+
+    def after():
+        for line in lines:
+            parse_value(line)
+
+    _report("parse", _timed(before, n), _timed(after, n))
+
+
+def bench_jsonl(n: int) -> None:
+    """Python-like parsing vs. ``--input-flavor json`` on NDJSON log lines."""
+    import json
+    import random
+    from ptools.lib.flow.grammar import parse_json, parse_value
+
+    random.seed(0)
+    lines = [
+        json.dumps({
+            'ts': i,
+            'level': random.choice(['info', 'warn', 'error']),
+            'latency': random.random(),
+            # Escapes push python-like parsing off the fast path.
+            'msg': random.choice(['ok', 'GET /a\\b', 'said "hi"']),
+        })
+        for i in range(n)
+    ]
+
+    def before():
+        for line in lines:
+            parse_value(line)
+
+    def after():
+        for line in lines:
+            parse_json(line)
+
+    _report("jsonl", _timed(before, n), _timed(after, n))
+
+
+def bench_scope(n: int) -> None:
+    """Fresh scope dicts merged with ``vars`` vs. one reused :class:`Scope`."""
+    from ptools.lib.flow.compiler import compile_expression
+    from ptools.lib.flow.utils import Scope
+
+    code = compile_expression("acc + x * i")
+    values = [list(range(100)) for _ in range(max(1, n // 100))]
+    items = len(values) * 100
+    vars = {'acc': 1}
+
+    def scopes(value):
+        for i, v in enumerate(value):
+            yield {'x': v, 'i': i, 'arr': value}
+
+    def before():
+        for value in values:
+            for scope in scopes(value):
+                scope = {**scope, **vars}
+                eval(code, {}, scope)
+
+    def after():
+        scope = Scope(vars)
+        for value in values:
+            for locals in scope.bind(value):
+                eval(code, {}, locals)
+
+    _report("scope", _timed(before, items), _timed(after, items))
+
+
+def bench_import(n: int) -> None:
+    """Eager imports (what every invocation used to pay) vs. lazy ones.
+
+    Each side runs in a fresh interpreter; ``n`` is ignored beyond picking
+    the best of a few runs. For a per-module breakdown use
+    ``python -X importtime -c "import ptools.flow"``.
+    """
+    import subprocess
+
+    eager = (
+        "import ptools.flow as f; import ptools.lib.flow.vectorize, ptools.lib.flow.parallel, ptools.utils.print;"
+        "import ptools.lib.flow.grammar as g; g.parser; g.lalr_parser;"
+        "[f.globals[m] for m in f.globals.loaders]"
+    )
+    lazy = "import ptools.flow"
+
+    def best(code):
+        runs = []
+        for _ in range(5):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True, env={"PYTHONPATH": str(SRC_DIR)})
+            runs.append(time.perf_counter() - start)
+        return min(runs) * 1e3
+
+    before, after = best(eager), best(lazy)
+    print(f"{'import':<24} before {before:8.1f} ms         after {after:8.1f} ms         ({before / after:5.1f}x)")
+
+
+BENCHMARKS = {
+    'eval': bench_eval,
+    'parse': bench_parse,
+    'jsonl': bench_jsonl,
+    'scope': bench_scope,
+    'import': bench_import,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "cases",
+        nargs="*",
+        help=f"Benchmarks to run (default: all). One of: {', '.join(BENCHMARKS)}.",
+    )
+    parser.add_argument(
+        "-n",
+        "--items",
+        type=int,
+        default=100_000,
+        help="Number of synthetic items per benchmark.",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    sys.path.insert(0, str(SRC_DIR))
+
+    for name in args.cases or BENCHMARKS:
+        BENCHMARKS[name](args.items)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Benchmarks for the :command:`ptools fs` directory walkers.
+
+Cases run against a synthetic tree of ``-n`` empty files (100 per
+directory, directories nested 100 wide). Building a large tree takes a
+while, so ``--root`` keeps it around for later runs:
+
+.. code-block:: bash
+
+    python scripts/bench_fs.py                          # 1M files, temp dir
+    python scripts/bench_fs.py scan -n 100000
+    python scripts/bench_fs.py sizes -n 100000
+    python scripts/bench_fs.py index -n 100000
+    python scripts/bench_fs.py scan --root /tmp/bench-tree -w 16
+
+Timings depend heavily on whether directory entries are in the page
+cache. Cases start warm by default; ``--cold`` drops the kernel caches
+before each timed run (Linux, root only), which is where parallel
+listing pays off. On a warm cache and few cores, thread hand-off costs
+more than it saves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+
+FILES_PER_DIR = 100
+DIRS_PER_DIR = 100
+
+
+COLD = False
+
+
+def _drop_caches() -> None:
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+
+def _timed(fn, n: int) -> float:
+    """Run ``fn`` once and return its wall time per item in microseconds."""
+    if COLD:
+        _drop_caches()
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def _report(name: str, before: float, after: float) -> None:
+    print(f"{name:<24} before {before:8.3f} us/item   after {after:8.3f} us/item   ({before / after:5.1f}x)")
+
+
+def build_tree(root: Path, n: int) -> None:
+    """Create ``n`` empty files under ``root`` unless a previous run did."""
+    marker = root / f".bench-{n}"
+    if marker.exists():
+        return
+    for i in range(0, n, FILES_PER_DIR):
+        d = i // FILES_PER_DIR
+        directory = root / f"d{d // DIRS_PER_DIR:04d}" / f"d{d % DIRS_PER_DIR:02d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        for j in range(min(FILES_PER_DIR, n - i)):
+            (directory / f"f{j:03d}.txt").touch()
+    marker.touch()
+
+
+def _count(node) -> int:
+    total = 0
+    for entry in node.entries:
+        child = node.child(entry)
+        total += 1 + (_count(child) if child is not None else 0)
+    return total
+
+
+def bench_scan(root: Path, n: int, workers: int) -> None:
+    """:class:`Scanner` on the calling thread vs. on a thread pool."""
+    from ptools.lib.fs.scanner import Scanner
+
+    def before():
+        with Scanner(1) as scanner:
+            _count(scanner.scan(str(root), 64))
+
+    def after():
+        with Scanner(workers) as scanner:
+            _count(scanner.scan(str(root), 64))
+
+    before()
+    _report(f"scan (workers={workers})", _timed(before, n), _timed(after, n))
+
+
+def bench_sizes(root: Path, n: int, workers: int) -> None:
+    """Per-level recursive ``get_size`` (uncached) vs. one :func:`size_tree` pass."""
+    from ptools.lib.fs.sizes import size_tree
+
+    max_depth = 3
+
+    def get_size(path):
+        total = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    total += get_size(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total += entry.stat().st_size
+        return total
+
+    def build(path, depth):
+        size = get_size(path)
+        if depth > 0:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        build(entry.path, depth - 1)
+                    else:
+                        entry.stat()
+        return size
+
+    def before():
+        build(root, max_depth)
+
+    def after():
+        size_tree(str(root), max_depth, workers=workers)
+
+    _report("sizes", _timed(before, n), _timed(after, n))
+
+
+def bench_index(root: Path, n: int, workers: int) -> None:
+    """Full :func:`size_tree` walk vs. a rerun validated by :class:`SizeIndex`."""
+    from ptools.lib.fs.sizes import SizeIndex, size_tree
+
+    past = time.time() - 60
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (past, past))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SizeIndex(os.path.join(tmp, "index.json"))
+        size_tree(str(root), 1, workers=workers, index=index)
+        index.save()
+
+        def before():
+            size_tree(str(root), 1, workers=workers)
+
+        def after():
+            warm = SizeIndex(index.path)
+            size_tree(str(root), 1, workers=workers, index=warm)
+            warm.save()
+
+        _report("index", _timed(before, n), _timed(after, n))
+
+
+BENCHMARKS = {
+    'scan': bench_scan,
+    'sizes': bench_sizes,
+    'index': bench_index,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "cases",
+        nargs="*",
+        help=f"Benchmarks to run (default: all). One of: {', '.join(BENCHMARKS)}.",
+    )
+    parser.add_argument(
+        "-n",
+        "--items",
+        type=int,
+        default=1_000_000,
+        help="Number of files in the synthetic tree.",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=None,
+        help="Build (or reuse) the tree here instead of a temporary directory.",
+    )
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Drop the page, dentry and inode caches before each timed run.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=8,
+        help="Scanner threads for the parallel side of each case.",
+    )
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    sys.path.insert(0, str(SRC_DIR))
+    global COLD
+    COLD = args.cold
+
+    root = args.root or Path(tempfile.mkdtemp(prefix="ptools-bench-fs-"))
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        build_tree(root, args.items)
+        for name in args.cases or BENCHMARKS:
+            BENCHMARKS[name](root, args.items, args.workers)
+    finally:
+        if args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
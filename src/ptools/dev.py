@@ -3,7 +3,8 @@
 The :command:`ptools dev` subcommands wrap the chores you'd otherwise
 run by hand from the repo root - (re)installing the tool, opening it in
 an editor, building the Sphinx docs, regenerating the full requirements
-file, and running the test suite.
+file, running the test suite, and reporting on the ``disk_cache``
+stores (:command:`ptools dev cache-stats`).
 """
 
 import os
@@ -198,4 +199,72 @@ def test(ctx, keyword, verbose, exitfirst):
 
     rc = _run(cmd)
     if rc != 0:
-        raise click.ClickException(f"pytest exited with status {rc}")
\ No newline at end of file
+        raise click.ClickException(f"pytest exited with status {rc}")
+
+@cli.command(name="cache-stats")
+@click.option(
+    '--cache-dir', type=click.Path(file_okay=False), default=None,
+    help="Directory holding the disk caches (default: ~/.ptools/.cache).",
+)
+# Not output_flavor: importing the flow decorators loads lark and the value grammar.
+@click.option('--flavor', '-fv', default='plain', help="Output format flavor: plain, json, jsonl, python, ...")
+def cache_stats(cache_dir, flavor):
+    """Show size and hit/miss/eviction counters of each ``disk_cache``.
+
+    Counters accumulate across runs; they are written when a cache
+    flushes, so the current process's activity shows up after it exits.
+    Caches are opened read-only; one written by a ptools version with a
+    different schema, or a file that is not a cache database, is
+    reported, not touched.
+    """
+    import sqlite3
+    from pathlib import Path
+    import humanize
+    from ptools.lib.flow.values import OutputFlavorKind, OutputValue
+    from ptools.utils.cache import DEFAULT_CACHE_DIR, CacheStore, CacheVersionError
+
+    try:
+        flavor = OutputFlavorKind[flavor]
+    except KeyError:
+        choices = ", ".join(kind.name for kind in OutputFlavorKind)
+        raise click.BadParameter(f"{flavor!r} is not one of {choices}", param_hint="'--flavor'")
+
+    directory = Path(os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR))
+    rows = []
+    for path in sorted(directory.glob("*.sqlite3")):
+        store = CacheStore(path, read_only=True)
+        try:
+            stats = store.stats()
+        except CacheVersionError as e:
+            rows.append({"cache": path.stem, "error": f"schema version {e.version}, expected {e.expected}"})
+            continue
+        except sqlite3.DatabaseError as e:
+            rows.append({"cache": path.stem, "error": f"unreadable: {e}"})
+            continue
+        finally:
+            store.close()
+        lookups = stats["hits"] + stats["misses"]
+        rows.append({
+            "cache": path.stem,
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+        })
+
+    if flavor != OutputFlavorKind.plain:
+        click.echo(OutputValue(flavor=flavor).format(rows))
+        return
+    if not rows:
+        click.echo(f"No caches in {directory}")
+        return
+
+    header = f"{'cache':<24} {'entries':>9} {'size':>10} {'hits':>9} {'misses':>9} {'hit rate':>8} {'stale':>9} {'evictions':>9}"
+    click.echo(click.style(header, bold=True))
+    for row in rows:
+        if "error" in row:
+            click.echo(f"{row['cache']:<24} {click.style(row['error'], fg='yellow')}")
+            continue
+        rate = f"{row['hit_rate']:.1%}" if row["hit_rate"] is not None else "-"
+        click.echo(
+            f"{row['cache']:<24} {row['entries']:>9} {humanize.naturalsize(row['bytes']):>10} "
+            f"{row['hits']:>9} {row['misses']:>9} {rate:>8} {row['stale']:>9} {row['evictions']:>9}"
+        )
@@ -7,19 +7,28 @@ requested output flavor (JSON, YAML, raw Python, etc.).
 
 The module defines the top-level CLI subcommands - :command:`map`,
 :command:`filter`, :command:`reduce`, :command:`group`, :command:`unique`,
-:command:`foreach`, :command:`while`, :command:`exec`, :command:`range`,
+:command:`foreach`, :command:`window`, :command:`agg`, :command:`pipe`, :command:`while`, :command:`exec`, :command:`range`,
 :command:`json`, and :command:`dict` - all of which share a common
 expression-evaluation pipeline and output formatting layer.
 """
 
+import sys
+
 import click
 
-from ptools.lib.flow.values import StreamValue, OutputValue
+from ptools.lib.flow.values import StreamValue, OutputValue, OutputStream
 from ptools.lib.flow.runner import FlowRunner
+from ptools.lib.flow.compiler import compile_expression
 from ptools.lib.flow.decorators import (
     output_flavor,
+    stream_output,
+    parallel_options,
+    vectorize_options,
+    memory_budget,
+    aggregate_options,
     debug_scope,
     flow_expression,
+    flow_pipe_input,
 )
 from ptools.lib.flow.utils import stream, create_global_scope
 
@@ -65,12 +74,33 @@ def dict(flavor, multiline):
 @click.command()
 @flow_expression.decorate()
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def map(expression, flavor, debug):
+@stream_output.decorate()
+@parallel_options.decorate()
+@vectorize_options.decorate()
+def map(expression, flavor, debug, multiline, input_flavor, stream, jobs, chunk_size, ordered, vectorize, block_size):
     """Apply a Python expression to each streamed input line."""
+    runs = Runner.run(
+        expression,
+        debug=debug,
+        jobs=jobs,
+        chunk_size=chunk_size,
+        ordered=ordered,
+        vectorize=vectorize,
+        block_size=block_size,
+        input_flavor=input_flavor,
+        multiline=multiline,
+    )
+    if stream:
+        with OutputStream(flavor=flavor) as out:
+            for result, _ in runs:
+                out.write(result)
+        return
+
     output = OutputValue(flavor=flavor)
     results = []
-    for result, _ in Runner.run(expression, debug=debug):
+    for result, _ in runs:
         results.append(result)
     click.echo(output.format(results))
 
@@ -88,12 +118,34 @@ def frange(start, end, step, flavor):
 @click.command()
 @flow_expression.decorate()
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def filter(expression, flavor, debug):
+@stream_output.decorate()
+@parallel_options.decorate()
+@vectorize_options.decorate()
+def filter(expression, flavor, debug, multiline, input_flavor, stream, jobs, chunk_size, ordered, vectorize, block_size):
     """Filter streamed input lines based on a Python expression."""
+    runs = Runner.run(
+        expression,
+        debug=debug,
+        jobs=jobs,
+        chunk_size=chunk_size,
+        ordered=ordered,
+        vectorize=vectorize,
+        block_size=block_size,
+        input_flavor=input_flavor,
+        multiline=multiline,
+    )
+    if stream:
+        with OutputStream(flavor=flavor) as out:
+            for result, fv in runs:
+                if result:
+                    out.write(fv.value)
+        return
+
     output = OutputValue(flavor=flavor)
     results = []
-    for result, fv in Runner.run(expression, debug=debug):
+    for result, fv in runs:
         if result:
             results.append(fv.value)
     click.echo(output.format(results))
@@ -102,15 +154,28 @@ def filter(expression, flavor, debug):
 @flow_expression.decorate()
 @click.option('--accumulator', '-a', default=None, help='Initial value for the accumulator.')
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def reduce(expression, accumulator, flavor, debug):
+@vectorize_options.decorate()
+def reduce(expression, accumulator, flavor, debug, multiline, input_flavor, vectorize, block_size):
     """Reduce streamed input lines based on a Python expression."""
     accumulator = StreamValue(accumulator).value if accumulator is not None else None
     output = OutputValue(flavor=flavor)
 
-    for result, _ in \
-        Runner.run(expression, debug=debug, vars={'acc': accumulator}):
-        accumulator = result
+    # The runner reads ``acc`` from this dict for every item, so it has to
+    # be updated in place as the fold advances.
+    vars = {'acc': accumulator}
+    runs = Runner.run(
+        expression,
+        debug=debug,
+        vars=vars,
+        vectorize=vectorize,
+        block_size=block_size,
+        input_flavor=input_flavor,
+        multiline=multiline,
+    )
+    for result, _ in runs:
+        accumulator = vars['acc'] = result
 
     click.echo(f"{output.format(accumulator)}")
 
@@ -120,7 +185,7 @@ def reduce(expression, accumulator, flavor, debug):
 def exec(expression, flavor):
     """Execute a Python expression with access to the global scope."""
     try:
-        result = eval(expression, globals)
+        result = eval(compile_expression(expression), globals)
         click.echo(f"{OutputValue(flavor=flavor).format(result)}")
     except Exception as e:
         click.echo(f"Error: {e}")
@@ -128,17 +193,61 @@ def exec(expression, flavor):
 @click.command()
 @flow_expression.decorate()
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def unique(expression, flavor, debug):
-    """Yield unique items from the stream based on a Python expression."""
-    seen = set()
+@stream_output.decorate()
+@memory_budget.decorate()
+@click.option('--approximate', is_flag=True, default=False, help='Track seen keys in a Bloom filter (constant memory, may drop a few unique items).')
+@click.option('--error-rate', type=click.FloatRange(0, 1, min_open=True, max_open=True), default=0.001, help='False-positive rate for --approximate.')
+def unique(expression, flavor, debug, multiline, input_flavor, stream, max_memory, approximate, error_rate):
+    """Yield unique items from the stream based on a Python expression.
+
+    With --max-memory, seen keys beyond the budget spill to temporary
+    files and the list is written as it is produced. With --approximate, keys are tracked in
+    a Bloom filter; a false positive drops a unique item, never duplicates.
+    """
+    spill = None
+    if approximate:
+        from ptools.utils.bloom import ScalableBloomFilter
+        bloom = ScalableBloomFilter(error_rate=error_rate)
+        is_new = lambda key, value: bloom.add(key)
+    elif max_memory is not None:
+        from ptools.lib.flow.spill import SpillingUnique
+        spill = SpillingUnique(max_memory)
+        is_new = spill.offer
+    else:
+        seen = set()
+        def is_new(key, value):
+            if key in seen:
+                return False
+            seen.add(key)
+            return True
+
+    if stream or spill is not None:
+        def unique_values():
+            for key, fv in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+                if is_new(key, fv.value):
+                    yield fv.value
+            if spill is not None:
+                yield from spill.remaining()
+
+        try:
+            with OutputStream(flavor=flavor) as out:
+                if stream:
+                    for value in unique_values():
+                        out.write(value)
+                else:
+                    out.write_elements(unique_values())
+        finally:
+            if spill is not None:
+                spill.close()
+        return
+
     output = OutputValue(flavor=flavor)
     results = []
 
-    for result, fv in Runner.run(expression, debug=debug):
-        key = result
-        if key not in seen:
-            seen.add(key)
+    for key, fv in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+        if is_new(key, fv.value):
             results.append(fv.value)
 
     click.echo(output.format(results))
@@ -146,31 +255,170 @@ def unique(expression, flavor, debug):
 @click.command()
 @flow_expression.decorate()
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def group(expression, flavor, debug):
-    """Group items from the stream based on a Python expression."""
+@memory_budget.decorate()
+def group(expression, flavor, debug, multiline, input_flavor, max_memory):
+    """Group items from the stream based on a Python expression.
+
+    With --max-memory, groups beyond the budget spill to temporary files
+    and are merged at the end; each group is then written as it is merged,
+    producing the same output as the in-memory path.
+    """
+    if max_memory is not None:
+        from ptools.lib.flow.spill import SpillingGroups
+        with SpillingGroups(max_memory) as groups, OutputStream(flavor=flavor) as out:
+            for key, fv in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+                groups.add(key, fv.value)
+            out.write_entries(groups)
+        return
+
     from collections import defaultdict
     groups = defaultdict(list)
 
-    for result, fv in Runner.run(expression, debug=debug):
+    for result, fv in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
         key = result
         groups[key].append(fv.value)
 
-    click.echo(OutputValue(flavor=flavor).format(dict(groups)))
+    # ``dict`` is shadowed by the command of the same name in this module.
+    click.echo(OutputValue(flavor=flavor).format({**groups}))
 
 @click.command()
 @flow_expression.decorate()
 @debug_scope.decorate()
+@flow_pipe_input.decorate()
 @output_flavor.decorate()
-def foreach(expression, flavor, debug):
+def foreach(expression, flavor, debug, multiline, input_flavor):
     """Foreach loop over items generated from each streamed input line."""
-    output = OutputValue(flavor=flavor)
+    with OutputStream(flavor=flavor) as out:
+        for result, _ in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+            if result is not None \
+                and not (isinstance(result, list) and len(result) == 0) \
+                and not (isinstance(result, str) and result.strip() == ''):
+                out.echo(out.format(result))
 
-    for result, _ in Runner.run(expression, debug=debug):
-        if result is not None \
-            and not (isinstance(result, list) and len(result) == 0) \
-            and not (isinstance(result, str) and result.strip() == ''):
-            click.echo(f"{output.format(result)}")
+DEFAULT_AGGREGATORS = ('count', 'mean', 'min', 'max')
+
+def _window_length(value, by_time, name):
+    from ptools.utils.read import FromHumanized
+    try:
+        if by_time:
+            length = FromHumanized.from_humanized_duration(value)
+        else:
+            length = int(value)
+    except ValueError:
+        unit = 'a duration (e.g. 30s, 5m)' if by_time else 'an item count'
+        raise click.BadParameter(f"expected {unit}, got {value!r}", param_hint=name)
+    if length <= 0:
+        raise click.BadParameter("must be positive", param_hint=name)
+    return length
+
+@click.command()
+@flow_expression.decorate()
+@click.option('--size', '-n', required=True, help='Window length: an item count, or a duration (e.g. 5m) with --time.')
+@click.option('--slide', '-s', default=None, help='Distance between window starts (default: --size, i.e. tumbling windows).')
+@click.option('--time', '-t', 'time_expression', default=None, help="Python expression giving each item's timestamp (number, datetime or ISO string).")
+@aggregate_options.decorate()
+@debug_scope.decorate()
+@flow_pipe_input.decorate()
+@output_flavor.decorate()
+def window(expression, size, slide, time_expression, aggregators, top_k, flavor, debug, multiline, input_flavor):
+    """Aggregate an expression over tumbling or sliding windows.
+
+    Windows are counted in items, or in time when --time is given. Each
+    window is written as soon as it closes.
+    """
+    from ptools.lib.flow.windows import CountWindows, TimeWindows
+    by_time = time_expression is not None
+    size = _window_length(size, by_time, '--size')
+    slide = _window_length(slide, by_time, '--slide') if slide is not None else size
+    aggregators = aggregators or DEFAULT_AGGREGATORS
+
+    if by_time:
+        time_windows = windows = TimeWindows(size, slide, aggregators, top_k)
+        push = lambda result: time_windows.push(*result)
+        expression = f"(({expression}), ({time_expression}))"
+    else:
+        windows = CountWindows(int(size), int(slide), aggregators, top_k)
+        push = windows.push
+
+    with OutputStream(flavor=flavor) as out:
+        for result, _ in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+            try:
+                for closed in push(result):
+                    out.write(closed)
+            except (TypeError, ValueError) as e:
+                sys.stderr.write(f"Error: {e}\n")
+        for closed in windows.close():
+            out.write(closed)
+
+@click.command()
+@flow_expression.decorate()
+@click.option('--every', type=click.IntRange(min=1), default=None, help='Also write the running aggregates every N items.')
+@aggregate_options.decorate()
+@debug_scope.decorate()
+@flow_pipe_input.decorate()
+@output_flavor.decorate()
+def agg(expression, every, aggregators, top_k, flavor, debug, multiline, input_flavor):
+    """Aggregate an expression over the whole stream in constant memory."""
+    from ptools.lib.flow.aggregators import AggregatorSet
+    aggs = AggregatorSet(aggregators or DEFAULT_AGGREGATORS, top_k)
+    seen = 0
+    with OutputStream(flavor=flavor) as out:
+        for result, _ in Runner.run(expression, debug=debug, input_flavor=input_flavor, multiline=multiline):
+            try:
+                aggs.add(result)
+            except TypeError as e:
+                sys.stderr.write(f"Error: {e}\n")
+                continue
+            seen += 1
+            if every and seen % every == 0:
+                out.write(aggs.result())
+        if not every or seen % every:
+            out.write(aggs.result())
+
+@click.command(context_settings={'ignore_unknown_options': True})
+@click.argument('stages', type=str, required=True, nargs=-1)
+@debug_scope.decorate()
+@flow_pipe_input.decorate()
+@output_flavor.decorate()
+@stream_output.decorate()
+def pipe(stages, debug, multiline, input_flavor, flavor, stream):
+    """Run several stages in one process, e.g. filter 'x>0' :: map 'x*2'.
+
+    Stages are map, filter, foreach, unique, group and reduce (which
+    takes -a VALUE for the initial accumulator), separated by standalone
+    :: arguments. Values pass between stages as Python objects. With
+    --debug, per-stage item counters are written to stderr.
+    """
+    from ptools.lib.flow.pipeline import Pipeline
+    # ``stream`` is the --stream flag here.
+    from ptools.lib.flow.utils import stream as read_values
+    try:
+        pipeline = Pipeline.parse(stages, globals)
+    except (ValueError, SyntaxError) as e:
+        raise click.UsageError(str(e))
+
+    values = (fv.value if fv is not None else None for fv in read_values(input_flavor, multiline))
+    results = pipeline.run(values)
+
+    if stream:
+        with OutputStream(flavor=flavor) as out:
+            for result in results:
+                out.write(result)
+    else:
+        results = list(results)
+        output = OutputValue(flavor=flavor)
+        click.echo(output.format(results[0] if pipeline.collects else results))
+
+    if debug:
+        from ptools.utils.print import fdebug
+        for i, stage in enumerate(pipeline.stages, 1):
+            sys.stderr.write(fdebug(
+                f"Stage {i}: {stage.name}",
+                expression=stage.expression,
+                **stage.counts) + "\n",
+            )
 
 @click.command()
 @flow_expression.decorate()
@@ -180,7 +428,8 @@ def foreach(expression, flavor, debug):
 @click.option('--output-last/--output-all', is_flag=True, default=True, help='Output only the final result after the loop ends.')
 @output_flavor.decorate()
 @debug_scope.decorate()
-def while_loop(expression, initial, condition, update_on_none, flavor, debug, output_last):
+@flow_pipe_input.decorate()
+def while_loop(expression, initial, condition, update_on_none, flavor, debug, multiline, input_flavor, output_last):
     """While loop executing a Python expression as long as the condition is true."""
     output = OutputValue(flavor=flavor)
 
@@ -189,7 +438,9 @@ def while_loop(expression, initial, condition, update_on_none, flavor, debug, ou
                          initial=initial,
                          condition=condition,
                          update_on_none=update_on_none,
-                         debug=debug):
+                         debug=debug,
+                         input_flavor=input_flavor,
+                         multiline=multiline):
         if not output_last or is_last:
             click.echo(f"{output.format(result)}")
 
@@ -203,6 +454,9 @@ cli.add_command(unique, name='unique')
 cli.add_command(group, name='group')
 cli.add_command(exec, name='exec')
 cli.add_command(foreach, name='foreach')
+cli.add_command(window, name='window')
+cli.add_command(agg, name='agg')
+cli.add_command(pipe, name='pipe')
 cli.add_command(while_loop, name='while')
 cli.add_command(json, name='json')
 cli.add_command(dict, name='dict')
\ No newline at end of file
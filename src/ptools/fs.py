@@ -1,7 +1,25 @@
+import re
+
 import click
 import humanize
 
-from ptools.lib.flow.decorators import output_flavor
+from ptools.lib.flow.decorators import output_flavor, stream_output
+from ptools.utils.decorator_compistor import DecoratorCompositor
+
+path_filters = DecoratorCompositor.from_list([
+    click.option('--include', multiple=True, help="Only list files matching this glob (repeatable)."),
+    click.option('--exclude', '-x', multiple=True, help="Skip files and prune directories matching this gitignore-style glob (repeatable)."),
+    click.option('--gitignore/--no-gitignore', default=False, help="Also skip paths ignored by .gitignore files."),
+])
+
+result_limits = DecoratorCompositor.from_list([
+    click.option('--limit', '-n', type=click.IntRange(min=1), default=None, help="Stop the walk after this many results."),
+    click.option('--first', is_flag=True, default=False, help="Stop at the first result (same as --limit 1)."),
+])
+
+scan_options = DecoratorCompositor.from_list([
+    click.option('--workers', '-w', type=click.IntRange(min=0), default=1, help="Threads listing directories in parallel (0 = auto). Output order does not depend on it."),
+])
 
 @click.group()
 def cli():
@@ -35,6 +53,10 @@ def info(path):
 @click.option('--symlinks/--no-symlinks', '-s/-S', is_flag=True, default=False)
 @click.option('--regex', '-g', is_flag=True, default=False, help="Use regex for filtering")
 @click.option('--ignore-hidden', is_flag=True, default=True, help="Ignore hidden files and directories")
+@path_filters.decorate()
+@scan_options.decorate()
+@result_limits.decorate()
+@stream_output.decorate()
 @output_flavor.decorate()
 def walkdir(
     path: str,
@@ -46,10 +68,26 @@ def walkdir(
     query: str,
     regex: bool,
     flavor,
+    include=(),
+    exclude=(),
+    gitignore=False,
+    workers=1,
+    limit=None,
+    first=False,
+    stream=False,
 ):
-    """Recursively list files and directories."""
+    """Recursively list files and directories.
+
+    --exclude patterns (and .gitignore files with --gitignore) prune whole
+    directories before they are scanned; --include selects files.
+    --stream writes each entry as it is found, and --limit/--first stop
+    the walk once enough entries were produced.
+    """
     import os
-    from ptools.lib.flow.values import OutputValue
+    from itertools import islice
+    from ptools.lib.flow.values import OutputStream, OutputValue
+    from ptools.lib.fs.ignore import IgnoreRules, PathFilter
+    from ptools.lib.fs.scanner import Scanner
     from ptools.utils.re import test
 
 
@@ -59,35 +97,54 @@ def walkdir(
         children: List[Result] (if dir)
     }
     """
-    result = []
 
-    test_file = test(query, regex) if query else lambda x: True
-
-    def _walk(current_path, depth):
-        if depth < 0:
-            return
-        try:
-            with os.scandir(current_path) as it:
-                for entry in it:
-
-                    if ignore_hidden and entry.name.startswith('.'):
-                        continue
-
-                    if entry.is_symlink():
-                        if not symlinks:
-                            continue
-
-                    if entry.is_dir():
-                        if not no_dirs:
-                            result.append({ 'kind': 'dir', 'name': entry.name, 'path': entry.path })
-                        _walk(entry.path, depth - 1)
-                    elif entry.is_file():
-                        if test_file(entry.path):
-                            if not no_files:
-                                dirpath = os.path.dirname(entry.path)
-                                result.append({ 'kind': 'file', 'name': entry.name, 'path': entry.path, 'dirpath': dirpath })
-        except PermissionError:
-            return
+    try:
+        test_file = test(query, regex) if query else lambda x: True
+    except re.error as e:
+        raise click.BadParameter(f"invalid regex: {e}", param_hint='QUERY')
+    path_filter = PathFilter(include, exclude, gitignore)
+
+    def _visible(entry):
+        if ignore_hidden and entry.name.startswith('.'):
+            return False
+        return symlinks or not entry.is_symlink()
+
+    # Both hooks run on scanner threads; they only read shared state.
+    def _descend(entry, relpath, rules):
+        return _visible(entry) \
+            and not (path_filter and path_filter.excluded(rules, relpath, True))
+
+    def _enter(node, rules):
+        if path_filter:
+            return path_filter.enter(rules, node.path, node.relpath, [entry.name for entry in node.entries])
+        return rules
+
+    def _walk(node):
+        base, rules = node.relpath, node.context
+
+        for entry in node.entries:
+
+            if not _visible(entry):
+                continue
+
+            relpath = f"{base}/{entry.name}" if base else entry.name
+
+            if entry.is_dir():
+                if path_filter and path_filter.excluded(rules, relpath, True):
+                    continue
+                if not no_dirs:
+                    yield { 'kind': 'dir', 'name': entry.name, 'path': entry.path }
+                child = node.child(entry)
+                if child is not None:
+                    yield from _walk(child)
+            elif entry.is_file():
+                if path_filter and (path_filter.excluded(rules, relpath, False)
+                                    or not path_filter.included(relpath)):
+                    continue
+                if test_file(entry.path):
+                    if not no_files:
+                        dirpath = os.path.dirname(entry.path)
+                        yield { 'kind': 'file', 'name': entry.name, 'path': entry.path, 'dirpath': dirpath }
 
     path = os.path.abspath(path)
     max_depth = max_depth if max_depth is not None else 3
@@ -95,9 +152,20 @@ def walkdir(
     no_dirs = no_dirs
     symlinks = symlinks
 
-    _walk(path, max_depth)
+    limit = 1 if first else limit
+
+    with Scanner(workers, descend=_descend, enter=_enter) as scanner:
+        entries = _walk(scanner.scan(path, max_depth, IgnoreRules())) if max_depth >= 0 else iter(())
+        if limit is not None:
+            entries = islice(entries, limit)
+
+        if stream:
+            with OutputStream(flavor=flavor) as out:
+                for entry in entries:
+                    out.write(entry)
+            return
 
-    click.echo(OutputValue(flavor=flavor).format(result))
+        click.echo(OutputValue(flavor=flavor).format(list(entries)))
 
 @cli.command()
 @click.argument('query', required=False, default=None, nargs=1)
@@ -106,6 +174,10 @@ def walkdir(
 @click.option('--symlinks/--no-symlinks', '-s/-S', is_flag=True, default=False)
 @click.option('--regex', '-g', is_flag=True, default=False, help="Use regex for filtering")
 @click.option('--ignore-hidden', is_flag=True, default=True, help="Ignore hidden files and directories")
+@path_filters.decorate()
+@scan_options.decorate()
+@result_limits.decorate()
+@stream_output.decorate()
 @output_flavor.decorate()
 def findfiles(
     path,
@@ -114,7 +186,14 @@ def findfiles(
     ignore_hidden,
     query,
     regex,
-    flavor
+    flavor,
+    include,
+    exclude,
+    gitignore,
+    workers,
+    limit,
+    first,
+    stream,
 ):
     return walkdir.callback( # type: ignore
         path=path,
@@ -126,6 +205,13 @@ def findfiles(
         query=query,
         regex=regex,
         flavor=flavor,
+        include=include,
+        exclude=exclude,
+        gitignore=gitignore,
+        workers=workers,
+        limit=limit,
+        first=first,
+        stream=stream,
     )
 
 # Print a tree structure of directory content with size
@@ -140,6 +226,11 @@ def findfiles(
 @click.option('--ignore-hidden', is_flag=True, default=True, help="Ignore hidden files and directories")
 @click.option('--show-files/--no-files', '-f/-F', is_flag=True, default=True, help="Show files in the tree")
 @click.option('--interactive', '-i', is_flag=True, default=False, help="Enable interactive mode with clickable file paths")
+@click.option('--fuzzy', is_flag=True, default=False, help="Interactive mode: rank filter matches fuzzily (fzf-style) instead of by substring; toggle with 'z'")
+@click.option('--index/--no-index', default=False, help="Reuse directory sizes from an on-disk index when directories are unchanged (faster, but misses files rewritten in place)")
+@click.option('--apparent/--disk', 'apparent', default=True, help="Sum file sizes (default) or allocated disk blocks like du; hard links count once either way")
+@click.option('--one-file-system', '-x', is_flag=True, default=False, help="Do not descend into directories on other filesystems")
+@scan_options.decorate()
 def tree(
     path,
     sort,
@@ -150,11 +241,16 @@ def tree(
     ignore_hidden,
     show_files,
     interactive,
+    fuzzy=False,
+    index=False,
+    apparent=True,
+    one_file_system=False,
+    workers=1,
 ):
     """Print a tree structure of directory content with size information."""
     # Example: ptools fs tree . --max-depth 2 --size-threshold 10MB
     import os
-    from ptools.utils.files import get_size
+    from ptools.lib.fs.sizes import SizeIndex, Usage, size_tree
     from ptools.utils.print import TreeText, KnownExtensions
     from ptools.utils.read import FromHumanized
 
@@ -205,7 +301,8 @@ def tree(
                 self.app.push_screen(
                     ConfirmScreen(
                         message=f"Are you sure you want to delete '{path}'?",
-                        on_confirm=exec
+                        on_confirm=exec,
+                        paths=[path],
                     )
                 )
 
@@ -218,7 +315,11 @@ def tree(
             sort_order=sort_order,
             ignore_hidden=ignore_hidden,
             show_files=show_files,
-            get_size_fn=get_size,
+            fuzzy=fuzzy,
+            workers=workers,
+            size_index=SizeIndex(root=path) if index else None,
+            disk_usage=not apparent,
+            one_file_system=one_file_system,
             humanize_fn=humanize_mod.naturalsize,
             known_extensions_cls=KnownExtensions,
             commands=[OpenCommand(), DeleteCommand()],
@@ -226,45 +327,26 @@ def tree(
 
         return
 
-    def _build_tree(current_path, depth):
-        if depth < 0:
-            return None
-
-        name = os.path.basename(current_path) or current_path
-        size = get_size(current_path, ignore_hidden=ignore_hidden)
+    def _build_tree(data):
+        size = data["size"]
         if bytes_threshold is not None and size < bytes_threshold:
             return None
 
         node = TreeText.FileTreeNode(
-            name,
-            is_directory=os.path.isdir(current_path),
-            is_symlink=os.path.islink(current_path),
+            data["name"],
+            is_directory=data["is_dir"],
+            is_symlink=data["is_symlink"],
             size=size
         )
 
         if bytes_flag_threshold is not None and size >= bytes_flag_threshold:
             node.size_color = 'red'
 
-        try:
-            with os.scandir(current_path) as it:
-                for entry in it:
-                    if ignore_hidden and entry.name.startswith('.'):
-                        continue
-
-                    if entry.is_dir():
-                        child_node = _build_tree(entry.path, depth - 1)
-                        if child_node:
-                            node.add_child(child_node)
-                    elif entry.is_file() and show_files and depth > 0:
-                        size = get_size(entry.path)
-                        if bytes_threshold is None or size >= bytes_threshold:
-                            file_node = TreeText.FileTreeNode(f"{entry.name}", is_directory=False, is_symlink=entry.is_symlink(), size=size)
-                            if bytes_flag_threshold is not None and size >= bytes_flag_threshold:
-                                file_node.size_color = 'red'
-                            node.add_child(file_node)
-
-        except PermissionError:
-            pass
+        for child in data["children"]:
+            if child["is_dir"] or show_files:
+                child_node = _build_tree(child)
+                if child_node:
+                    node.add_child(child_node)
 
         if sort == 'size':
             node.children.sort(key=lambda x: x.size, reverse=(sort_order == 'desc'))
@@ -276,7 +358,14 @@ def tree(
     print(f"Building tree for {path} with max depth {max_depth} and size threshold {size_threshold}...")
 
     path = os.path.abspath(path)
-    tree_root = _build_tree(path, max_depth)
+    tree_root = None
+    if max_depth >= 0:
+        size_index = SizeIndex(root=path) if index else None
+        usage = Usage(disk=not apparent, one_filesystem=one_file_system)
+        data = size_tree(path, max_depth, ignore_hidden=ignore_hidden, workers=workers, index=size_index, usage=usage)
+        if size_index is not None:
+            size_index.save()
+        tree_root = _build_tree(data)
     if tree_root:
         click.echo(TreeText.render_tree(tree_root))
     else:
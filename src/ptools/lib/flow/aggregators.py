@@ -0,0 +1,185 @@
+import heapq
+import math
+import numbers
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+
+
+class Aggregator(ABC):
+    """Incrementally maintained statistic over a window of values.
+
+    ``add`` and ``remove`` are O(1) (amortized for min/max). Values are
+    always removed in the order they were added, which is what both
+    count- and time-based windows do.
+    """
+    name: str
+    numeric: bool = False
+
+    @abstractmethod
+    def add(self, value):
+        pass
+
+    @abstractmethod
+    def remove(self, value):
+        pass
+
+    @abstractmethod
+    def result(self):
+        pass
+
+class CountAggregator(Aggregator):
+    name = 'count'
+
+    def __init__(self):
+        self.n = 0
+
+    def add(self, value): self.n += 1
+    def remove(self, value): self.n -= 1
+    def result(self): return self.n
+
+class SumAggregator(Aggregator):
+    name = 'sum'
+    numeric = True
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value): self.total += value
+    def remove(self, value): self.total -= value
+    def result(self): return self.total
+
+class WelfordAggregator(Aggregator):
+    """Running mean and sample variance (Welford's algorithm)."""
+    numeric = True
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value):
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.n -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return max(self.m2, 0.0) / (self.n - 1) if self.n > 1 else None
+
+class MeanAggregator(WelfordAggregator):
+    name = 'mean'
+
+    def result(self):
+        return self.mean if self.n else None
+
+class VarianceAggregator(WelfordAggregator):
+    name = 'var'
+
+    def result(self):
+        return self.variance
+
+class StddevAggregator(WelfordAggregator):
+    name = 'stddev'
+
+    def result(self):
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+class MinAggregator(Aggregator):
+    """Sliding minimum over a monotonic deque."""
+    name = 'min'
+
+    def __init__(self):
+        self.candidates = deque()
+
+    def _dominates(self, new, old):
+        return new < old
+
+    def add(self, value):
+        while self.candidates and self._dominates(value, self.candidates[-1]):
+            self.candidates.pop()
+        self.candidates.append(value)
+
+    def remove(self, value):
+        if self.candidates and self.candidates[0] == value:
+            self.candidates.popleft()
+
+    def result(self):
+        return self.candidates[0] if self.candidates else None
+
+class MaxAggregator(MinAggregator):
+    name = 'max'
+
+    def _dominates(self, new, old):
+        return new > old
+
+class TopKAggregator(Aggregator):
+    """The ``k`` largest values; updates are O(1), results O(d log k) for
+    ``d`` distinct values in the window."""
+    name = 'topk'
+
+    def __init__(self, k: int = 5):
+        self.k = k
+        self.counts = Counter()
+
+    def add(self, value): self.counts[value] += 1
+
+    def remove(self, value):
+        self.counts[value] -= 1
+        if self.counts[value] <= 0:
+            del self.counts[value]
+
+    def result(self):
+        top = heapq.nlargest(self.k, self.counts.items(), key=lambda kv: kv[0])
+        values = []
+        for value, count in top:
+            values.extend([value] * count)
+        return values[:self.k]
+
+AGGREGATORS = {
+    cls.name: cls
+    for cls in (
+        CountAggregator,
+        SumAggregator,
+        MeanAggregator,
+        MinAggregator,
+        MaxAggregator,
+        VarianceAggregator,
+        StddevAggregator,
+        TopKAggregator,
+    )
+}
+
+class AggregatorSet:
+    """A named group of aggregators updated together."""
+    def __init__(self, names, top_k: int = 5):
+        self.aggregators = [
+            TopKAggregator(top_k) if name == TopKAggregator.name else AGGREGATORS[name]()
+            for name in names
+        ]
+        self.numeric = any(agg.numeric for agg in self.aggregators)
+
+    def add(self, value):
+        # Checked up front so that a bad value never reaches some
+        # aggregators but not others.
+        if self.numeric and not isinstance(value, numbers.Number):
+            raise TypeError(f"expected a number, got {type(value).__name__}: {value!r}")
+        for agg in self.aggregators:
+            agg.add(value)
+
+    def remove(self, value):
+        for agg in self.aggregators:
+            agg.remove(value)
+
+    def result(self):
+        return {agg.name: agg.result() for agg in self.aggregators}
@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str, mode: str = 'eval'):
+    """Compile a flow expression to a code object, cached by source text.
+
+    Runners evaluate the same expression once per streamed item; compiling
+    it up front means :func:`eval` only has to execute the bytecode.
+    """
+    return compile(expression, '<flow>', mode)
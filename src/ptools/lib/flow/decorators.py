@@ -2,11 +2,45 @@ from functools import wraps
 import click
 from ptools.utils.decorator_compistor import DecoratorCompositor
 from .values import OutputFlavorKind, InputFlavorKind
+from .aggregators import AGGREGATORS
 
 output_flavor = DecoratorCompositor.from_list([
     click.option('--flavor', '-fv', type=click.Choice(OutputFlavorKind), default=OutputFlavorKind.plain, help='Output format flavor.'),
 ])
 
+stream_output = DecoratorCompositor.from_list([
+    click.option('--stream/--no-stream', default=False, help='Write each result as soon as it is produced, one per line.'),
+])
+
+parallel_options = DecoratorCompositor.from_list([
+    click.option('--jobs', '-j', type=click.IntRange(min=0), default=1, help='Worker processes to evaluate with (0 = one per CPU).'),
+    click.option('--chunk-size', type=click.IntRange(min=1), default=256, help='Items sent to a worker per batch when --jobs > 1.'),
+    click.option('--ordered/--unordered', default=True, help='Keep output in input order when --jobs > 1.'),
+])
+
+vectorize_options = DecoratorCompositor.from_list([
+    click.option('--vectorize/--no-vectorize', default=False, help='Evaluate blocks of numeric input at once with NumPy (x is an array).'),
+    click.option('--block-size', type=click.IntRange(min=1), default=4096, help='Items per NumPy block when --vectorize is set.'),
+])
+
+def parse_memory_size(ctx, param, value):
+    if value is None:
+        return None
+    from ptools.utils.read import FromHumanized
+    try:
+        return FromHumanized.from_humanized_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+memory_budget = DecoratorCompositor.from_list([
+    click.option('--max-memory', type=str, default=None, callback=parse_memory_size, help='Memory budget before spilling to disk (e.g. 512MB).'),
+])
+
+aggregate_options = DecoratorCompositor.from_list([
+    click.option('--agg', '-a', 'aggregators', type=click.Choice(list(AGGREGATORS)), multiple=True, help='Aggregate to compute (repeatable; default: count, mean, min, max).'),
+    click.option('--top-k', type=click.IntRange(min=1), default=5, help='Number of values kept by the topk aggregate.'),
+])
+
 debug_scope = DecoratorCompositor.from_list([
     click.option('--debug/--no-debug', default=False, help='Print scope information.'),
 ])
@@ -37,5 +71,5 @@ flow_expression = DecoratorCompositor.from_list([
 
 flow_pipe_input = DecoratorCompositor.from_list([
     click.option('--multiline', '-m', is_flag=True, default=False, help='Read all lines as a single input.'),
-    click.option('--input-flavor', '-ifv', type=click.Choice(InputFlavorKind), default=InputFlavorKind.python_like, help='Input format flavor.'),
+    click.option('--input-flavor', '-ifv', type=click.Choice([kind.value for kind in InputFlavorKind]), default=InputFlavorKind.python_like.value, callback=lambda ctx, param, value: InputFlavorKind(value), help='Input format flavor (json decodes JSON lines directly).'),
 ])
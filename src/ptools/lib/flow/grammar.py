@@ -1,20 +1,11 @@
-from lark import Lark, Transformer, v_args
-
-grammar =  Lark, Transformer, v_args
-
-grammar = r"""
-    ?value: number
-          | quoted
-          | list
-          | dict
-          | set
-          | tuple
-          | boolean
-          | null
-          | BAREWORD   -> str_
+import ast
+import re
+import json
 
-    BAREWORD: /.+/
+from lark import Lark, Transformer, v_args
+from lark.exceptions import LarkError
 
+_structured_rules = r"""
     list  : "[" [value ("," value)*] "]"
     tuple : "(" [value ("," value)*] ")"
     set   : "{" [value ("," value)*] "}"
@@ -33,19 +24,62 @@ grammar = r"""
     null   : "null"i      -> null
            | "none"i      -> null
 
+    %import common.ESCAPED_STRING
+    %import common.SIGNED_NUMBER
+    %import common.WS
+    %ignore WS
+"""
+
+grammar = r"""
+    ?value: number
+          | quoted
+          | list
+          | dict
+          | set
+          | tuple
+          | boolean
+          | null
+          | BAREWORD   -> str_
+
+    BAREWORD: /.+/
+
     bareword: /[A-Za-z_][A-Za-z0-9_]*/
 
     // comments: "#" ... or "//" ...
     COMMENT: /#[^\n]*/ | /\/\/[^\n]*/
     %ignore COMMENT
+""" + _structured_rules
+
+# The same language without the catch-all BAREWORD and comments is
+# unambiguous enough for LALR; whatever it rejects is retried with Earley.
+lalr_grammar = r"""
+    ?value: number
+          | quoted
+          | list
+          | dict
+          | set
+          | tuple
+          | boolean
+          | null
+""" + _structured_rules
+
+# Building the parsers dominates import time and most lines never reach
+# them, so ``parser`` and ``lalr_parser`` are created on first access.
+_PARSERS = {
+    'parser': lambda: Lark(grammar, start="value"),
+    'lalr_parser': lambda: Lark(lalr_grammar, start="value", parser="lalr"),
+}
 
-    %import common.ESCAPED_STRING
-    %import common.SIGNED_NUMBER
-    %import common.WS
-    %ignore WS
-"""
 
-parser = Lark(grammar, start="value")
+def __getattr__(name):
+    if name in _PARSERS:
+        value = globals()[name] = _PARSERS[name]()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _parser(name):
+    return globals().get(name) or __getattr__(name)
 
 def either_none_or(items_nonempty, items_empty):
     """Return items_empty if items == [None], else call items_nonempty(items)."""
@@ -96,4 +130,121 @@ class StreamTransformer(Transformer):
 
     @v_args(inline=True)
     def str_(self, tok):
-        return tok.value
\ No newline at end of file
+        return tok.value
+
+
+# Fast path: most stream lines are plain numbers, keywords, barewords or
+# JSON. Those are decoded directly; other literals go through the LALR
+# parser, and only what it rejects reaches the Earley parser.
+_MISSING = object()
+
+_NUMBER_RE = re.compile(r"[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+_KEYWORDS = {'true': True, 'false': False, 'null': None, 'none': None}
+_QUOTES = '"\'`'
+_OPENERS = '[{(' + _QUOTES
+_STRUCTURAL = set('[]{}()"\'`#/,:\\\n\r')
+
+
+def _number(s):
+    return float(s) if any(c in s for c in ".eE") else int(s)
+
+
+def _reject_constant(name):
+    raise ValueError(name)
+
+
+def _json_object(pairs):
+    return AttributeDict(pairs) if pairs else {}
+
+
+def _collapse_null_lists(value):
+    """Mirror the transformer, which turns a single-``null`` list into ``[]``."""
+    if isinstance(value, list):
+        value = [_collapse_null_lists(v) for v in value]
+        return [] if len(value) == 1 and value[0] is None else value
+    if isinstance(value, dict):
+        for k, v in value.items():
+            value[k] = _collapse_null_lists(v)
+    return value
+
+
+_json_decoder = json.JSONDecoder(
+    object_pairs_hook=_json_object,
+    parse_constant=_reject_constant,
+)
+
+
+def fast_parse(text: str):
+    """Decode ``text`` without the Earley parser, or return ``_MISSING``.
+
+    Only inputs with a single unambiguous reading under ``grammar`` are
+    handled; the result is identical to ``StreamTransformer`` output.
+    """
+    if not text or text != text.strip():
+        return _MISSING
+
+    if _NUMBER_RE.fullmatch(text):
+        return _number(text)
+
+    lowered = text.lower()
+    if lowered in _KEYWORDS:
+        return _KEYWORDS[lowered]
+
+    first = text[0]
+    if first in _QUOTES:
+        body = text[1:-1]
+        if len(text) >= 2 and text[-1] == first and first not in body and '\\' not in body:
+            return body
+        return _MISSING
+
+    if first in '[{':
+        if '\\' in text:
+            return _MISSING
+        try:
+            return _collapse_null_lists(_json_decoder.decode(text))
+        except ValueError:
+            return _MISSING
+
+    if _STRUCTURAL.isdisjoint(text):
+        return text
+
+    return _MISSING
+
+
+def parse_value(text: str):
+    """Parse a stream line: lexical fast path, then LALR, then Earley."""
+    value = fast_parse(text)
+    if value is not _MISSING:
+        return value
+    if text[:1] in _OPENERS and text == text.strip():
+        try:
+            return StreamTransformer().transform(_parser('lalr_parser').parse(text))
+        except LarkError:
+            pass
+    return StreamTransformer().transform(_parser('parser').parse(text))
+
+
+# Strict input flavors: one format per stream, no guessing.
+_json_lines_decoder = json.JSONDecoder(object_hook=AttributeDict)
+
+
+def parse_json(text: str):
+    """Decode one JSON document; objects become :class:`AttributeDict`.
+
+    :raises ValueError: if ``text`` is not valid JSON.
+    """
+    return _json_lines_decoder.decode(text)
+
+
+def parse_python(text: str):
+    """Decode one Python literal with :func:`ast.literal_eval`.
+
+    :raises ValueError: if ``text`` is not a valid literal, including
+        literals that cannot be built (``{[1]: 2}``) or are nested too deeply.
+    """
+    try:
+        return ast.literal_eval(text)
+    except SyntaxError as e:
+        raise ValueError(f"invalid Python literal: {e.msg}") from None
+    except (TypeError, RecursionError, MemoryError) as e:
+        raise ValueError(f"invalid Python literal: {e}") from None
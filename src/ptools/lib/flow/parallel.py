@@ -0,0 +1,145 @@
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from ptools.lib.flow.utils import Scope, create_global_scope, chunked
+from ptools.lib.flow.compiler import compile_expression
+
+# Per-process state, set once by _init_worker.
+_worker = {}
+
+def _init_worker(expression, vars, debug):
+    _worker['globals'] = create_global_scope()
+    _worker['code'] = compile_expression(expression)
+    _worker['expression'] = expression
+    _worker['scope'] = Scope(vars)
+    _worker['debug'] = debug
+
+def _eval_values(chunk, code, globals, scope, expression, debug):
+    """Evaluate a batch of StreamValues.
+
+    Returns one ``(results, error)`` pair per input value, mirroring the
+    serial runner: results produced before an error are kept, and the
+    error message is reported by the caller.
+    """
+    out = []
+    for flow_value in chunk:
+        results = []
+        error = None
+        try:
+            for locals in scope.bind(flow_value):
+                if debug:
+                    from ptools.utils.print import fdebug
+                    sys.stderr.write(fdebug(
+                        "Runtime Debug Info",
+                        expression=expression,
+                        local_scope=locals) + "\n",
+                    )
+                results.append(eval(code, globals, locals))
+        except Exception as e:
+            error = str(e)
+        out.append((results, error))
+    return out
+
+def _eval_chunk(chunk):
+    """Evaluate a batch in a worker.
+
+    A value whose results cannot be pickled back comes back as ``None``
+    so the parent evaluates just that value itself.
+    """
+    out = _eval_values(
+        chunk, _worker['code'], _worker['globals'], _worker['scope'],
+        _worker['expression'], _worker['debug'],
+    )
+    for i, item in enumerate(out):
+        try:
+            pickle.dumps(item)
+        except Exception:
+            out[i] = None
+    return out
+
+def run_parallel(
+    expression: str,
+    flow_values,
+    jobs: int = 0,
+    chunk_size: int = 256,
+    ordered: bool = True,
+    debug: bool = False,
+    vars={},
+):
+    """Evaluate ``expression`` over ``flow_values`` on a process pool.
+
+    Yields ``[result, flow_value]`` pairs like :meth:`FlowRunner.run`. At
+    most ``2 * jobs`` chunks are in flight, so stdin is read no faster
+    than the workers can keep up with.
+
+    :param jobs: Number of worker processes; ``0`` uses every core.
+    :param chunk_size: Number of values sent to a worker per task.
+    :param ordered: Emit results in input order. When ``False`` chunks
+        are emitted as soon as they finish.
+
+    Values whose results cannot be pickled back from a worker are
+    evaluated again in this process, so output and per-value errors do
+    not depend on ``jobs``.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    chunks = chunked(flow_values, chunk_size)
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(expression, vars, debug),
+    ) as pool:
+        # future -> chunk, in submission order
+        pending = {}
+        local = _LocalEval(expression, vars, debug)
+        try:
+            for chunk in chunks:
+                pending[pool.submit(_eval_chunk, chunk)] = chunk
+                while len(pending) >= 2 * jobs:
+                    yield from _drain(pending, ordered, local)
+            while pending:
+                yield from _drain(pending, ordered, local)
+        finally:
+            for future in pending:
+                future.cancel()
+
+class _LocalEval:
+    """Evaluates values in this process when a worker cannot return them.
+
+    The scope is only built on first use.
+    """
+
+    def __init__(self, expression, vars, debug):
+        self.expression = expression
+        self.vars = vars
+        self.debug = debug
+        self._state = None
+
+    def __call__(self, chunk):
+        if self._state is None:
+            self._state = (compile_expression(self.expression), create_global_scope(), Scope(self.vars))
+        return _eval_values(chunk, *self._state, self.expression, self.debug)
+
+def _drain(pending, ordered, local):
+    """Wait for at least one pending chunk and yield its results."""
+    if ordered:
+        done = [next(iter(pending))]
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+    for future in done:
+        chunk = pending.pop(future)
+        try:
+            out = future.result()
+        except Exception:
+            # The whole batch failed to come back; redo it here so errors
+            # are still reported per value.
+            out = local(chunk)
+        for flow_value, item in zip(chunk, out):
+            results, error = item if item is not None else local([flow_value])[0]
+            for result in results:
+                yield [result, flow_value]
+            if error is not None:
+                sys.stderr.write(f"Error: {error}\n")
@@ -0,0 +1,176 @@
+import sys
+
+from ptools.lib.flow.compiler import compile_expression
+from ptools.lib.flow.utils import Scope
+from ptools.lib.flow.values import StreamValue
+
+SEPARATOR = '::'
+
+class Stage:
+    """One step of a fused pipeline over Python objects.
+
+    Stages consume and produce plain values, so chaining them skips the
+    text round trip between ``ptools flow`` processes. Each value is
+    bound element-wise exactly like :meth:`FlowRunner.run` does.
+    """
+    name: str
+    # Whether the stage emits a single value once its input is exhausted.
+    collects = False
+
+    def __init__(self, expression: str, globals, vars=None):
+        self.expression = expression
+        self.code = compile_expression(expression)
+        self.globals = globals
+        self.scope = Scope(vars)
+        self.counts = {'in': 0, 'out': 0, 'errors': 0}
+
+    def evaluate(self, value):
+        """Yield the expression's result for each element of ``value``."""
+        try:
+            for locals in self.scope.bind(value):
+                yield eval(self.code, self.globals, locals)
+        except Exception as e:
+            self.counts['errors'] += 1
+            sys.stderr.write(f"Error: {e}\n")
+
+    def __call__(self, values):
+        counts = self.counts
+        for value in values:
+            counts['in'] += 1
+            for result in self.process(value):
+                counts['out'] += 1
+                yield result
+        for result in self.finish():
+            counts['out'] += 1
+            yield result
+
+    def process(self, value):
+        return ()
+
+    def finish(self):
+        return ()
+
+class MapStage(Stage):
+    name = 'map'
+
+    def process(self, value):
+        return self.evaluate(value)
+
+class FilterStage(Stage):
+    name = 'filter'
+
+    def process(self, value):
+        for result in self.evaluate(value):
+            if result:
+                yield value
+
+class ForeachStage(Stage):
+    name = 'foreach'
+
+    def process(self, value):
+        for result in self.evaluate(value):
+            if result is not None \
+                and not (isinstance(result, list) and len(result) == 0) \
+                and not (isinstance(result, str) and result.strip() == ''):
+                yield result
+
+class UniqueStage(Stage):
+    name = 'unique'
+
+    def __init__(self, expression, globals, vars=None):
+        super().__init__(expression, globals, vars)
+        self.seen = set()
+
+    def process(self, value):
+        for key in self.evaluate(value):
+            if key not in self.seen:
+                self.seen.add(key)
+                yield value
+
+class GroupStage(Stage):
+    name = 'group'
+    collects = True
+
+    def __init__(self, expression, globals, vars=None):
+        super().__init__(expression, globals, vars)
+        self.groups = {}
+
+    def process(self, value):
+        for key in self.evaluate(value):
+            self.groups.setdefault(key, []).append(value)
+        return ()
+
+    def finish(self):
+        yield self.groups
+
+class ReduceStage(Stage):
+    name = 'reduce'
+    collects = True
+
+    def __init__(self, expression, globals, vars=None, accumulator=None):
+        super().__init__(expression, globals, {**(vars or {}), 'acc': accumulator})
+
+    def process(self, value):
+        # Scope re-reads ``acc`` from vars for every element.
+        for result in self.evaluate(value):
+            self.scope.vars['acc'] = result
+        return ()
+
+    def finish(self):
+        yield self.scope.vars['acc']
+
+STAGES = {
+    cls.name: cls
+    for cls in (MapStage, FilterStage, ForeachStage, UniqueStage, GroupStage, ReduceStage)
+}
+
+class Pipeline:
+    """Stages run as one generator chain: each value flows through every
+    stage before the next one is read, except after collecting stages."""
+    def __init__(self, stages):
+        self.stages = stages
+
+    @staticmethod
+    def parse(tokens, globals):
+        """Build a pipeline from ``stage expr... :: stage expr...`` tokens.
+
+        Only standalone ``::`` tokens separate stages, so slices such as
+        ``x[::2]`` stay intact. ``reduce`` accepts ``-a/--accumulator``.
+
+        :raises ValueError: on an unknown stage or a missing expression.
+        :raises SyntaxError: if a stage expression does not compile.
+        """
+        segments = [[]]
+        for token in tokens:
+            if token == SEPARATOR:
+                segments.append([])
+            else:
+                segments[-1].append(token)
+
+        stages = []
+        for segment in segments:
+            if not segment:
+                raise ValueError("empty stage")
+            name, args = segment[0], segment[1:]
+            if name not in STAGES:
+                raise ValueError(f"unknown stage {name!r} (expected one of: {', '.join(STAGES)})")
+            kwargs = {}
+            if name == ReduceStage.name and args[:1] in (['-a'], ['--accumulator']):
+                if len(args) < 2:
+                    raise ValueError("reduce: --accumulator needs a value")
+                kwargs['accumulator'] = StreamValue(args[1]).value
+                args = args[2:]
+            expression = ' '.join(args)
+            if not expression:
+                raise ValueError(f"{name}: missing expression")
+            stages.append(STAGES[name](expression, globals, **kwargs))
+        return Pipeline(stages)
+
+    @property
+    def collects(self):
+        return self.stages[-1].collects
+
+    def run(self, values):
+        for stage in self.stages:
+            values = stage(values)
+        return values
@@ -1,27 +1,120 @@
 import sys
 
-from ptools.utils.print import fdebug
-from ptools.lib.flow.utils import stream, yield_scope, read_stream
+from ptools.lib.flow.utils import stream, read_stream, chunked, Scope
+from ptools.lib.flow.compiler import compile_expression
+from ptools.lib.flow.values import InputFlavorKind
 
 class FlowRunner:
     def __init__(self, globals=None):
         self.globals = globals if globals is not None else {}
 
-    def run(self, expression: str, debug=False, vars={}):
-        for flow_value in stream():
-            try:
-                for scope in yield_scope(flow_value):
-                    if debug:
-                        sys.stderr.write(fdebug(
-                            "Runtime Debug Info",
-                            expression=expression,
-                            local_scope=scope) + "\n",
-                        )
-                    scope = {**scope, **vars}
-                    result = eval(expression, self.globals, scope)
-                    yield [result, flow_value]
-            except Exception as e:
-                sys.stderr.write(f"Error: {e}\n")
+    def run(
+        self,
+        expression: str,
+        debug=False,
+        vars={},
+        jobs=1,
+        chunk_size=256,
+        ordered=True,
+        vectorize=False,
+        block_size=4096,
+        input_flavor=InputFlavorKind.python_like,
+        multiline=False,
+    ):
+        try:
+            code = compile_expression(expression)
+        except SyntaxError as e:
+            sys.stderr.write(f"Error: {e}\n")
+            return
+
+        values = stream(input_flavor, multiline)
+        if vectorize:
+            yield from self._run_vectorized(expression, code, values, debug, vars, block_size)
+            return
+
+        if jobs != 1:
+            from ptools.lib.flow.parallel import run_parallel
+            yield from run_parallel(
+                expression,
+                values,
+                jobs=jobs,
+                chunk_size=chunk_size,
+                ordered=ordered,
+                debug=debug,
+                vars=vars,
+            )
+            return
+
+        scope = Scope(vars)
+        for flow_value in values:
+            yield from self._run_value(expression, code, flow_value, debug, scope)
+
+    def _run_value(self, expression, code, flow_value, debug, scope):
+        try:
+            for locals in scope.bind(flow_value):
+                if debug:
+                    from ptools.utils.print import fdebug
+                    sys.stderr.write(fdebug(
+                        "Runtime Debug Info",
+                        expression=expression,
+                        local_scope=locals) + "\n",
+                    )
+                result = eval(code, self.globals, locals)
+                yield [result, flow_value]
+        except Exception as e:
+            sys.stderr.write(f"Error: {e}\n")
+
+    def _run_vectorized(self, expression, code, values, debug, vars, block_size):
+        """Evaluate blocks of numeric scalars with ``x`` bound to an array.
+
+        Blocks that are not homogeneous ints/floats, and expressions that
+        are not array-compatible, go through the scalar path instead. With
+        an ``acc`` variable (``reduce``), only ``acc <op> f(x)`` style
+        folds are vectorized: ``f(x)`` runs on the array and the fold is
+        applied item by item.
+        """
+        # NumPy is only imported when --vectorize is used.
+        from ptools.lib.flow.vectorize import FoldPlan, can_vectorize, eval_block, numeric_block
+
+        scope = Scope(vars)
+        fold = None
+        if 'acc' in vars and 'acc' in code.co_names:
+            fold = FoldPlan.from_expression(expression, self.globals)
+            vectorizable = fold is not None
+        else:
+            vectorizable = can_vectorize(code)
+
+        for block in chunked(values, block_size):
+            array = None
+            if vectorizable:
+                array = numeric_block([fv.value if fv is not None else None for fv in block])
+
+            if array is not None and debug:
+                from ptools.utils.print import fdebug
+                sys.stderr.write(fdebug(
+                    "Runtime Debug Info",
+                    expression=expression,
+                    vectorized_block=len(block)) + "\n",
+                )
+
+            if array is not None and fold is not None and type(vars['acc']) in (int, float):
+                terms = eval_block(fold.term, self.globals, vars, array)
+                if terms is not None:
+                    acc = vars['acc']
+                    for flow_value, term in zip(block, terms):
+                        acc = fold.step(acc, term)
+                        yield [acc, flow_value]
+                    continue
+
+            elif array is not None and fold is None:
+                results = eval_block(code, self.globals, vars, array)
+                if results is not None:
+                    for flow_value, result in zip(block, results):
+                        yield [result, flow_value]
+                    continue
+
+            for flow_value in block:
+                yield from self._run_value(expression, code, flow_value, debug, scope)
     
     def run_while(
         self, 
@@ -29,19 +122,30 @@ class FlowRunner:
         initial: str = None,
         condition: str = 'True',
         update_on_none: bool = False,
-        debug: bool = False
+        debug: bool = False,
+        input_flavor=InputFlavorKind.python_like,
+        multiline: bool = False,
     ):
-        piped_input = read_stream()
+        try:
+            code = compile_expression(expression)
+            condition_code = compile_expression(condition)
+            initial_code = compile_expression(initial) if initial is not None else None
+        except SyntaxError as e:
+            sys.stderr.write(f"Error: {e}\n")
+            return
+
+        piped_input = read_stream(input_flavor, multiline)
         local_scope = {'x': None, 'i': 0, 'stdin': piped_input}
 
-        initial = eval(initial, self.globals, local_scope) if initial is not None else None
+        initial = eval(initial_code, self.globals, local_scope) if initial_code is not None else None
         if initial is not None:
             local_scope['x'] = initial
             
-        while not eval(condition, self.globals, local_scope):
+        while not eval(condition_code, self.globals, local_scope):
             try:
                  
                 if debug:
+                    from ptools.utils.print import fdebug
                     sys.stderr.write(fdebug(
                         "Runtime Debug Info",
                         condition=condition,
@@ -49,7 +153,7 @@ class FlowRunner:
                         local_scope=local_scope) + "\n",
                     )
                     
-                result = eval(expression, self.globals, local_scope)
+                result = eval(code, self.globals, local_scope)
                 yield [result, None, False]
             except Exception as e:
                 sys.stderr.write(f"Error: {e}\n")
@@ -0,0 +1,226 @@
+import heapq
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+# Rough per-entry overhead of a dict slot / list slot, in bytes.
+_ENTRY_OVERHEAD = 100
+_SLOT_OVERHEAD = 8
+
+# How many times an oversized partition is split again before it is
+# merged in memory regardless.
+_MAX_SPLITS = 8
+
+def approx_size(obj) -> int:
+    """Approximate the memory held by ``obj``, including nested containers."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v) for v in obj)
+    return size
+
+class SpillFiles:
+    """Hash-partitioned, append-only record files in a private temp dir.
+
+    ``salt`` is hashed with each key, so files re-partitioning one
+    partition of another spread its keys differently.
+    """
+    def __init__(self, partitions: int = 16, salt: int = 0):
+        self.partitions = partitions
+        self.salt = salt
+        self.dir: str | None = None
+        self._files = {}
+        self._runs = 0
+
+    def _path(self, name):
+        if self.dir is None:
+            self.dir = tempfile.mkdtemp(prefix='ptools-flow-')
+        return os.path.join(self.dir, name)
+
+    def _file(self, key):
+        index = hash((self.salt, key) if self.salt else key) % self.partitions
+        if index not in self._files:
+            self._files[index] = open(self._path(f'{index}.part'), 'ab')
+        return self._files[index]
+
+    def append(self, key, record):
+        pickle.dump(record, self._file(key), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def read_partitions(self):
+        """Yield an iterator of records for each non-empty partition."""
+        for index in sorted(self._files):
+            self._files[index].close()
+            yield self._read(self._path(f'{index}.part'))
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def sorted_run(self, records):
+        """Write ``(seq, ...)`` records sorted by seq and return a reader."""
+        path = self._path(f'run-{self._runs}.sorted')
+        self._runs += 1
+        with open(path, 'wb') as f:
+            for record in sorted(records, key=lambda r: r[0]):
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._read(path)
+
+    @property
+    def spilled(self):
+        return self.dir is not None
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        if self.dir is not None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class SpillingGroups(SpillFiles):
+    """``defaultdict(list)`` that spills to disk past ``max_bytes``.
+
+    Iterating yields ``(key, values)`` in first-seen key order with values
+    in input order - the same as iterating the in-memory dict. Spilled
+    partitions are merged one at a time and then k-way merged by the
+    sequence number at which each key was first seen. A partition that
+    outgrows ``max_bytes`` while merging is split again with a different
+    hash, so only a single group larger than the budget is ever held whole.
+    """
+    def __init__(self, max_bytes: int, partitions: int = 16):
+        super().__init__(partitions)
+        self.max_bytes = max_bytes
+        self._groups = {}  # key -> [first_seq, values]
+        self._bytes = 0
+        self._seq = 0
+
+    def add(self, key, value):
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = [self._seq, []]
+            self._bytes += approx_size(key) + _ENTRY_OVERHEAD
+        group[1].append(value)
+        self._bytes += approx_size(value) + _SLOT_OVERHEAD
+        self._seq += 1
+        if self._bytes > self.max_bytes:
+            self.spill()
+
+    def spill(self):
+        for key, (seq, values) in self._groups.items():
+            self.append(key, (seq, key, values))
+        self._groups.clear()
+        self._bytes = 0
+
+    def __iter__(self):
+        if not self.spilled:
+            for key, (_, values) in self._groups.items():
+                yield key, values
+            return
+
+        self.spill()
+        runs = []
+        for records in self.read_partitions():
+            runs.extend(self._merged_runs(records, 1))
+        for _, key, values in heapq.merge(*runs, key=lambda r: r[0]):
+            yield key, values
+
+    def _merged_runs(self, records, depth):
+        """Merge one partition's records into sorted runs."""
+        merged = {}
+        size = 0
+        for seq, key, values in records:
+            if key in merged:
+                merged[key][2].extend(values)
+            else:
+                merged[key] = [seq, key, values]
+                size += approx_size(key) + _ENTRY_OVERHEAD
+            size += approx_size(values)
+            if size > self.max_bytes and len(merged) > 1 and depth <= _MAX_SPLITS:
+                with SpillFiles(max(self.partitions, 2), salt=depth) as split:
+                    for record in merged.values():
+                        split.append(record[1], tuple(record))
+                    merged.clear()
+                    for record in records:
+                        split.append(record[1], record)
+                    for part in split.read_partitions():
+                        yield from self._merged_runs(part, depth + 1)
+                return
+        yield self.sorted_run(merged.values())
+
+class SpillingUnique(SpillFiles):
+    """Exact first-occurrence de-duplication that spills past ``max_bytes``.
+
+    While the seen-key set fits in memory, :meth:`offer` decides on the
+    spot and new values can be written immediately. Once the budget is
+    exceeded, the seen keys are spilled as already-emitted markers and
+    further candidates are deferred to disk; :meth:`remaining` resolves
+    them partition by partition and yields them in input order.
+    """
+    def __init__(self, max_bytes: int, partitions: int = 16):
+        super().__init__(partitions)
+        self.max_bytes = max_bytes
+        self._seen = set()
+        self._bytes = 0
+        self._seq = 0
+        self._deferring = False
+
+    def offer(self, key, value) -> bool:
+        """Return ``True`` if ``value`` is the first with ``key`` and can be
+        emitted now; deferred and duplicate values return ``False``."""
+        self._seq += 1
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self._bytes += approx_size(key) + _ENTRY_OVERHEAD
+
+        emit = not self._deferring
+        if self._deferring:
+            # The in-memory set only filters repeats cheaply here;
+            # partitions decide which candidate came first.
+            self.append(key, (self._seq, key, value, False))
+        if self._bytes > self.max_bytes:
+            self._spill_seen()
+        return emit
+
+    def _spill_seen(self):
+        if not self._deferring:
+            for key in self._seen:
+                self.append(key, (-1, key, None, True))
+            self._deferring = True
+        self._seen.clear()
+        self._bytes = 0
+
+    def remaining(self):
+        """Yield deferred first occurrences in input order."""
+        if not self.spilled:
+            return
+        runs = []
+        for records in self.read_partitions():
+            emitted = set()
+            first = {}
+            for seq, key, value, is_emitted in records:
+                if is_emitted:
+                    emitted.add(key)
+                elif key not in first or seq < first[key][0]:
+                    first[key] = (seq, value)
+            runs.append(self.sorted_run(
+                record for key, record in first.items() if key not in emitted
+            ))
+            del emitted, first
+        for _, value in heapq.merge(*runs, key=lambda r: r[0]):
+            yield value
@@ -1,63 +1,164 @@
-from .values import StreamValue
+from .values import StreamValue, InputFlavorKind
 
-def stream():
-    """Stream one line at a time from stdin, process it, and yield StreamValue objects."""
+def _decode(text, parse):
+    """Build a StreamValue, reporting undecodable input instead of raising."""
     import sys
+    try:
+        return StreamValue(text, parse)
+    except ValueError as e:
+        sys.stderr.write(f"Error: cannot decode {text[:80]!r}: {e}\n")
+        return None
+
+def stream(flavor=InputFlavorKind.python_like, multiline=False):
+    """Stream one line at a time from stdin, process it, and yield StreamValue objects.
+
+    ``flavor`` selects how each line is decoded; with ``multiline`` all of
+    stdin is decoded as a single value. Lines that fail to decode are
+    reported on stderr and skipped.
+    """
+    import sys
+    parse = flavor.parser
+    if multiline:
+        text = sys.stdin.read().strip()
+        if text and (value := _decode(text, parse)) is not None:
+            yield value
+        return
     for line in sys.stdin:
-        if line.strip():
-            yield StreamValue(line.strip())
+        if text := line.strip():
+            if (value := _decode(text, parse)) is not None:
+                yield value
         else:
             yield
         
-def read_stream():
+def read_stream(flavor=InputFlavorKind.python_like, multiline=False):
     """Read all lines from stdin, process them, and return a list of StreamValue objects.
        Skip if stream is empty."""
     import sys
     if sys.stdin.isatty():
         return None
-    lines = [line.strip() for line in sys.stdin if line.strip()]
-    if not lines:
+    values = [value for value in stream(flavor, multiline) if value is not None]
+    if not values:
         return None
-    return [StreamValue(line) for line in lines]
-    
-def yield_scope(stream_value):
-    """Create a scope dictionary for evaluating expressions."""
-    value = stream_value.value if isinstance(stream_value, StreamValue) else stream_value
-        
-    if isinstance(value, dict):
-        for k, v in value.items():
-            yield {'k': k, 'v': v, 'x': v, 'obj': value}
-    elif isinstance(value, tuple):
-        for i, v in enumerate(value):
-            yield {'x': v, 'i': i, 'arr': value}
-    elif isinstance(value, set):
-        for i, v in enumerate(value):
-            yield {'x': v, 'i': i, 'arr': list(value)}
-    elif isinstance(value, list):
+    return values
+    
+def chunked(iterable, size):
+    """Split ``iterable`` into lists of at most ``size`` items."""
+    from itertools import islice
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+class Scope:
+    """Reusable locals mapping for evaluating an expression per element.
+
+    :meth:`bind` refills a single dict in place for every element instead
+    of building a fresh scope (and a merged copy with ``vars``) each time.
+    The mapping is cleared before every element, so names an expression
+    assigns (``:=``) never leak into the next element. ``vars`` take precedence over element
+    names and are re-read for every element, since ``reduce`` updates
+    ``acc`` between items.
+    """
+    __slots__ = ('locals', 'vars')
+
+    def __init__(self, vars=None):
+        self.locals = {}
+        self.vars = vars if vars is not None else {}
+
+    def bind(self, stream_value):
+        """Yield :attr:`locals` once per element of ``stream_value``."""
+        value = stream_value.value if isinstance(stream_value, StreamValue) else stream_value
+        scope, vars = self.locals, self.vars
+
+        if isinstance(value, dict):
+            for k, v in value.items():
+                scope.clear()
+                scope['obj'] = value
+                scope['k'] = k
+                scope['v'] = scope['x'] = v
+                if vars:
+                    scope.update(vars)
+                yield scope
+            return
+
+        if isinstance(value, set):
+            # ``arr`` is a list view of the set; build it once, not per element.
+            value = list(value)
+        elif not isinstance(value, (list, tuple)):
+            value = [value]
+
         for i, v in enumerate(value):
-            yield {'x': v, 'i': i, 'arr': value}
-    else:
-        yield {'x': value, 'i': 0, 'arr': [value]}
-        
+            scope.clear()
+            scope['arr'] = value
+            scope['x'] = v
+            scope['i'] = i
+            if vars:
+                scope.update(vars)
+            yield scope
+
+class LazyScope(dict):
+    """Global scope whose modules are imported on first reference.
+
+    ``loaders`` maps a name to a zero-argument callable producing its
+    value. :func:`eval` never calls ``__missing__`` on its globals, so
+    names it cannot find are routed through a ``__builtins__`` mapping
+    that loads them into the scope; later references are plain dict hits.
+    """
+    def __init__(self, values, loaders):
+        super().__init__(values)
+        self.loaders = loaders
+        self['__builtins__'] = _LazyBuiltins(self)
+
+    def __missing__(self, name):
+        if name not in self.loaders:
+            raise KeyError(name)
+        value = self[name] = self.loaders[name]()
+        return value
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.loaders
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def names(self):
+        """Every name the scope provides, loaded or not."""
+        return [name for name in self if name != '__builtins__'] + \
+            [name for name in self.loaders if not dict.__contains__(self, name)]
+
+class _LazyBuiltins(dict):
+    def __init__(self, scope):
+        import builtins
+        super().__init__(vars(builtins))
+        self.scope = scope
+
+    def __missing__(self, name):
+        # A KeyError here surfaces as the usual NameError.
+        return self.scope[name]
+
+def _import(name):
+    def load():
+        import importlib
+        return importlib.import_module(name)
+    return load
+
 def create_global_scope():
-    """Create a global scope with utility functions."""
-    import json
-    import math
-    import statistics
-    import re
-    import datetime
-    import random
-    import string
-    import subprocess
-    import os
-    import sys
-    import glob
-    
+    """Create a global scope with utility functions.
+
+    Modules are imported the first time an expression (or helper)
+    references them, so commands that never touch ``statistics`` or
+    ``subprocess`` do not pay for importing them.
+    """
+    def module(name):
+        return global_scope[name]
+
     def to_json(value):
-        return json.dumps(value)
+        return module('json').dumps(value)
     
     def from_json(value):
-        return json.loads(value)
+        return module('json').loads(value)
     
     def to_upper(value):
         return str(value).upper()
@@ -69,39 +170,39 @@ def create_global_scope():
         return round(float(value), ndigits)
     
     def sqrt(value):
-        return math.sqrt(float(value))
+        return module('math').sqrt(float(value))
     
     def mean(values):
-        return statistics.mean(values)
+        return module('statistics').mean(values)
     
     def median(values):
-        return statistics.median(values)
+        return module('statistics').median(values)
     
     def regex_match(pattern, string):
-        return re.match(pattern, string) is not None
+        return module('re').match(pattern, string) is not None
     
     def regex_search(pattern, string):
-        return re.search(pattern, string) is not None
+        return module('re').search(pattern, string) is not None
     
     def current_time():
-        return datetime.datetime.now().isoformat()
+        return module('datetime').datetime.now().isoformat()
     
     def random_choice(seq):
-        return random.choice(seq)
+        return module('random').choice(seq)
     
     def random_string(length=8):
-        letters = string.ascii_letters + string.digits
-        return ''.join(random.choice(letters) for _ in range(length))
+        letters = module('string').ascii_letters + module('string').digits
+        return ''.join(module('random').choice(letters) for _ in range(length))
     
     def exec(command):
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, env=os.environ)
+        import subprocess
+        result = subprocess.run(command, shell=True, capture_output=True, text=True, env=module('os').environ)
         return result.stdout.strip()
     
-    global_scope = {
+    helpers = {
         # JSON
         'to_json': to_json,
         'from_json': from_json,
-        'json': json,
         # String manipulations
         'to_upper': to_upper,
         'to_lower': to_lower,
@@ -123,26 +224,22 @@ def create_global_scope():
         'random_choice': random_choice,
         'random_string': random_string,
         
-        # Modules
-        'math': math,
-        'statistics': statistics,
-        're': re,
-        'datetime': datetime,
-        'random': random,
-        'string': string,
-        
         # System
         'exec': exec,
-        'os': os,
-        'sys': sys,
-        'glob': glob
+    }
+
+    modules = {
+        name: _import(name)
+        for name in ('json', 'math', 'statistics', 're', 'datetime', 'random', 'string', 'os', 'sys', 'glob')
     }
     
+    global_scope = LazyScope(helpers, modules)
+
     class Globals:
         @staticmethod
         def dir():
-            return list(global_scope.keys())
+            return global_scope.names()
         
     global_scope['Globals'] = Globals
     
-    return global_scope
\ No newline at end of file
+    return global_scope
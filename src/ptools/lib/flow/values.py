@@ -1,15 +1,16 @@
+import os
+import sys
 from enum import Enum
 from abc import ABC, abstractmethod
 
-from .grammar import StreamTransformer, parser
+from .grammar import parse_value, parse_json, parse_python
 from ptools.utils.decorator_compistor import DecoratorCompositor
 
 
 # Input
 class StreamValue:
-    def __init__(self, text: str):
-        tree = parser.parse(text)
-        self.value = StreamTransformer().transform(tree)
+    def __init__(self, text: str, parse=parse_value):
+        self.value = parse(text)
 
     @staticmethod
     def Null():
@@ -22,6 +23,7 @@ class StreamValue:
 class OutputFlavorKind(Enum):
     plain = 'plain'
     json = 'json'
+    jsonl = 'jsonl'
     python = 'python'
     unflavored = 'unflavored'
     none = 'none'
@@ -31,11 +33,55 @@ class InputFlavorKind(Enum):
     json = 'json'
     python = 'python'
 
+    @property
+    def parser(self):
+        """Function decoding one input record of this flavor."""
+        return {
+            InputFlavorKind.python_like: parse_value,
+            InputFlavorKind.json: parse_json,
+            InputFlavorKind.python: parse_python,
+        }[self]
+
 class OutputFlavor(ABC):
     @abstractmethod
-    def format(self, value):
+    def format(self, value) -> str:
         pass
 
+    def format_item(self, value):
+        """Format a single streamed item as one line of output."""
+        return self.format(value)
+
+    def format_entries(self, pairs):
+        """Yield the text of ``format(dict(pairs))`` one entry at a time.
+
+        Lets a mapping be written as it is produced instead of held
+        whole. The default suits flavors that put one entry per line.
+        """
+        return self._joined((self.format({key: value}) for key, value in pairs), self.format({}))
+
+    def format_elements(self, values):
+        """Yield the text of ``format(list(values))`` one element at a time."""
+        return self._joined((self.format([value]) for value in values), self.format([]))
+
+    def _braced_entries(self, pairs, open, sep, close):
+        """:meth:`format_entries` for flavors that wrap a dict in braces."""
+        return self._joined((self.format({key: value}) for key, value in pairs),
+                            self.format({}), open, sep, close)
+
+    def _braced_elements(self, values, open, sep, close):
+        """:meth:`format_elements` for flavors that wrap a list in brackets."""
+        return self._joined((self.format([value]) for value in values),
+                            self.format([]), open, sep, close)
+
+    @staticmethod
+    def _joined(texts, empty, open='', sep='\n', close=''):
+        """Splice one-element container ``texts`` into a single container."""
+        first = True
+        for text in texts:
+            yield (open if first else sep) + text[len(open):len(text) - len(close)]
+            first = False
+        yield empty if first else close
+
 class OutputPlainFlavor(OutputFlavor):
     def format(self, value):
         if isinstance(value, list):
@@ -45,29 +91,82 @@ class OutputPlainFlavor(OutputFlavor):
         else:
             return str(value)
 
+    def format_item(self, value):
+        return str(value)
+
 class OutputJSONFlavor(OutputFlavor):
     def format(self, value):
         import json
         return json.dumps(value, indent=2)
 
+    def format_entries(self, pairs):
+        return self._braced_entries(pairs, '{\n', ',\n', '\n}')
+
+    def format_elements(self, values):
+        return self._braced_elements(values, '[\n', ',\n', '\n]')
+
+    def format_item(self, value):
+        import json
+        return json.dumps(value)
+
+class OutputJSONLinesFlavor(OutputFlavor):
+    def format(self, value):
+        if isinstance(value, list):
+            return '\n'.join(self.format_item(v) for v in value)
+        return self.format_item(value)
+
+    def format_item(self, value):
+        import json
+        return json.dumps(value)
+
+    def format_entries(self, pairs):
+        return self._braced_entries(pairs, '{', ', ', '}')
+
 class OutputPythonFlavor(OutputFlavor):
     def format(self, value):
         return repr(value)
 
+    def format_entries(self, pairs):
+        return self._braced_entries(pairs, '{', ', ', '}')
+
+    def format_elements(self, values):
+        return self._braced_elements(values, '[', ', ', ']')
+
 class OutputNoneFlavor(OutputFlavor):
     def format(self, value):
         return ''
 
+    def format_item(self, value):
+        return None
+
+    def format_entries(self, pairs):
+        for _ in pairs:
+            pass
+        yield ''
+
+    def format_elements(self, values):
+        for _ in values:
+            pass
+        yield ''
+
 class OutputUnflavoredFlavor(OutputFlavor):
     def format(self, value):
         return str(value)
 
+    def format_entries(self, pairs):
+        return self._braced_entries(pairs, '{', ', ', '}')
+
+    def format_elements(self, values):
+        return self._braced_elements(values, '[', ', ', ']')
+
 class OutputValue:
     def __init__(self, flavor: OutputFlavorKind = OutputFlavorKind.plain):
         if flavor == OutputFlavorKind.plain:
             self.flavor = OutputPlainFlavor()
         elif flavor == OutputFlavorKind.json:
             self.flavor = OutputJSONFlavor()
+        elif flavor == OutputFlavorKind.jsonl:
+            self.flavor = OutputJSONLinesFlavor()
         elif flavor == OutputFlavorKind.python:
             self.flavor = OutputPythonFlavor()
         elif flavor == OutputFlavorKind.none:
@@ -79,3 +178,73 @@ class OutputValue:
 
     def format(self, value):
         return self.flavor.format(value)
+
+    def format_item(self, value):
+        return self.flavor.format_item(value)
+
+    def format_entries(self, pairs):
+        return self.flavor.format_entries(pairs)
+
+    def format_elements(self, values):
+        return self.flavor.format_elements(values)
+
+class OutputStream:
+    """Write results one line at a time, flushing after each.
+
+    Used as a context manager so that a downstream reader closing the
+    pipe early (``| head``) ends the run quietly instead of with a
+    ``BrokenPipeError`` traceback.
+    """
+    def __init__(self, flavor: OutputFlavorKind = OutputFlavorKind.plain, file=None):
+        self.output = OutputValue(flavor=flavor)
+        self.file = file if file is not None else sys.stdout
+
+    def format(self, value):
+        return self.output.format(value)
+
+    def write(self, value):
+        """Format ``value`` as a single item and write it."""
+        self.echo(self.output.format_item(value))
+
+    def write_entries(self, pairs):
+        """Write ``(key, value)`` pairs as one mapping, entry by entry.
+
+        The output is the same as formatting ``dict(pairs)`` at once.
+        """
+        self._write_pieces(self.output.format_entries(pairs))
+
+    def write_elements(self, values):
+        """Write ``values`` as one list, element by element.
+
+        The output is the same as formatting ``list(values)`` at once.
+        """
+        self._write_pieces(self.output.format_elements(values))
+
+    def _write_pieces(self, texts):
+        for text in texts:
+            self.file.write(text)
+            self.file.flush()
+        self.file.write('\n')
+        self.file.flush()
+
+    def echo(self, text):
+        """Write already formatted ``text``; ``None`` writes nothing."""
+        if text is None:
+            return
+        self.file.write(text + '\n')
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None or not issubclass(exc_type, BrokenPipeError):
+            return False
+        # Point stdout at devnull so the interpreter's final flush does
+        # not raise again on the closed pipe.
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, self.file.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+        return True
@@ -0,0 +1,121 @@
+import ast
+import operator
+
+import numpy as np
+
+# Largest magnitude up to which every int64 is exact in float64.
+_EXACT_FLOAT_INT = 2 ** 53
+
+# Scope names that only make sense one item at a time.
+_SCALAR_ONLY_NAMES = {'i', 'arr', 'k', 'v', 'obj'}
+
+_FOLD_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+}
+
+def numeric_block(values):
+    """Return ``values`` as a 1-D int64 or float64 array, or ``None``.
+
+    Blocks must be homogeneous: mixing ints and floats would turn every
+    int result into a float, which the scalar path would not do.
+    """
+    if not values:
+        return None
+    kind = type(values[0])
+    if kind not in (int, float) or any(type(v) is not kind for v in values):
+        return None
+    try:
+        array = np.array(values)
+    except OverflowError:
+        return None
+    return array if array.dtype.kind in 'if' else None
+
+def can_vectorize(code):
+    """Whether ``code`` only depends on ``x`` (plus globals) per item."""
+    return _SCALAR_ONLY_NAMES.isdisjoint(code.co_names)
+
+def eval_block(code, globals, scope, array):
+    """Evaluate ``code`` once with ``x`` bound to ``array``.
+
+    Returns the per-item results as Python scalars, or ``None`` when the
+    expression is not array-compatible. NumPy floating point errors
+    (division by zero, invalid operations) raise instead of warning so
+    that the caller can fall back to the scalar path and report them per
+    item. Integer results are cross-checked against a float64 evaluation
+    to catch silent int64 overflow. Float results from int blocks holding
+    values beyond 2**53 are rejected: NumPy rounds those to float64
+    before computing, where Python (e.g. ``/``) works on the exact int.
+    """
+    try:
+        with np.errstate(all='raise'):
+            result = eval(code, globals, {**scope, 'x': array})
+            if not _is_elementwise(result, array):
+                return None
+            if result.dtype.kind == 'f' and array.dtype.kind == 'i' and \
+                    (array.max() > _EXACT_FLOAT_INT or array.min() < -_EXACT_FLOAT_INT):
+                return None
+            if result.dtype.kind in 'iu':
+                check = eval(code, globals, {**scope, 'x': array.astype(np.float64)})
+                if not _is_elementwise(check, array) or \
+                        not np.allclose(result, check, rtol=1e-9, atol=0):
+                    return None
+    except Exception:
+        return None
+    return result.tolist()
+
+def _is_elementwise(result, array):
+    return isinstance(result, np.ndarray) \
+        and result.shape == array.shape \
+        and result.dtype.kind in 'biuf'
+
+class FoldPlan:
+    """A reduce expression split into a per-item term and a fold step.
+
+    ``acc + f(x)`` becomes ``term = f(x)`` evaluated over a whole block,
+    folded into the accumulator item by item with ``step(acc, term)`` so
+    that results (including float rounding) match the scalar path.
+    """
+    def __init__(self, term, step):
+        self.term = term
+        self.step = step
+
+    @staticmethod
+    def from_expression(expression: str, globals):
+        """Build a plan for ``acc <op> f(x)``, ``f(x) <op> acc``,
+        ``max(acc, f(x))`` or ``min(acc, f(x))``; ``None`` otherwise."""
+        try:
+            node = ast.parse(expression, mode='eval').body
+        except SyntaxError:
+            return None
+
+        def is_acc(n):
+            return isinstance(n, ast.Name) and n.id == 'acc'
+
+        def uses_acc(n):
+            return any(is_acc(child) for child in ast.walk(n))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _FOLD_OPERATORS:
+            op = _FOLD_OPERATORS[type(node.op)]
+            if is_acc(node.left) and not uses_acc(node.right):
+                return FoldPlan._build(node.right, lambda acc, term: op(acc, term))
+            if is_acc(node.right) and not uses_acc(node.left):
+                return FoldPlan._build(node.left, lambda acc, term: op(term, acc))
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and node.func.id in ('max', 'min') and node.func.id not in globals \
+                and len(node.args) == 2 and not node.keywords:
+            fn = max if node.func.id == 'max' else min
+            left, right = node.args
+            if is_acc(left) and not uses_acc(right):
+                return FoldPlan._build(right, lambda acc, term: fn(acc, term))
+            if is_acc(right) and not uses_acc(left):
+                return FoldPlan._build(left, lambda acc, term: fn(term, acc))
+
+        return None
+
+    @staticmethod
+    def _build(term, step):
+        code = compile(ast.Expression(term), '<flow>', 'eval')
+        return FoldPlan(code, step) if can_vectorize(code) else None
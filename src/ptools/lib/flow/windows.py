@@ -0,0 +1,106 @@
+import math
+import sys
+from collections import deque
+from datetime import datetime
+
+from ptools.lib.flow.aggregators import AggregatorSet
+
+def to_timestamp(value) -> float:
+    """Coerce a number, ``datetime`` or ISO-8601 string to epoch seconds."""
+    if isinstance(value, bool):
+        raise TypeError(f"invalid timestamp: {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    raise TypeError(f"invalid timestamp: {value!r}")
+
+class CountWindows:
+    """Windows over the last ``size`` items, emitted every ``slide`` items.
+
+    ``slide == size`` gives tumbling windows. Each window is reported as
+    ``{'start': ..., 'end': ..., <aggregates>}`` with item indices in
+    ``[start, end)``. A trailing partial window is emitted by :meth:`close`.
+    """
+    def __init__(self, size: int, slide: int, aggregators, top_k: int = 5):
+        self.size = size
+        self.slide = slide
+        self.aggs = AggregatorSet(aggregators, top_k)
+        self.buffer = deque()
+        self.seen = 0
+        self.pending = 0
+
+    def push(self, value):
+        self.aggs.add(value)
+        self.buffer.append(value)
+        if len(self.buffer) > self.size:
+            self.aggs.remove(self.buffer.popleft())
+        self.seen += 1
+        self.pending += 1
+        if self.pending == self.slide:
+            yield self._emit()
+
+    def close(self):
+        if self.pending:
+            # Trim to the items this window would hold had it filled up.
+            start = self.seen - self.pending + self.slide - self.size
+            while len(self.buffer) > self.seen - start:
+                self.aggs.remove(self.buffer.popleft())
+            yield self._emit()
+
+    def _emit(self):
+        self.pending = 0
+        return {'start': self.seen - len(self.buffer), 'end': self.seen, **self.aggs.result()}
+
+class TimeWindows:
+    """Windows of ``size`` seconds starting every ``slide`` seconds.
+
+    Window starts are aligned to multiples of ``slide`` and a window is
+    emitted once an item at or past its end arrives, so timestamps are
+    expected in (roughly) increasing order. Items older than the oldest
+    open window are reported on stderr and dropped. Windows with no items
+    are skipped.
+    """
+    def __init__(self, size: float, slide: float, aggregators, top_k: int = 5):
+        self.size = size
+        self.slide = slide
+        self.aggs = AggregatorSet(aggregators, top_k)
+        self.buffer = deque()  # (timestamp, value)
+        self.start = 0.0
+        self.started = False
+
+    def _first_start(self, ts):
+        """Start of the earliest window that contains ``ts``."""
+        return (math.floor((ts - self.size) / self.slide) + 1) * self.slide
+
+    def push(self, value, ts):
+        ts = to_timestamp(ts)
+        if not self.started:
+            self.start = self._first_start(ts)
+            self.started = True
+        while ts >= self.start + self.size:
+            if self.buffer:
+                yield self._emit()
+            self._advance(ts)
+        if ts < self.start:
+            sys.stderr.write(f"Error: late item at {ts} dropped (window starts at {self.start})\n")
+            return
+        self.aggs.add(value)
+        self.buffer.append((ts, value))
+
+    def close(self):
+        while self.buffer:
+            yield self._emit()
+            self._advance(None)
+
+    def _advance(self, ts):
+        self.start += self.slide
+        while self.buffer and self.buffer[0][0] < self.start:
+            self.aggs.remove(self.buffer.popleft()[1])
+        if not self.buffer and ts is not None:
+            self.start = max(self.start, self._first_start(ts))
+
+    def _emit(self):
+        return {'start': self.start, 'end': self.start + self.size, **self.aggs.result()}
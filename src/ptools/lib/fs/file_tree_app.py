@@ -9,16 +9,26 @@ Keybindings:
     h             - toggle hidden files
     f             - toggle files shown
     /             - focus filter input
+    z             - toggle fuzzy filter (fzf-style ranking)
     escape        - clear filter / unfocus filter
     r             - refresh (rescan from disk)
     q             - quit
     [custom]      - user-defined commands (if any)
+
+Changes on disk are picked up through watchdog; only the directories
+they touch are re-measured and sizes are adjusted up to the root. Each
+directory the tree lists (down to ``max_depth``) gets its own
+non-recursive watch; changes further down are picked up by "r".
+
+The filter box searches a :class:`~ptools.lib.fs.name_index.NameIndex`
+built with each scan; typing more characters narrows the previous
+matches instead of walking the tree again.
 """
 
 from __future__ import annotations
 
 import os
-from threading import Timer
+from threading import Lock, Timer
 from typing import Callable
 from dataclasses import dataclass
 
@@ -29,6 +39,10 @@ from textual.screen import Screen
 from textual.widgets import Footer, Header, Input, Tree as TextualTree
 from textual.widgets.tree import TreeNode
 from textual.reactive import reactive
+from watchdog.events import FileSystemEventHandler
+
+from ptools.lib.fs.name_index import NameIndex
+from ptools.lib.fs.sizes import LiveSizeTree, SizeIndex
 
 __version__ = "0.1.0"
 
@@ -56,6 +70,22 @@ class Command:
         raise NotImplementedError("Command exec_fn must be implemented by subclass")
 
 
+class _ChangeHandler(FileSystemEventHandler):
+    """Forwards created/deleted/moved/modified paths to a callback."""
+
+    # inotify access events; they change nothing we measure
+    IGNORED = {"opened", "closed", "closed_no_write"}
+
+    def __init__(self, on_change: Callable[..., None]):
+        super().__init__()
+        self.on_change = on_change
+
+    def on_any_event(self, event) -> None:
+        if event.event_type in self.IGNORED:
+            return
+        self.on_change(event.src_path, getattr(event, "dest_path", None))
+
+
 class FileTreeApp(App):
     """Full-screen interactive file tree."""
 
@@ -82,6 +112,7 @@ class FileTreeApp(App):
         Binding("f", "toggle_files", "Files"),
         Binding("r", "refresh", "Refresh"),
         Binding("slash", "show_filter", "Filter", key_display="/"),
+        Binding("z", "toggle_fuzzy", "Fuzzy"),
     ]
 
     sort_by: reactive[str] = reactive("size")
@@ -89,6 +120,7 @@ class FileTreeApp(App):
     ignore_hidden: reactive[bool] = reactive(True)
     show_files: reactive[bool] = reactive(True)
     filter_text: reactive[str] = reactive("")
+    fuzzy: reactive[bool] = reactive(False)
 
     def __init__(
         self,
@@ -100,7 +132,12 @@ class FileTreeApp(App):
         sort_order: str = "asc",
         ignore_hidden: bool = True,
         show_files: bool = True,
-        get_size_fn=None,
+        fuzzy: bool = False,
+        workers: int = 1,
+        size_index: SizeIndex | None = None,
+        disk_usage: bool = False,
+        one_file_system: bool = False,
+        watch_changes: bool = True,
         humanize_fn=None,
         known_extensions_cls=None,
         commands: list[Command] = [],
@@ -111,27 +148,57 @@ class FileTreeApp(App):
         self.max_depth = max_depth
         self.size_threshold = size_threshold
         self.size_flag_threshold = size_flag_threshold
+        self.scan_workers = workers
+        self.size_index = size_index
+        self.disk_usage = disk_usage
+        self.one_file_system = one_file_system
+        self.watch_changes = watch_changes
 
         # Store init values - applied in on_mount
         self._init_sort_by = sort_by
         self._init_sort_order = sort_order
         self._init_ignore_hidden = ignore_hidden
         self._init_show_files = show_files
+        self._init_fuzzy = fuzzy
 
         # Injected dependencies
-        self._get_size = get_size_fn or (lambda p, ignore_hidden=False: 0)
         self._humanize = humanize_fn
         self._icons = known_extensions_cls
 
-        # In-memory tree data - populated by _scan_tree, re-rendered on setting changes
+        # In-memory tree data - populated by _scan_tree, patched by
+        # refresh_paths, re-rendered on setting changes
         self._tree_data: dict | None = None
+        self._live: LiveSizeTree | None = None
+        self._data_lock = Lock()
+        # Name index for the filter - rebuilt per scan, patched on the
+        # main thread after refreshes
+        self._name_index: NameIndex | None = None
+        # path -> best match score in its subtree, while a filter is active
+        self._filter_paths: dict[str, int] | None = None
         # Maps textual node id -> tree data dict
         self._node_meta: dict[int, dict] = {}
+        # Textual node ids whose children are materialized
+        self._loaded: set[int] = set()
+        # Paths of expanded directories, restored across re-renders
+        self._expanded: set[str] = set()
+        # (path, size, has_children) -> rendered label
+        self._labels: dict[tuple, str] = {}
 
         # Debounce timer for rebuilds
         self._rebuild_timer: Timer | None = None
         self._rebuild_debounce_secs = 0.15
 
+        # Filesystem watcher; changed paths are batched, then refreshed
+        self._observer = None
+        self._handler = _ChangeHandler(self._queue_change)
+        # directory path -> its watch, kept in step with the listed tree
+        self._watches: dict = {}
+        self._watch_lock = Lock()
+        self._pending_changes: set[str] = set()
+        self._changes_lock = Lock()
+        self._changes_timer: Timer | None = None
+        self._changes_debounce_secs = 0.2
+
         # Additional bindings
         self.commands = commands
         for cmd in self.commands:
@@ -158,6 +225,7 @@ class FileTreeApp(App):
         self.sort_order = self._init_sort_order
         self.ignore_hidden = self._init_ignore_hidden
         self.show_files = self._init_show_files
+        self.fuzzy = self._init_fuzzy
         self._update_title()
 
         # Kick off background scan
@@ -166,84 +234,170 @@ class FileTreeApp(App):
     @work(thread=True)
     def _do_scan(self) -> None:
         """Scan filesystem on background thread, then render on main thread."""
-        tree_data = self._scan_tree(self.root_path, 0)
-        self._tree_data = tree_data
+        with self._data_lock:
+            tree_data = self._scan_tree(self.root_path, 0)
+            self._tree_data = tree_data
+            self._name_index = NameIndex(tree_data) if tree_data else None
+            self._labels = {}
         self.call_from_thread(self._render_from_data)
         self.call_from_thread(self._finish_mount)
 
     def _finish_mount(self) -> None:
         self._mount_complete = True
+        self._watch_tree()
+
+    def on_unmount(self) -> None:
+        if self._rebuild_timer is not None:
+            self._rebuild_timer.cancel()
+        if self._changes_timer is not None:
+            self._changes_timer.cancel()
+        with self._watch_lock:
+            self.watch_changes = False
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer = None
+            self._watches.clear()
 
     # ------------------------------------------------------------------
     # Filesystem scan - pure data, no UI. Runs on worker thread.
     # ------------------------------------------------------------------
 
     def _scan_tree(self, dir_path: str, depth: int) -> dict | None:
-        """Recursively scan directory and compute sizes. Returns a plain dict tree."""
-        if depth > self.max_depth:
-            return None
+        """Scan directory and compute sizes in one pass. Returns a plain dict tree.
 
-        name = os.path.basename(dir_path) or dir_path
-        is_symlink = os.path.islink(dir_path)
-        size = self._get_size(dir_path, ignore_hidden=self.ignore_hidden)
-
-        if self.size_threshold is not None and size < self.size_threshold:
+        Size threshold and file visibility are applied when rendering,
+        so the data stays complete for incremental refreshes.
+        """
+        if depth > self.max_depth:
             return None
+        self._live = LiveSizeTree(
+            dir_path,
+            self.max_depth - depth,
+            ignore_hidden=self.ignore_hidden,
+            workers=self.scan_workers,
+            index=self.size_index,
+            disk=self.disk_usage,
+            one_filesystem=self.one_file_system,
+        )
+        data = self._live.scan()
+        if self.size_index is not None:
+            self.size_index.save()
+        return data
 
-        node = {
-            "name": name,
-            "path": dir_path,
-            "is_dir": True,
-            "is_symlink": is_symlink,
-            "size": size,
-            "depth": depth,
-            "children": [],
-        }
-
-        if depth >= self.max_depth:
-            return node
-
-        try:
-            entries = list(os.scandir(dir_path))
-        except PermissionError:
-            return node
+    @work(thread=True)
+    def refresh_paths(self, paths) -> None:
+        """Re-measure only the directories ``paths`` affect, then re-render."""
+        with self._data_lock:
+            if self._live is None:
+                return
+            refreshed = self._live.refresh(paths)
+            if self.size_index is not None:
+                self.size_index.save()
+        if refreshed:
+            self._sync_watches()
+            self.call_from_thread(self._apply_refresh, refreshed)
+
+    def _apply_refresh(self, refreshed: set[str]) -> None:
+        """Re-index refreshed directories, then re-render (main thread)."""
+        if self._name_index is not None and self._live is not None:
+            for path in refreshed:
+                node = self._live.node(path)
+                if node is not None:
+                    self._name_index.update(node)
+                else:
+                    self._name_index.remove(path)
+        self._render_from_data()
 
-        for entry in entries:
-            if self.ignore_hidden and entry.name.startswith("."):
-                continue
+    # ------------------------------------------------------------------
+    # Filesystem watcher - feeds changed paths to refresh_paths.
+    # ------------------------------------------------------------------
 
-            if entry.is_dir(follow_symlinks=False):
-                child = self._scan_tree(entry.path, depth + 1)
-                if child:
-                    node["children"].append(child)
+    @work(thread=True)
+    def _watch_tree(self) -> None:
+        """Start watching the scanned tree (worker thread).
+
+        Adding a watch costs tens of microseconds per directory, too
+        much for the main thread on large trees.
+        """
+        self._sync_watches()
+
+    def _sync_watches(self) -> None:
+        """Watch each listed directory and drop watches on ones now gone."""
+        with self._data_lock:
+            paths = set(self._live.directories()) if self._live is not None else set()
+        with self._watch_lock:
+            if not self.watch_changes:
+                return
+            if self._observer is None:
+                from watchdog.observers import Observer
 
-            elif entry.is_file(follow_symlinks=False) and self.show_files:
                 try:
-                    fsize = entry.stat().st_size
-                except OSError:
-                    fsize = 0
-                if self.size_threshold is not None and fsize < self.size_threshold:
-                    continue
-                node["children"].append({
-                    "name": entry.name,
-                    "path": entry.path,
-                    "is_dir": False,
-                    "is_symlink": entry.is_symlink(),
-                    "size": fsize,
-                    "depth": depth + 1,
-                    "children": [],
-                })
-
-        self._sort_data_children(node)
-        return node
-
-    def _sort_data_children(self, node: dict) -> None:
-        """Sort a data node's children according to current settings."""
+                    observer = Observer()
+                    observer.daemon = True
+                    observer.start()
+                except (OSError, RuntimeError):
+                    return
+                self._observer = observer
+            for path in self._watches.keys() - paths:
+                try:
+                    self._observer.unschedule(self._watches.pop(path))
+                except (KeyError, OSError):
+                    pass
+            for path in paths - self._watches.keys():
+                try:
+                    self._watches[path] = self._observer.schedule(self._handler, path, recursive=False)
+                except (OSError, RuntimeError):
+                    # e.g. out of inotify watches; "r" still rescans
+                    pass
+
+    def _queue_change(self, *paths: str) -> None:
+        """Collect changed paths (watcher thread) and debounce a refresh."""
+        ignored = os.path.dirname(self.size_index.path) + os.sep if self.size_index is not None else None
+        with self._changes_lock:
+            for path in paths:
+                if path and not (ignored and path.startswith(ignored)):
+                    self._pending_changes.add(path)
+            if not self._pending_changes:
+                return
+            if self._changes_timer is not None:
+                self._changes_timer.cancel()
+            self._changes_timer = Timer(self._changes_debounce_secs, self._flush_changes)
+            self._changes_timer.daemon = True
+            self._changes_timer.start()
+
+    def _flush_changes(self) -> None:
+        with self._changes_lock:
+            paths, self._pending_changes = self._pending_changes, set()
+        if paths:
+            try:
+                self.call_from_thread(self.refresh_paths, paths)
+            except RuntimeError:
+                # App is shutting down
+                pass
+
+    def _visible(self, data: dict) -> bool:
+        """Whether a data node passes the size threshold and file toggle."""
+        if not data["is_dir"] and not self.show_files:
+            return False
+        return self.size_threshold is None or data["size"] >= self.size_threshold
+
+    def _sorted_children(self, node: dict) -> list[dict]:
+        """A data node's children in the order of the current settings.
+
+        While a fuzzy filter is active, the best match ranks first; the
+        sort settings only break ties. Returns a new list: refreshes on
+        the worker thread replace and iterate ``node["children"]``, so
+        the main thread never reorders it in place.
+        """
         reverse = self.sort_order == "desc"
         if self.sort_by == "size":
-            node["children"].sort(key=lambda c: c.get("size") or 0, reverse=reverse)
+            children = sorted(node["children"], key=lambda c: c.get("size") or 0, reverse=reverse)
         else:
-            node["children"].sort(key=lambda c: c["name"].lower(), reverse=reverse)
+            children = sorted(node["children"], key=lambda c: c["name"].lower(), reverse=reverse)
+        if self.fuzzy and self._filter_paths:
+            scores = self._filter_paths
+            children.sort(key=lambda c: scores.get(c["path"], 0), reverse=True)
+        return children
 
     # ------------------------------------------------------------------
     # Rendering - takes in-memory data and builds Textual tree nodes.
@@ -251,84 +405,94 @@ class FileTreeApp(App):
     # ------------------------------------------------------------------
 
     def _render_from_data(self) -> None:
-        """Render the in-memory tree data into the Textual tree widget."""
+        """Render the in-memory tree data into the Textual tree widget.
+
+        Only the root's children and previously expanded directories are
+        materialized; other directories get their children on expand.
+        """
         tree = self.query_one("#tree-view", TextualTree)
         tree.clear()
         self._node_meta.clear()
+        self._loaded.clear()
+        self._filter_paths = None
 
         data = self._tree_data
-        if not data:
+        if not data or not self._visible(data):
             tree.root.set_label("No files found matching criteria.")
             return
 
-        # Apply current sort to the entire data tree
-        self._resort_data(data)
-
         # Apply filter if active
-        render_data = data
-        if self.filter_text.strip():
-            render_data = self._filter_data(data, self.filter_text.strip().lower())
-            if not render_data:
+        query = self.filter_text.strip()
+        if query and self._name_index is not None:
+            self._filter_paths = self._name_index.visible(query, self.fuzzy)
+            if data["path"] not in self._filter_paths:
                 tree.root.set_label("No files match filter.")
                 return
 
-        tree.root.set_label(self._make_label(
-            render_data["name"],
-            is_dir=True,
-            is_symlink=render_data["is_symlink"],
-            size=render_data["size"],
-            has_children=bool(render_data["children"]),
-        ))
-        self._node_meta[id(tree.root)] = render_data
-        self._render_children(tree.root, render_data)
+        tree.root.set_label(self._label(data))
+        self._node_meta[id(tree.root)] = data
+        self._materialize(tree.root)
         tree.root.expand()
 
-    def _render_children(self, parent_node: TreeNode, data: dict) -> None:
-        """Recursively add children to a Textual tree node from data."""
-        for child_data in data["children"]:
-            label = self._make_label(
-                child_data["name"],
-                is_dir=child_data["is_dir"],
-                is_symlink=child_data["is_symlink"],
-                size=child_data["size"],
-                has_children=bool(child_data["children"]),
-            )
+    def _materialize(self, parent_node: TreeNode) -> None:
+        """Add the direct children of a Textual node from data, once.
+
+        Children are sorted here, so a sort change only costs the
+        directories that are actually shown.
+        """
+        if id(parent_node) in self._loaded:
+            return
+        self._loaded.add(id(parent_node))
+        data = self._node_meta.get(id(parent_node))
+        if not data:
+            return
+
+        shown = self._filter_paths
+        for child_data in self._sorted_children(data):
+            if not self._visible(child_data):
+                continue
+            if shown is not None and child_data["path"] not in shown:
+                continue
+            label = self._label(child_data)
             if child_data["is_dir"]:
                 child_node = parent_node.add(label, expand=False, allow_expand=True)
             else:
                 child_node = parent_node.add_leaf(label)
             self._node_meta[id(child_node)] = child_data
-            if child_data["children"]:
-                self._render_children(child_node, child_data)
-
-    def _resort_data(self, node: dict) -> None:
-        """Recursively re-sort the entire data tree in place."""
-        self._sort_data_children(node)
-        for child in node["children"]:
-            if child["is_dir"]:
-                self._resort_data(child)
-
-    def _filter_data(self, node: dict, filter_lower: str) -> dict | None:
-        """Return a filtered copy of the data tree. None if nothing matches."""
-        name_matches = filter_lower in node["name"].lower()
-
-        if node["is_dir"]:
-            filtered_children = []
-            for child in node["children"]:
-                filtered = self._filter_data(child, filter_lower)
-                if filtered:
-                    filtered_children.append(filtered)
-
-            if name_matches or filtered_children:
-                return {**node, "children": filtered_children}
-            return None
-        else:
-            return node if name_matches else None
+            if child_data["is_dir"] and child_data["path"] in self._expanded:
+                self._materialize(child_node)
+                child_node.expand()
+
+    def on_tree_node_expanded(self, event: TextualTree.NodeExpanded) -> None:
+        data = self._node_meta.get(id(event.node))
+        if data:
+            self._expanded.add(data["path"])
+        self._materialize(event.node)
+
+    def on_tree_node_collapsed(self, event: TextualTree.NodeCollapsed) -> None:
+        data = self._node_meta.get(id(event.node))
+        if data and event.node is not event.node.tree.root:
+            self._expanded.discard(data["path"])
 
     # ------------------------------------------------------------------
     # Label formatting
     # ------------------------------------------------------------------
 
+    def _label(self, data: dict) -> str:
+        """Cached label for a data node; keyed on what the label shows."""
+        has_children = bool(data["children"])
+        key = (data["path"], data["size"], has_children)
+        label = self._labels.get(key)
+        if label is None:
+            label = self._labels[key] = self._make_label(
+                data["name"],
+                is_dir=data["is_dir"],
+                is_symlink=data["is_symlink"],
+                size=data["size"],
+                has_children=has_children,
+            )
+        return label
+
     def _make_label(
         self,
         name: str,
@@ -394,19 +558,26 @@ class FileTreeApp(App):
 
     def watch_show_files(self) -> None:
         if self.is_mounted and self._mount_complete:
-            # File toggle changes what's scanned - rescan needed
-            self._do_scan()
+            # Files are always scanned; the toggle only changes rendering
+            self._schedule_rebuild()
             self._update_title()
 
     def watch_filter_text(self) -> None:
         if self.is_mounted and self._mount_complete:
             self._schedule_rebuild()
 
+    def watch_fuzzy(self) -> None:
+        if self.is_mounted and self._mount_complete:
+            if self.filter_text.strip():
+                self._schedule_rebuild()
+            self._update_title()
+
     def _update_title(self) -> None:
         parts = [
             f"Sort: {self.sort_by} {self.sort_order}",
             f"Hidden: {'off' if self.ignore_hidden else 'on'}",
             f"Files: {'on' if self.show_files else 'off'}",
+            f"Filter: {'fuzzy' if self.fuzzy else 'substring'}",
         ]
         self.sub_title = " | ".join(parts)
 
@@ -426,6 +597,9 @@ class FileTreeApp(App):
     def action_toggle_files(self) -> None:
         self.show_files = not self.show_files
 
+    def action_toggle_fuzzy(self) -> None:
+        self.fuzzy = not self.fuzzy
+
     def action_refresh(self) -> None:
         """Force rescan from disk."""
         tree = self.query_one("#tree-view", TextualTree)
@@ -473,7 +647,7 @@ class FileTreeApp(App):
                     try:
                         result = this_command.exec_fn(node_data) # type: ignore
                         if result is True:
-                            self.action_refresh()
+                            self.refresh_paths([node_data["path"]])
                     except Exception as e:
                         self.bell()
                         self.push_screen(MessageScreen(f"Error executing command: {e}"))
@@ -496,12 +670,17 @@ class MessageScreen(Screen):
         self.query_one("#message-input", Input).focus()
 
 class ConfirmScreen(Screen):
-    """Screen to ask user to confirm an action."""
+    """Screen to ask user to confirm an action.
+
+    ``paths`` are the paths the action changes; only those are refreshed
+    after confirming. Without them the whole tree is rescanned.
+    """
 
-    def __init__(self, message: str, on_confirm: Callable[[], None], **kwargs):
+    def __init__(self, message: str, on_confirm: Callable[[], None], paths: list[str] | None = None, **kwargs):
         super().__init__(**kwargs)
         self.message = message
         self.on_confirm = on_confirm
+        self.paths = paths
 
     def compose(self) -> ComposeResult:
         yield Header(name="Confirm")
@@ -515,10 +694,15 @@ class ConfirmScreen(Screen):
     def on_key(self, event) -> None:
         try:
             app: FileTreeApp = self.app # type: ignore
-            if event.key.lower() == "y":
+            confirmed = event.key.lower() == "y"
+            if confirmed:
                 self.on_confirm()
             app.pop_screen()
-            app.action_refresh()
+            if confirmed:
+                if self.paths:
+                    app.refresh_paths(self.paths)
+                else:
+                    app.action_refresh()
         except Exception as e:
             app.pop_screen()
             app.bell()
@@ -533,7 +717,12 @@ def launch_interactive_tree(
     sort_order: str = "asc",
     ignore_hidden: bool = True,
     show_files: bool = True,
-    get_size_fn=None,
+    fuzzy: bool = False,
+    workers: int = 1,
+    size_index: SizeIndex | None = None,
+    disk_usage: bool = False,
+    one_file_system: bool = False,
+    watch_changes: bool = True,
     humanize_fn=None,
     known_extensions_cls=None,
     commands=[],
@@ -548,7 +737,12 @@ def launch_interactive_tree(
         sort_order=sort_order,
         ignore_hidden=ignore_hidden,
         show_files=show_files,
-        get_size_fn=get_size_fn,
+        fuzzy=fuzzy,
+        workers=workers,
+        size_index=size_index,
+        disk_usage=disk_usage,
+        one_file_system=one_file_system,
+        watch_changes=watch_changes,
         humanize_fn=humanize_fn,
         known_extensions_cls=known_extensions_cls,
         commands=commands,
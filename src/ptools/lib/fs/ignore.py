@@ -0,0 +1,161 @@
+"""
+Gitignore-style path patterns for pruning directory walks.
+
+Patterns follow ``.gitignore`` semantics:
+
+    *.log         - any file or directory named ``*.log``, at any depth
+    build/        - directories only
+    /dist         - anchored to the directory the pattern belongs to
+    docs/*.md     - a slash in the middle also anchors the pattern
+    **/cache      - ``**`` matches any number of directories
+    !keep.log     - negation; the last matching pattern wins
+
+Paths are matched relative to the walk root with ``/`` separators.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+
+__version__ = "0.1.0"
+
+GITIGNORE = '.gitignore'
+
+
+def _translate(pattern: str) -> str:
+    """Translate a glob pattern to a regex body (no anchors)."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', ']') else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """An ordered list of compiled gitignore-style patterns.
+
+    Instances are immutable; :meth:`extend` and :meth:`with_gitignore`
+    return a new set so that rules from a nested ``.gitignore`` only
+    apply below the directory that contains it.
+    """
+
+    def __init__(self, rules: tuple = ()):
+        # (regex, negate, dir_only)
+        self.rules = rules
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    @staticmethod
+    def compile(pattern: str, base: str = ''):
+        """Compile one pattern relative to ``base`` (``''`` is the root).
+
+        Returns ``None`` for blank lines and comments.
+        """
+        pattern = pattern.rstrip('\n')
+        if not pattern.strip() or pattern.startswith('#'):
+            return None
+        pattern = pattern.rstrip(' ')
+        negate = pattern.startswith('!')
+        if negate:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+
+        prefix = re.escape(base + '/') if base else ''
+        if not anchored:
+            prefix += '(?:.*/)?'
+        return re.compile(f'{prefix}{_translate(pattern)}\\Z'), negate, dir_only
+
+    def extend(self, patterns, base: str = '') -> IgnoreRules:
+        compiled = (self.compile(p, base) for p in patterns)
+        return IgnoreRules(self.rules + tuple(rule for rule in compiled if rule))
+
+    def with_gitignore(self, directory: str, base: str = '') -> IgnoreRules:
+        """Add the rules of ``directory``/.gitignore, if it is readable."""
+        try:
+            with open(os.path.join(directory, GITIGNORE), encoding='utf-8', errors='replace') as f:
+                return self.extend(f.readlines(), base)
+        except OSError:
+            return self
+
+    def match(self, relpath: str, is_dir: bool) -> bool:
+        """Whether ``relpath`` is matched (ignored), honoring negations."""
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath):
+                return not negate
+        return False
+
+
+class PathFilter:
+    """Include/exclude decisions for a walk rooted at a directory.
+
+    ``exclude`` patterns (plus ``.gitignore`` files when ``gitignore`` is
+    set) prune whole subtrees: an excluded directory is never scanned.
+    ``include`` patterns only select files, since any directory may hold
+    a matching file.
+
+    :param include: Glob patterns a file must match (any of them).
+    :param exclude: Glob patterns for files and directories to skip.
+    :param gitignore: Also honor ``.gitignore`` files found while walking.
+    """
+
+    def __init__(self, include=(), exclude=(), gitignore: bool = False):
+        self.include = IgnoreRules().extend(include)
+        self.exclude = IgnoreRules().extend(exclude)
+        self.gitignore = gitignore
+
+    def __bool__(self):
+        return bool(self.include or self.exclude or self.gitignore)
+
+    def enter(self, rules: IgnoreRules, directory: str, base: str, names) -> IgnoreRules:
+        """``.gitignore`` rules for the entries of ``directory``.
+
+        ``names`` are the directory's entry names, so no extra ``open``
+        is attempted where there is no ``.gitignore``.
+        """
+        if self.gitignore and GITIGNORE in names:
+            return rules.with_gitignore(directory, base)
+        return rules
+
+    def excluded(self, rules: IgnoreRules, relpath: str, is_dir: bool) -> bool:
+        """Whether an entry is excluded. Explicit ``exclude`` patterns
+        cannot be re-included by a ``.gitignore`` negation."""
+        return (bool(self.exclude) and self.exclude.match(relpath, is_dir)) \
+            or (bool(rules) and rules.match(relpath, is_dir))
+
+    def included(self, relpath: str) -> bool:
+        return not self.include or self.include.match(relpath, False)
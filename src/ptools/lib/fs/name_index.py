@@ -0,0 +1,283 @@
+"""
+Name index for filtering the interactive tree.
+
+:class:`NameIndex` is built once per scan from a :func:`size_tree`
+result. Every node gets an integer id; lowercase name trigrams map to
+the ids whose names contain them. A query that extends a recent one
+only re-checks that query's matches, so typing narrows instead of
+re-walking the tree; otherwise a substring query starts from the rarest
+of its trigrams and verifies each candidate.
+
+Fuzzy queries match names as subsequences and are scored the way fzf
+ranks them: points per matched character, bonuses for word boundaries,
+camelCase humps and consecutive runs, penalties for gaps
+(:func:`fuzzy_score`).
+
+:meth:`NameIndex.update` re-indexes one directory after
+:class:`~ptools.lib.fs.sizes.LiveSizeTree` refreshed it. Dropped ids
+are tombstoned rather than removed from the posting lists.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+
+__version__ = "0.1.0"
+
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = SCORE_MATCH // 2
+BONUS_CAMEL = BONUS_BOUNDARY + SCORE_GAP_EXTENSION
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+
+_DELIMITER, _LOWER, _UPPER, _DIGIT, _OTHER = range(5)
+
+
+def _char_class(char: str) -> int:
+    if char.islower():
+        return _LOWER
+    if char.isupper():
+        return _UPPER
+    if char.isdigit():
+        return _DIGIT
+    if char in "/_-. ":
+        return _DELIMITER
+    return _OTHER
+
+
+def _bonus(prev: int, cur: int) -> int:
+    if cur == _DELIMITER:
+        return 0
+    if prev == _DELIMITER:
+        return BONUS_BOUNDARY
+    if (prev == _LOWER and cur == _UPPER) or (prev != _DIGIT and cur == _DIGIT):
+        return BONUS_CAMEL
+    return 0
+
+
+def fuzzy_score(query: str, name: str) -> int | None:
+    """Score ``name`` against a lowercase ``query``; None if it does not match.
+
+    Like fzf's v1 algorithm: find the first window holding ``query`` as a
+    subsequence, shrink it from the right, then score the window.
+
+    :param query: Lowercase query; every character must appear in order.
+    :param name: Candidate name, original case (for camelCase bonuses).
+    """
+    lower = name.lower()
+    qi, start, end = 0, -1, -1
+    for i, char in enumerate(lower):
+        if char == query[qi]:
+            if start < 0:
+                start = i
+            qi += 1
+            if qi == len(query):
+                end = i + 1
+                break
+    if end < 0:
+        return None
+
+    qi = len(query) - 1
+    for i in range(end - 1, start - 1, -1):
+        if lower[i] == query[qi]:
+            qi -= 1
+            if qi < 0:
+                start = i
+                break
+
+    score = 0
+    in_gap = False
+    consecutive = 0
+    first_bonus = 0
+    qi = 0
+    prev = _char_class(name[start - 1]) if start else _DELIMITER
+    for i in range(start, end):
+        cur = _char_class(name[i])
+        if qi < len(query) and lower[i] == query[qi]:
+            bonus = _bonus(prev, cur)
+            if consecutive == 0:
+                first_bonus = bonus
+            else:
+                if bonus >= BONUS_BOUNDARY and bonus > first_bonus:
+                    first_bonus = bonus
+                bonus = max(bonus, first_bonus, BONUS_CONSECUTIVE)
+            score += SCORE_MATCH + (bonus * BONUS_FIRST_CHAR_MULTIPLIER if qi == 0 else bonus)
+            in_gap = False
+            consecutive += 1
+            qi += 1
+        else:
+            score += SCORE_GAP_EXTENSION if in_gap else SCORE_GAP_START
+            in_gap = True
+            consecutive = 0
+            first_bonus = 0
+        prev = cur
+    return score
+
+
+def _trigrams(name: str) -> set[str]:
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+def _is_subsequence(needle: str, haystack: str) -> bool:
+    it = iter(haystack)
+    return all(char in it for char in needle)
+
+
+class NameIndex:
+    """Name index over the nodes of a size tree.
+
+    Building only flattens the tree into id-indexed lists. The posting
+    list for a trigram is computed the first time a query needs it and
+    kept up to date afterwards, so the cost of indexing is paid for the
+    trigrams people actually type.
+
+    :param root: Root node of a :func:`~ptools.lib.fs.sizes.size_tree`
+        result.
+    """
+
+    # Recent results kept for narrowing and for backspace
+    MAX_RESULTS = 32
+
+    def __init__(self, root: dict):
+        self._nodes: list[dict | None] = []
+        self._names: list[str] = []
+        self._parents: list[int] = []
+        self._dirs: dict[str, int] = {}
+        self._children: dict[int, list[int]] = {}
+        self._grams: dict[str, array] = {}
+        # (query, fuzzy) -> matches of recent searches, oldest first
+        self._results: dict[tuple[str, bool], dict[int, int]] = {}
+        self._add(root, -1)
+
+    def _add(self, node: dict, parent: int) -> int:
+        i = len(self._nodes)
+        name = node["name"].lower()
+        self._nodes.append(node)
+        self._names.append(name)
+        self._parents.append(parent)
+        if self._grams:
+            for gram in _trigrams(name):
+                postings = self._grams.get(gram)
+                if postings is not None:
+                    postings.append(i)
+        if node["is_dir"]:
+            self._dirs[node["path"]] = i
+            self._children[i] = [self._add(child, i) for child in node["children"]]
+        return i
+
+    def _drop(self, i: int) -> None:
+        node = self._nodes[i]
+        self._nodes[i] = None
+        if node is not None and node["is_dir"]:
+            self._dirs.pop(node["path"], None)
+            for child in self._children.pop(i, ()):
+                self._drop(child)
+
+    def _postings(self, gram: str) -> array:
+        postings = self._grams.get(gram)
+        if postings is None:
+            postings = self._grams[gram] = array('l', (i for i, name in enumerate(self._names) if gram in name))
+        return postings
+
+    def update(self, node: dict) -> None:
+        """Re-index a directory node after its listing changed.
+
+        Subdirectory nodes that are still the same objects keep their
+        ids and subtrees; everything else is dropped and re-added.
+        """
+        i = self._dirs.get(node["path"])
+        if i is None:
+            return
+        kept = {id(child) for child in node["children"]}
+        children = []
+        for c in self._children.get(i, ()):
+            old = self._nodes[c]
+            if old is not None and old["is_dir"] and id(old) in kept:
+                children.append(c)
+            else:
+                self._drop(c)
+        reused = {id(self._nodes[c]) for c in children}
+        for child in node["children"]:
+            if id(child) not in reused:
+                children.append(self._add(child, i))
+        self._nodes[i] = node
+        self._children[i] = children
+        self._results.clear()
+
+    def remove(self, path: str) -> None:
+        """Forget a directory that no longer exists."""
+        i = self._dirs.get(path)
+        if i is None:
+            return
+        parent = self._parents[i]
+        if parent in self._children:
+            self._children[parent] = [c for c in self._children[parent] if c != i]
+        self._drop(i)
+        self._results.clear()
+
+    def search(self, query: str, fuzzy: bool = False) -> dict[int, int]:
+        """Ids of nodes whose names match ``query``, with their scores.
+
+        Substring matches all score 0. Fuzzy matches score by
+        :func:`fuzzy_score`; higher is better.
+        """
+        query = query.lower()
+        if not query:
+            return {}
+        key = (query, fuzzy)
+        matches = self._results.pop(key, None)
+        if matches is None:
+            matches = self._match(query, fuzzy, self._candidates(query, fuzzy))
+        self._results[key] = matches
+        if len(self._results) > self.MAX_RESULTS:
+            del self._results[next(iter(self._results))]
+        return matches
+
+    def _match(self, query: str, fuzzy: bool, candidates) -> dict[int, int]:
+        names, nodes = self._names, self._nodes
+        if not fuzzy:
+            return {i: 0 for i in candidates if nodes[i] is not None and query in names[i]}
+        pattern = re.compile('.*?'.join(map(re.escape, query)), re.DOTALL)
+        matches = {}
+        for i in candidates:
+            if nodes[i] is not None and pattern.search(names[i]):
+                score = fuzzy_score(query, nodes[i]["name"])
+                if score is not None:
+                    matches[i] = score
+        return matches
+
+    def _candidates(self, query: str, fuzzy: bool):
+        """Smallest known superset of the matches for ``query``."""
+        best = None
+        for (previous, previous_fuzzy), matches in self._results.items():
+            if previous_fuzzy != fuzzy:
+                continue
+            narrows = _is_subsequence(previous, query) if fuzzy else previous in query
+            if narrows and (best is None or len(matches) < len(best)):
+                best = matches
+        if best is not None:
+            return best
+        if not fuzzy and len(query) >= 3:
+            return min((self._postings(gram) for gram in _trigrams(query)), key=len)
+        return range(len(self._nodes))
+
+    def visible(self, query: str, fuzzy: bool = False) -> dict[str, int]:
+        """Paths to show for ``query``: matches and their ancestors.
+
+        Each path maps to the best score in its subtree, so siblings can
+        be ranked by their best match.
+        """
+        shown: dict[int, int] = {}
+        for i, score in self.search(query, fuzzy).items():
+            while i >= 0:
+                best = shown.get(i)
+                if best is not None and best >= score:
+                    break
+                shown[i] = score
+                i = self._parents[i]
+        nodes = self._nodes
+        # Matches and their ancestors are live; the filter only skips tombstones.
+        return {node["path"]: score for i, score in shown.items() if (node := nodes[i]) is not None}
@@ -0,0 +1,628 @@
+"""
+Directory size aggregation for ``ptools fs tree``.
+
+:func:`size_tree` walks a directory once, stats every entry exactly once
+and sums sizes bottom-up, so each directory's total is known without
+re-walking its subtree. Only the top ``max_depth`` levels are kept as
+nodes; deeper directories contribute to their ancestors' totals.
+
+Nodes are plain dicts, shared by the text renderer and the interactive
+tree::
+
+    {"name", "path", "is_dir", "is_symlink", "size", "depth", "children"}
+
+:class:`Usage` decides how an entry is charged: apparent bytes
+(``st_size``) or allocated blocks (``st_blocks``, as ``du`` reports).
+Either way a hard-linked inode is charged once, keyed by
+``(st_dev, st_ino)``, and the walk can stay on one filesystem.
+
+:class:`SizeIndex` persists per-directory sizes between runs, one file
+per measured root. A directory is listed again only when its
+``(mtime, inode)`` changed, so re-measuring a mostly unchanged tree
+costs one ``stat`` per directory.
+
+:class:`LiveSizeTree` keeps a :func:`size_tree` result current as paths
+change, re-listing only the affected directories and pushing the size
+difference up to their ancestors.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import stat
+import sys
+import time
+
+from ptools.lib.fs.scanner import Scanner
+
+__version__ = "0.1.0"
+
+INDEX_VERSION = 2
+# Directories modified this recently may change again within the same
+# mtime tick, so their listing is used but not persisted.
+RACY_NS = 2_000_000_000
+BLOCK_SIZE = 512
+HAS_BLOCKS = hasattr(os.stat_result, 'st_blocks')
+
+
+class Usage:
+    """How sizes are charged during one measurement.
+
+    Apparent mode sums ``st_size`` of non-directory entries. Disk mode
+    sums allocated blocks of every entry, directories included, so
+    sparse files count what they occupy (falls back to ``st_size`` where
+    the platform has no ``st_blocks``). In both modes an inode with
+    several hard links is charged at its first path only.
+
+    :param disk: Charge allocated blocks instead of apparent size.
+    :param one_filesystem: Do not cross into other filesystems.
+    """
+
+    def __init__(self, disk: bool = False, one_filesystem: bool = False):
+        self.disk = disk and HAS_BLOCKS
+        self.one_filesystem = one_filesystem
+        self.device = None
+        self._seen = set()
+
+    def size(self, st) -> int:
+        """Size of one entry, ignoring hard links."""
+        return st.st_blocks * BLOCK_SIZE if self.disk else st.st_size
+
+    def charge(self, st) -> int:
+        """Size to add to totals for a non-directory entry."""
+        if st.st_nlink > 1:
+            return self.link(st.st_dev, st.st_ino, st.st_size, getattr(st, 'st_blocks', 0))
+        return self.size(st)
+
+    def link(self, dev: int, ino: int, size: int, blocks: int) -> int:
+        key = (dev, ino)
+        if key in self._seen:
+            return 0
+        self._seen.add(key)
+        return blocks * BLOCK_SIZE if self.disk else size
+
+    def directory(self, st) -> int:
+        """A directory's own charge: its blocks in disk mode, else nothing."""
+        return st.st_blocks * BLOCK_SIZE if self.disk else 0
+
+    def enter(self, st) -> bool:
+        """Whether a directory with stat ``st`` is measured. The first
+        directory entered fixes the device for ``one_filesystem``."""
+        if not self.one_filesystem:
+            return True
+        if self.device is None:
+            self.device = st.st_dev
+        return st.st_dev == self.device
+
+
+class SizeIndex:
+    """On-disk index of directory sizes, validated by mtime and inode.
+
+    Each directory maps to ``[mtime_ns, inode, subdirs, sums, links]``:
+
+    - ``subdirs``: names of its subdirectories;
+    - ``sums``: ``[bytes, hidden_bytes, disk, hidden_disk]`` of its direct
+      non-directory entries with a single link, dot-files separately;
+    - ``links``: ``[dev, ino, bytes, blocks, hidden]`` of hard-linked
+      entries, so :class:`Usage` can charge each inode once across
+      directories.
+
+    Totals are summed from those on demand, so a change anywhere only
+    rescans the directory that changed.
+
+    A directory's mtime changes when entries are added, removed or
+    renamed, not when a file inside it is rewritten in place; such edits
+    are picked up once the directory itself changes. Callers that need
+    exact sizes should not use an index.
+
+    Only directories visited since loading are written back, so the file
+    holds what the last measurement of its root needed.
+
+    :param path: Index file; defaults to :meth:`path_for` ``root``.
+    :param root: Directory the index is used for.
+    """
+
+    _defaults: dict[str, SizeIndex] = {}
+
+    def __init__(self, path: str | None = None, root: str | None = None):
+        self.path = path or self.path_for(root if root is not None else os.sep)
+        self._dirs: dict | None = None
+        self._visited: set[str] = set()
+        self.dirty = False
+        self.rescans = 0
+
+    @staticmethod
+    def path_for(root: str) -> str:
+        """Default index file for ``root``, under ``~/.ptools/.cache/size_index``."""
+        digest = hashlib.blake2b(os.path.abspath(root).encode('utf-8', 'surrogateescape'), digest_size=8).hexdigest()
+        return os.path.expanduser(os.path.join('~', '.ptools', '.cache', 'size_index', f'{digest}.json'))
+
+    @classmethod
+    def default(cls, root: str) -> SizeIndex:
+        """Process-wide index for ``root``, saved at exit."""
+        root = os.path.abspath(root)
+        index = cls._defaults.get(root)
+        if index is None:
+            index = cls._defaults[root] = cls(root=root)
+            atexit.register(index.save)
+        return index
+
+    @property
+    def dirs(self) -> dict:
+        dirs = self._dirs
+        if dirs is None:
+            dirs = {}
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == INDEX_VERSION:
+                    dirs = data['dirs']
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+            self._dirs = dirs
+        return dirs
+
+    def save(self) -> None:
+        """Write the index atomically, if anything changed, dropping
+        directories that were not visited."""
+        if self._visited:
+            unvisited = self.dirs.keys() - self._visited
+            for key in unvisited:
+                del self.dirs[key]
+            self.dirty = self.dirty or bool(unvisited)
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'dirs': self.dirs}, f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError:
+            pass
+
+    def _entry(self, path: str, st) -> list:
+        self._visited.add(path)
+        entry = self.dirs.get(path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_ino:
+            return entry
+        return self._rescan(path, st, entry)
+
+    def _rescan(self, path: str, st, old: list | None) -> list:
+        self.rescans += 1
+        subdirs = []
+        sums = [0, 0, 0, 0]
+        links = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        entry_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if stat.S_ISDIR(entry_st.st_mode):
+                        subdirs.append(entry.name)
+                        continue
+                    hidden = entry.name.startswith('.')
+                    blocks = getattr(entry_st, 'st_blocks', 0)
+                    if entry_st.st_nlink > 1:
+                        links.append([entry_st.st_dev, entry_st.st_ino, entry_st.st_size, blocks, hidden])
+                    else:
+                        sums[hidden] += entry_st.st_size
+                        sums[2 + hidden] += blocks * BLOCK_SIZE if HAS_BLOCKS else entry_st.st_size
+        except OSError:
+            pass
+
+        entry = [st.st_mtime_ns, st.st_ino, subdirs, sums, links]
+        if old is not None:
+            self._forget(path, set(old[2]) - set(subdirs))
+        if time.time_ns() - st.st_mtime_ns >= RACY_NS:
+            self.dirs[path] = entry
+        else:
+            self.dirs.pop(path, None)
+        self.dirty = True
+        return entry
+
+    def invalidate(self, path: str) -> None:
+        """Forget ``path`` so its next total lists it again (for in-place
+        file edits, which leave the directory mtime unchanged)."""
+        if self.dirs.pop(path, None) is not None:
+            self.dirty = True
+
+    def _forget(self, path: str, names) -> None:
+        """Drop entries at and below subdirectories that no longer exist."""
+        for name in names:
+            gone = os.path.join(path, name)
+            below = gone + os.sep
+            for key in [k for k in self.dirs if k == gone or k.startswith(below)]:
+                del self.dirs[key]
+
+    def total(self, path: str, ignore_hidden: bool = False, usage: Usage | None = None) -> int:
+        """Aggregated size of directory ``path``; symlinks are not followed.
+
+        :param usage: Accounting to charge with; shared across calls of
+            one measurement so hard links are charged once overall.
+        """
+        usage = usage or Usage()
+        column = 2 if usage.disk else 0
+        total = 0
+        stack = [os.path.abspath(path)]
+        while stack:
+            directory = stack.pop()
+            try:
+                st = os.stat(directory)
+            except OSError:
+                continue
+            if not usage.enter(st):
+                continue
+            _, _, subdirs, sums, links = self._entry(directory, st)
+            total += usage.directory(st) + sums[column]
+            if not ignore_hidden:
+                total += sums[column + 1]
+            for dev, ino, size, blocks, hidden in links:
+                if not (ignore_hidden and hidden):
+                    total += usage.link(dev, ino, size, blocks)
+            for name in subdirs:
+                if not (ignore_hidden and name.startswith('.')):
+                    stack.append(os.path.join(directory, name))
+        return total
+
+
+def _node(name: str, path: str, is_dir: bool, is_symlink: bool, size: int, depth: int) -> dict:
+    return {
+        "name": name,
+        "path": path,
+        "is_dir": is_dir,
+        "is_symlink": is_symlink,
+        "size": size,
+        "depth": depth,
+        "children": [],
+    }
+
+
+def _total(scan, st, ignore_hidden: bool, usage: Usage) -> int:
+    """Size of a subtree that is summed but not kept."""
+    total = usage.directory(st)
+    for entry in scan.entries:
+        if ignore_hidden and entry.name.startswith('.'):
+            continue
+        try:
+            entry_st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        if stat.S_ISDIR(entry_st.st_mode):
+            child = scan.child(entry)
+            if child is not None:
+                total += _total(child, entry_st, ignore_hidden, usage)
+        else:
+            total += usage.charge(entry_st)
+    return total
+
+
+def _indexed(path: str, is_link: bool, depth: int, ignore_hidden: bool, usage: Usage, index: SizeIndex) -> dict:
+    """Node for a directory at the maximum depth, sized by ``index``."""
+    node = _node(os.path.basename(path) or path, path, True, is_link, 0, depth)
+    node["size"] = index.total(path, ignore_hidden, usage)
+    return node
+
+
+def _aggregate(scan, st, is_link: bool, depth: int, max_depth: int, ignore_hidden: bool, usage: Usage, index: SizeIndex | None) -> dict:
+    node = _node(
+        os.path.basename(scan.path) or scan.path, scan.path,
+        True, is_link, 0, depth,
+    )
+    keep = depth < max_depth
+    total = usage.directory(st)
+    for entry in scan.entries:
+        if ignore_hidden and entry.name.startswith('.'):
+            continue
+        try:
+            entry_st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+
+        if stat.S_ISDIR(entry_st.st_mode):
+            if keep and index is not None and depth + 1 == max_depth:
+                # Not listed by the scanner; the index lists it if needed.
+                if not usage.enter(entry_st):
+                    continue
+                child = _indexed(entry.path, stat.S_ISLNK(entry_st.st_mode), depth + 1, ignore_hidden, usage, index)
+                node["children"].append(child)
+                total += child["size"]
+                continue
+            child_scan = scan.child(entry)
+            if child_scan is None:
+                continue
+            if keep:
+                child = _aggregate(
+                    child_scan, entry_st, stat.S_ISLNK(entry_st.st_mode),
+                    depth + 1, max_depth, ignore_hidden, usage, index,
+                )
+                node["children"].append(child)
+                total += child["size"]
+            else:
+                total += _total(child_scan, entry_st, ignore_hidden, usage)
+        else:
+            total += usage.charge(entry_st)
+            if keep:
+                node["children"].append(_node(
+                    entry.name, entry.path, False, stat.S_ISLNK(entry_st.st_mode), usage.size(entry_st), depth + 1,
+                ))
+
+    node["size"] = total
+    return node
+
+
+def size_tree(
+    root: str,
+    max_depth: int,
+    ignore_hidden: bool = False,
+    workers: int = 1,
+    index: SizeIndex | None = None,
+    usage: Usage | None = None,
+) -> dict:
+    """Aggregate sizes under ``root`` in one post-order traversal.
+
+    Totals are charged by ``usage`` (apparent bytes by default) over
+    every entry below a directory, at any depth; symlinks are counted by
+    their own size and never followed. File nodes show their own size,
+    even when a hard link elsewhere already charged it to the totals.
+
+    :param root: Directory to measure.
+    :param max_depth: Levels below ``root`` kept as child nodes.
+    :param ignore_hidden: Skip dot-files and dot-directories entirely.
+    :param workers: :class:`Scanner` threads listing directories.
+    :param index: Take totals below ``max_depth`` from this
+        :class:`SizeIndex` instead of walking them. The caller saves it.
+    :param usage: :class:`Usage` to charge sizes with.
+    """
+    usage = usage or Usage()
+    root = os.path.abspath(root)
+    st = os.stat(root)
+    if not stat.S_ISDIR(st.st_mode):
+        st = os.lstat(root)
+        return _node(os.path.basename(root), root, False, stat.S_ISLNK(st.st_mode), usage.size(st), 0)
+    usage.enter(st)
+
+    # Runs on scanner threads; DirEntry caches the stat for the walk.
+    def descend(entry, relpath, context):
+        if ignore_hidden and entry.name.startswith('.'):
+            return False
+        if entry.is_symlink():
+            return False
+        if usage.one_filesystem:
+            try:
+                return entry.stat(follow_symlinks=False).st_dev == usage.device
+            except OSError:
+                return False
+        return True
+
+    if index is not None and max_depth <= 0:
+        return _indexed(root, os.path.islink(root), 0, ignore_hidden, usage, index)
+    # With an index, directories at ``max_depth`` are sized by it, not listed.
+    scan_depth = sys.maxsize if index is None else max_depth - 1
+    with Scanner(workers, descend=descend) as scanner:
+        return _aggregate(scanner.scan(root, scan_depth), st, os.path.islink(root), 0, max_depth, ignore_hidden, usage, index)
+
+
+def _shift(node: dict, depth: int) -> dict:
+    """Re-base the depths of a :func:`size_tree` result measured elsewhere."""
+    node["depth"] = depth
+    for child in node["children"]:
+        _shift(child, depth + 1)
+    return node
+
+
+class LiveSizeTree:
+    """A :func:`size_tree` result patched in place as paths change.
+
+    :meth:`refresh` maps changed paths to the nearest directory kept as a
+    node. Directories within ``max_depth`` are re-listed shallowly: their
+    files are re-stat'ed, existing subdirectory nodes are reused and only
+    new subdirectories are measured. Directories at ``max_depth`` are
+    re-totalled (through the index, if any). The size difference is then
+    added to every ancestor, so a change costs one directory, not the
+    tree.
+
+    Hard links are charged once within each measurement; a link whose
+    other path lies outside a refreshed directory may be counted twice
+    until the next full :meth:`scan`.
+
+    Node dicts keep their identity across refreshes, so references held
+    by a UI stay valid. Parameters are as for :func:`size_tree`.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_depth: int,
+        ignore_hidden: bool = False,
+        workers: int = 1,
+        index: SizeIndex | None = None,
+        disk: bool = False,
+        one_filesystem: bool = False,
+    ):
+        self.root = os.path.abspath(root)
+        self.max_depth = max_depth
+        self.ignore_hidden = ignore_hidden
+        self.workers = workers
+        self.index = index
+        self.disk = disk
+        self.one_filesystem = one_filesystem
+        self.data: dict | None = None
+        self._nodes: dict[str, dict] = {}
+        self._parents: dict[str, dict | None] = {}
+
+    def _usage(self) -> Usage:
+        usage = Usage(disk=self.disk, one_filesystem=self.one_filesystem)
+        try:
+            usage.enter(os.stat(self.root))
+        except OSError:
+            pass
+        return usage
+
+    def scan(self) -> dict:
+        """Measure the whole tree from scratch."""
+        self.data = size_tree(
+            self.root, self.max_depth,
+            ignore_hidden=self.ignore_hidden, workers=self.workers,
+            index=self.index, usage=self._usage(),
+        )
+        self._nodes.clear()
+        self._parents.clear()
+        self._register(self.data, None)
+        return self.data
+
+    def node(self, path: str) -> dict | None:
+        """The directory node for ``path``, if it is kept."""
+        return self._nodes.get(path)
+
+    def directories(self) -> list[str]:
+        """Paths of all kept directory nodes."""
+        return list(self._nodes)
+
+    def _register(self, node: dict, parent: dict | None) -> None:
+        if not node["is_dir"]:
+            return
+        self._nodes[node["path"]] = node
+        self._parents[node["path"]] = parent
+        for child in node["children"]:
+            self._register(child, node)
+
+    def _unregister(self, node: dict) -> None:
+        if not node["is_dir"]:
+            return
+        self._nodes.pop(node["path"], None)
+        self._parents.pop(node["path"], None)
+        for child in node["children"]:
+            self._unregister(child)
+
+    def _target(self, path: str) -> str | None:
+        """Nearest kept directory whose listing or total ``path`` affects."""
+        path = os.path.abspath(path)
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        if self.ignore_hidden:
+            parts = os.path.relpath(path, self.root).split(os.sep)
+            if any(part.startswith('.') for part in parts):
+                return None
+        if path in self._nodes:
+            return path
+        parent = os.path.dirname(path)
+        while parent not in self._nodes and parent.startswith(self.root + os.sep):
+            parent = os.path.dirname(parent)
+        return parent if parent in self._nodes else None
+
+    def refresh(self, paths) -> set[str]:
+        """Bring the tree up to date after ``paths`` changed.
+
+        :param paths: Created, deleted, moved or modified paths (files
+            or directories).
+        :returns: The directories that were re-measured.
+        """
+        if self.data is None:
+            return set()
+        targets = set()
+        for path in paths:
+            target = self._target(path)
+            if target is None:
+                continue
+            targets.add(target)
+            if self.index is not None:
+                self.index.invalidate(os.path.dirname(os.path.abspath(path)))
+                self.index.invalidate(os.path.abspath(path))
+
+        # Deepest first, so a parent re-listing reuses fresh child sizes.
+        refreshed = set()
+        for target in sorted(targets, key=lambda t: t.count(os.sep), reverse=True):
+            node = self._nodes.get(target)
+            if node is not None:
+                self._refresh(node)
+                refreshed.add(target)
+        return refreshed
+
+    def _refresh(self, node: dict) -> None:
+        path = node["path"]
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            self._remove(node)
+            return
+
+        usage = self._usage()
+        if node["depth"] >= self.max_depth:
+            if self.index is not None:
+                size = self.index.total(path, self.ignore_hidden, usage)
+            else:
+                size = size_tree(path, 0, ignore_hidden=self.ignore_hidden, workers=self.workers, usage=usage)["size"]
+        else:
+            size = self._relist(node, st, usage)
+        self._propagate(node, size - node["size"])
+        node["size"] = size
+
+    def _relist(self, node: dict, st, usage: Usage) -> int:
+        depth = node["depth"]
+        old_dirs = {child["path"]: child for child in node["children"] if child["is_dir"]}
+        children = []
+        total = usage.directory(st)
+        try:
+            with os.scandir(node["path"]) as it:
+                entries = list(it)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            if self.ignore_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                entry_st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(entry_st.st_mode):
+                child = old_dirs.pop(entry.path, None)
+                if child is None:
+                    if not usage.enter(entry_st):
+                        continue
+                    child = _shift(size_tree(
+                        entry.path, self.max_depth - depth - 1,
+                        ignore_hidden=self.ignore_hidden, workers=self.workers,
+                        index=self.index, usage=usage,
+                    ), depth + 1)
+                    self._register(child, node)
+                children.append(child)
+                total += child["size"]
+            else:
+                total += usage.charge(entry_st)
+                children.append(_node(
+                    entry.name, entry.path, False, stat.S_ISLNK(entry_st.st_mode), usage.size(entry_st), depth + 1,
+                ))
+
+        for gone in old_dirs.values():
+            self._unregister(gone)
+        node["children"] = children
+        return total
+
+    def _remove(self, node: dict) -> None:
+        parent = self._parents.get(node["path"])
+        if parent is None:
+            # The root itself is gone.
+            node["children"] = []
+            node["size"] = 0
+            return
+        parent["children"] = [child for child in parent["children"] if child is not node]
+        self._propagate(node, -node["size"])
+        self._unregister(node)
+
+    def _propagate(self, node: dict, delta: int) -> None:
+        if not delta:
+            return
+        parent = self._parents.get(node["path"])
+        while parent is not None:
+            parent["size"] += delta
+            parent = self._parents.get(parent["path"])
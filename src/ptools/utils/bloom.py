@@ -0,0 +1,99 @@
+"""Probabilistic set membership for bounded-memory de-duplication."""
+import math
+
+__version__ = "0.1.0"
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """SplitMix64 finalizer; spreads Python's ``hash`` over 64 bits."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class BloomFilter:
+    """Fixed-capacity Bloom filter over hashable Python objects.
+
+    Items are hashed with :func:`hash`, so equal objects (``1`` and
+    ``1.0``) collide exactly like they do in a :class:`set`. Membership
+    tests may return false positives at roughly ``error_rate`` once
+    ``capacity`` items were added, but never false negatives.
+
+    :param capacity: Number of items the filter is sized for.
+    :param error_rate: Target false-positive probability at capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        h = _mix64(hash(item) & _MASK64)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item) -> bool:
+        """Add ``item``; return ``True`` if it was (probably) not present."""
+        added = False
+        for p in self._positions(item):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the bit array."""
+        return len(self.bits)
+
+
+class ScalableBloomFilter:
+    """Bloom filter that grows by chaining larger filters as it fills.
+
+    Each new stage doubles the capacity and halves the error rate, so the
+    compounded false-positive rate stays below ``error_rate`` no matter
+    how many items are added.
+
+    :param initial_capacity: Capacity of the first stage.
+    :param error_rate: Overall target false-positive probability.
+    """
+
+    def __init__(self, initial_capacity: int = 65536, error_rate: float = 0.001):
+        self.error_rate = error_rate
+        self.stages = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def __contains__(self, item) -> bool:
+        return any(item in stage for stage in self.stages)
+
+    def add(self, item) -> bool:
+        """Add ``item``; return ``True`` if it was (probably) not present."""
+        if item in self:
+            return False
+        stage = self.stages[-1]
+        if stage.count >= stage.capacity:
+            stage = BloomFilter(stage.capacity * 2, stage.error_rate / 2)
+            self.stages.append(stage)
+        stage.add(item)
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by every stage's bit array."""
+        return sum(stage.nbytes for stage in self.stages)
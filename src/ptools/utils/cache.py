@@ -1,6 +1,9 @@
 """Cache utilities for ptools."""
+import hashlib
+import marshal
 from functools import wraps
 from enum import Enum
+from typing import TypeVar
 
 from ptools.utils.lazy import Lazy
 from ptools.utils.print import PrintUtils
@@ -8,23 +11,612 @@ from ptools.utils.print import PrintUtils
 __version__ = "0.1.0"
 
 
+DEFAULT_CACHE_DIR = "~/.ptools/.cache"
+
+
 class Short(Enum):
     """Short keys used to compactly persist cache entries on disk."""
 
     Timestamp = "t"
     Result = "r"
+    Accessed = "a"
+    Hits = "h"
+    Size = "s"
+
+
+class CacheVersionError(RuntimeError):
+    """A cache database was written with a different schema version."""
+
+    def __init__(self, path, version: int, expected: int):
+        super().__init__(f"{path}: cache schema version {version}, expected {expected}")
+        self.path = path
+        self.version = version
+        self.expected = expected
+
+
+_C = TypeVar("_C", bound="_Choice")
+
+
+class _Choice(Enum):
+    """Enum whose members can also be given by name, case-insensitively."""
+
+    @classmethod
+    def parse(cls: type[_C], value) -> _C:
+        return value if isinstance(value, cls) else cls[str(value).upper()]
+
+
+class Eviction(_Choice):
+    """Which entries :class:`CacheStore` drops first when over its limits.
+
+    Each value is the ``ORDER BY`` that ranks entries for eviction.
+    """
+
+    LRU = f"{Short.Accessed.value}"
+    LFU = f"{Short.Hits.value}, {Short.Accessed.value}"
+
+
+class Serializer(_Choice):
+    """How :class:`CacheStore` encodes results.
+
+    Each value is the one-byte tag that prefixes a stored payload, so a
+    store can read entries written with either serializer.
+    """
+
+    PICKLE = b"p"
+    JSON = b"j"
+
+    def dumps(self, value) -> bytes:
+        if self is Serializer.JSON:
+            import json
+            return self.value + json.dumps(value).encode()
+        import pickle
+        return self.value + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(payload: bytes):
+        tag, body = payload[:1], payload[1:]
+        if tag == Serializer.JSON.value:
+            import json
+            return json.loads(body)
+        import pickle
+        return pickle.loads(body)
+
+
+class UncacheableCall(TypeError):
+    """A call's arguments cannot be turned into a cache key.
+
+    :func:`disk_cache` runs such calls uncached. A custom ``key_fn`` may
+    raise it to opt a call out of caching.
+    """
+
+
+_ATOMS = frozenset({str, int, float, bool, bytes, type(None)})
+
+# Builtins whose subclasses are keyed by their builtin value
+_BASES: tuple[type, ...] = (tuple, list, dict, set, frozenset, str, int, float, bytes)
+
+
+def _structure(value):
+    """Reduce ``value`` to nested tuples of plain values for :func:`structural_key`.
+
+    Equal arguments get equal structures; containers are tagged with
+    their type so ``[1]``, ``(1,)`` and ``{1}`` stay distinct.
+    """
+    import os, dataclasses
+
+    kind = type(value)
+    if kind in _ATOMS:
+        return value
+    if kind is tuple or kind is list:
+        return (kind.__name__, tuple(_structure(v) for v in value))
+    if kind is dict:
+        items = ((repr(_structure(k)), _structure(v)) for k, v in value.items())
+        return ("dict", tuple(sorted(items, key=lambda item: item[0])))
+    if kind is set or kind is frozenset:
+        return ("set", tuple(sorted(repr(_structure(v)) for v in value)))
+
+    name = f"{kind.__module__}.{kind.__qualname__}"
+    if isinstance(value, Enum):
+        return (name, value.name)
+    if isinstance(value, os.PathLike):
+        return (name, os.fspath(value))
+    if dataclasses.is_dataclass(value):
+        return (name, tuple((f.name, _structure(getattr(value, f.name))) for f in dataclasses.fields(value)))
+    for base in _BASES:
+        if isinstance(value, base):
+            # Subclasses of builtins, e.g. named tuples
+            return (name, _structure(base(value)))
+    import pickle
+    try:
+        return (name, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception as e:
+        # Locks, sockets, generators...
+        raise UncacheableCall(f"cannot key a {name} argument: {e}") from e
+
+
+def structural_key(args: tuple, kwargs: dict, hex_length: int = 32) -> str:
+    """Default :func:`disk_cache` key: ``blake2b`` of the arguments' structure.
+
+    Plain str/int/float/bool/bytes/None arguments are encoded as they
+    are; containers, paths, enums and dataclasses are reduced
+    structurally first (:func:`_structure`) and anything else is
+    pickled; :class:`UncacheableCall` is raised if that fails. The encoding is ``marshal`` version 0, which is compact,
+    runs in C and does not depend on object identity or interning.
+
+    :param args: Positional arguments of the call.
+    :param kwargs: Keyword arguments of the call.
+    :param hex_length: Length of the returned hex digest (at most 128).
+    """
+    items = tuple(sorted(kwargs.items())) if kwargs else ()
+    if not {*map(type, args), *map(type, kwargs.values())} <= _ATOMS:
+        args = _structure(args)
+        items = tuple((k, _structure(v)) for k, v in items)
+    payload = marshal.dumps((args, items), 0)
+    return hashlib.blake2b(payload, digest_size=(hex_length + 1) // 2).hexdigest()[:hex_length]
+
+
+class CacheStore:
+    """Per-entry persistent storage for :func:`disk_cache`, backed by ``sqlite3``.
+
+    Each entry is one row keyed by its cache key, so a lookup reads one
+    row and a flush writes only the entries that changed since the last
+    flush. Writes, access times and hit counts are buffered in memory
+    and committed in a single transaction, either by :meth:`flush` or
+    once :attr:`FLUSH_EVERY` writes are pending; hits alone never cause
+    a commit. Results are stored as tagged :class:`Serializer` payloads,
+    pickle by default.
+
+    Recently used entries are also kept in an in-memory LRU front tier,
+    so repeated hits skip the database. On flush, rows beyond
+    ``max_entries`` or ``max_bytes`` are evicted by ``eviction`` order.
+    Hit, miss, stale-hit and eviction counters are persisted with the
+    entries; see :meth:`stats`.
+
+    A store is safe to share between threads, and several processes can
+    use the same file: sqlite serializes their commits and each flush
+    merges into what is on disk (see :meth:`flush`).
+
+    :param path: Database file; created on first use.
+    :param max_entries: Most entries to keep on disk; None for no limit.
+    :param max_bytes: Most bytes of keys and results to keep on disk;
+        None for no limit.
+    :param eviction: :class:`Eviction` policy, or its name ("lru", "lfu").
+    :param memory_entries: Size of the in-memory front tier.
+    :param serializer: :class:`Serializer` for new entries, or its name
+        ("pickle", "json").
+    :param read_only: Open the database read-only, for inspection. It
+        is never created, written or migrated; a database with another schema
+        version raises :class:`CacheVersionError` instead of being
+        recreated.
+    """
+
+    # Pending writes that trigger a flush on their own
+    FLUSH_EVERY = 1000
+
+    # Seconds to wait for another process's write lock
+    BUSY_TIMEOUT = 30.0
+
+    # Bump when the schema changes; older databases are recreated.
+    SCHEMA_VERSION = 3
+
+    _SCHEMA = (
+        f"CREATE TABLE IF NOT EXISTS entries ("
+        f"key TEXT PRIMARY KEY, {Short.Timestamp.value} REAL NOT NULL, {Short.Result.value} BLOB NOT NULL, "
+        f"{Short.Accessed.value} REAL NOT NULL, {Short.Hits.value} INTEGER NOT NULL DEFAULT 0, "
+        f"{Short.Size.value} INTEGER NOT NULL"
+        f") WITHOUT ROWID",
+        f"CREATE INDEX IF NOT EXISTS entries_by_age ON entries ({Short.Timestamp.value})",
+        f"CREATE INDEX IF NOT EXISTS entries_by_access ON entries ({Short.Accessed.value})",
+        "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID",
+    )
+
+    COUNTERS = ("hits", "misses", "stale", "evictions")
+
+    def __init__(
+        self,
+        path,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        eviction: Eviction | str = Eviction.LRU,
+        memory_entries: int = 256,
+        serializer: Serializer | str = Serializer.PICKLE,
+        read_only: bool = False,
+    ):
+        from collections import OrderedDict
+        from threading import RLock
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction = Eviction.parse(eviction)
+        self.memory_entries = memory_entries
+        self.serializer = Serializer.parse(serializer)
+        self.read_only = read_only
+        # Guards everything below, including the shared connection
+        self._lock = RLock()
+        self._db = Lazy(self._connect)
+        self._opened = False
+        # key -> (timestamp, result), or None for a pending delete
+        self._pending: dict = {}
+        # key -> [last access, hits since last flush]
+        self._touched: dict = {}
+        # In-memory front tier: key -> (timestamp, result), oldest first
+        self._memory: OrderedDict = OrderedDict()
+        # Counter increments not yet persisted
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def _connect(self):
+        import sqlite3
+        from pathlib import Path
+
+        if self.read_only:
+            uri = f"{Path(self.path).absolute().as_uri()}?mode=ro"
+            db = sqlite3.connect(uri, uri=True, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+            try:
+                version = db.execute("PRAGMA user_version").fetchone()[0]
+            except sqlite3.Error:
+                db.close()
+                raise
+            if version != self.SCHEMA_VERSION:
+                db.close()
+                raise CacheVersionError(self.path, version, self.SCHEMA_VERSION)
+            self._opened = True
+            return db
+
+        db = sqlite3.connect(str(self.path), timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with db:
+                # Under the write lock, so two processes creating the same
+                # database cannot drop each other's tables.
+                db.execute("BEGIN IMMEDIATE")
+                if db.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                    db.execute("DROP TABLE IF EXISTS entries")
+                    db.execute("DROP TABLE IF EXISTS stats")
+                    db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                for statement in self._SCHEMA:
+                    db.execute(statement)
+        except sqlite3.Error:
+            # e.g. not a database; the next access tries again
+            db.close()
+            raise
+        self._opened = True
+        return db
 
-def disk_cache(cache_dir=None, max_cache_age=3600,  hex_length=32):
+    def _remember(self, key: str, entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str):
+        if key in self._pending:
+            return self._pending[key]
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        row = self._db.value.execute(
+            f"SELECT {Short.Timestamp.value}, {Short.Result.value} FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], Serializer.loads(row[1]))
+        self._remember(key, entry)
+        return entry
+
+    def get(self, key: str, max_age: float | None = None, stale: float = 0.0):
+        """Return ``(timestamp, result)`` for ``key``, or None if absent.
+
+        Counts a hit or a miss. With ``max_age``, an entry older than
+        ``max_age + stale`` seconds is a miss and is deleted; one older
+        than ``max_age`` only is still returned and counted as stale.
+        """
+        import time
+
+        with self._lock:
+            entry = self._lookup(key)
+            now = time.time()
+            age = now - entry[0] if entry is not None else 0.0
+            if entry is not None and max_age is not None and age >= max_age + stale:
+                self.delete(key)
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            if max_age is not None and age >= max_age:
+                self.counters["stale"] += 1
+            touch = self._touched.setdefault(key, [now, 0])
+            touch[0] = now
+            touch[1] += 1
+            return entry
+
+    def put(self, key: str, timestamp: float, result) -> None:
+        """Buffer an entry; it is written on the next flush."""
+        entry = (timestamp, result)
+        with self._lock:
+            self._pending[key] = entry
+            self._remember(key, entry)
+            self._maybe_flush()
+
+    def delete(self, key: str) -> None:
+        """Buffer the removal of an entry."""
+        with self._lock:
+            self._pending[key] = None
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self.flush()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._db.value.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Entry count, stored bytes and hit/miss/stale/eviction counters."""
+        with self._lock:
+            self.flush()
+            db = self._db.value
+            entries, size = db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({Short.Size.value}), 0) FROM entries"
+            ).fetchone()
+            stats = dict.fromkeys(self.COUNTERS, 0)
+            stats.update(db.execute("SELECT name, value FROM stats").fetchall())
+        return {"entries": entries, "bytes": size, **stats}
+
+    def flush(self, max_age: float | None = None) -> None:
+        """Write pending changes in one transaction, then enforce the limits.
+
+        A no-op when nothing changed. Rows are upserted and counters are
+        added to, so processes sharing the file merge their changes
+        instead of overwriting each other. If the commit fails (e.g. the
+        database stayed locked past :attr:`BUSY_TIMEOUT`), the changes
+        stay pending for the next flush. A read-only store never writes;
+        its changes only live in memory.
+
+        :param max_age: If given, also drop entries older than this many
+            seconds.
+        """
+        if self.read_only:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            counters, self.counters = self.counters, dict.fromkeys(self.COUNTERS, 0)
+            if not pending and not touched and not any(counters.values()):
+                return
+            try:
+                self._write(pending, dict(touched), counters, max_age)
+            except Exception:
+                for key, entry in pending.items():
+                    self._pending.setdefault(key, entry)
+                for key, touch in touched.items():
+                    self._touched.setdefault(key, touch)
+                for name, value in counters.items():
+                    self.counters[name] += value
+                raise
+
+    def _write(self, pending: dict, touched: dict, counters: dict, max_age: float | None) -> None:
+        import pickle, time
+
+        now = time.time()
+        rows, gone = [], []
+        for key, entry in pending.items():
+            if entry is None:
+                gone.append((key,))
+                continue
+            try:
+                payload = self.serializer.dumps(entry[1])
+            except (TypeError, ValueError, AttributeError, pickle.PicklingError):
+                # Not serializable; keep it for this run only
+                continue
+            hits = touched.pop(key, [now, 0])[1]
+            rows.append((key, entry[0], payload, now, hits, len(key) + len(payload)))
+
+        a, h = Short.Accessed.value, Short.Hits.value
+        db = self._db.value
+        with db:
+            # Take the write lock up front; other processes wait on it
+            # for up to BUSY_TIMEOUT.
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany("DELETE FROM entries WHERE key = ?", gone)
+            db.executemany(
+                f"INSERT OR REPLACE INTO entries "
+                f"(key, {Short.Timestamp.value}, {Short.Result.value}, {a}, {h}, {Short.Size.value}) "
+                f"VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.executemany(
+                f"UPDATE entries SET {a} = MAX({a}, ?), {h} = {h} + ? WHERE key = ?",
+                [(accessed, hits, key) for key, (accessed, hits) in touched.items()],
+            )
+            if max_age is not None:
+                db.execute(f"DELETE FROM entries WHERE {Short.Timestamp.value} < ?", (now - max_age,))
+            counters = {**counters, "evictions": counters["evictions"] + self._evict(db)}
+            db.executemany(
+                "INSERT INTO stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                [(name, value) for name, value in counters.items() if value],
+            )
+
+    def _evict(self, db) -> int:
+        """Delete rows beyond the limits, worst-ranked first; return how many."""
+        if self.max_entries is None and self.max_bytes is None:
+            return 0
+        entries, size = db.execute(
+            f"SELECT COUNT(*), COALESCE(SUM({Short.Size.value}), 0) FROM entries"
+        ).fetchone()
+        excess_entries = entries - self.max_entries if self.max_entries is not None else 0
+        excess_bytes = size - self.max_bytes if self.max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return 0
+
+        victims = []
+        cursor = db.execute(f"SELECT key, {Short.Size.value} FROM entries ORDER BY {self.eviction.value}")
+        for key, entry_size in cursor:
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            victims.append((key,))
+            excess_entries -= 1
+            excess_bytes -= entry_size
+        cursor.close()
+        db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        for (key,) in victims:
+            self._memory.pop(key, None)
+        return len(victims)
+
+    def close(self) -> None:
+        """Flush and close the database connection."""
+        with self._lock:
+            self.flush()
+            if self._opened:
+                self._db.value.close()
+                self._db = Lazy(self._connect)
+                self._opened = False
+
+
+class _SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result.
+
+    :meth:`do` and :meth:`spawn` serve threads, :meth:`do_async` and
+    :meth:`start` serve coroutines on an event loop. A failure is raised
+    to every waiter and nothing is remembered afterwards.
+    """
+
+    def __init__(self):
+        from threading import Lock
+
+        self._lock = Lock()
+        self._calls: dict = {}
+        self._tasks: dict = {}
+
+    def _claim(self, key):
+        """Return ``(future, leader)``; the leader must run the call."""
+        from concurrent.futures import Future
+
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def do(self, key, fn):
+        """Call ``fn()``, or wait for the call already running for ``key``."""
+        future, leader = self._claim(key)
+        return self._lead(key, future, fn) if leader else future.result()
+
+    def spawn(self, key, fn) -> bool:
+        """Call ``fn()`` on a daemon thread unless a call for ``key`` is running.
+
+        Returns whether a thread was started. Its errors are dropped.
+        """
+        import threading
+
+        future, leader = self._claim(key)
+        if leader:
+            threading.Thread(target=self._background, args=(key, future, fn), daemon=True).start()
+        return leader
+
+    def _background(self, key, future, fn):
+        try:
+            self._lead(key, future, fn)
+        except Exception:
+            pass
+
+    def _lead(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def start(self, key, coro_fn):
+        """Start ``coro_fn()`` as a task unless one is running for ``key``."""
+        import asyncio
+
+        slot = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(slot)
+        if task is None:
+            task = self._tasks[slot] = asyncio.ensure_future(coro_fn())
+
+            def done(task):
+                self._tasks.pop(slot, None)
+                if not task.cancelled():
+                    # Mark the exception retrieved; awaiting callers re-raise it.
+                    task.exception()
+
+            task.add_done_callback(done)
+        return task
+
+    async def do_async(self, key, coro_fn):
+        """Await ``coro_fn()``, or the task already running for ``key``."""
+        import asyncio
+
+        # Shielded, so one cancelled caller does not cancel the others.
+        return await asyncio.shield(self.start(key, coro_fn))
+
+
+def disk_cache(
+    cache_dir=None,
+    max_cache_age: float = 3600,
+    hex_length=32,
+    max_entries=None,
+    max_bytes=None,
+    eviction="lru",
+    memory_entries=256,
+    key_fn=None,
+    serializer="pickle",
+    stale_while_revalidate: float = 0,
+):
     """A decorator to cache function results on disk with a specified maximum age.
-    Stores cache as a JSON file in the specified cache directory.
-    Cache keys are generated based on function name and arguments.
+    Stores entries in a per-function SQLite database (:class:`CacheStore`)
+    in the specified cache directory.
+    Cache keys are generated from the arguments by ``key_fn``
+    (:func:`structural_key` by default), one database per function name.
     This decorator flushes to disk on program exit and provides a manual flush method.
 
     This is useful for caching results across runs of the command line tool.
 
+    ``async def`` functions are supported; the wrapper is then a coroutine
+    function too. Concurrent misses for the same key, from threads or
+    tasks, run the function once and share its result.
+
+    If the cache file cannot be used (corrupt, not a database, locked past
+    :attr:`CacheStore.BUSY_TIMEOUT`), calls run uncached instead of failing.
+
     :param cache_dir: Directory to store cache files. Defaults to ~/.ptools/.cache.
     :param max_cache_age: Maximum age of cache entries in seconds. Defaults to 3600 (1 hour).
     :param hex_length: Length of the hexadecimal cache key. Defaults to 32.
+        Ignored when ``key_fn`` is given.
+    :param max_entries: Most entries to keep on disk. Defaults to no limit.
+    :param max_bytes: Most bytes to keep on disk. Defaults to no limit.
+    :param eviction: What to evict first over a limit: "lru" (least
+        recently used, the default) or "lfu" (least frequently used).
+    :param memory_entries: Entries kept in memory in front of the disk
+        cache. Defaults to 256.
+    :param key_fn: ``key_fn(args, kwargs) -> str`` building the cache key
+        of a call. Defaults to :func:`structural_key`. Calls for which
+        it raises :class:`UncacheableCall` (e.g. an unpicklable argument)
+        run uncached.
+    :param serializer: How results are stored: "pickle" (the default; any
+        picklable result) or "json".
+    :param stale_while_revalidate: Seconds past ``max_cache_age`` during
+        which an expired entry is still returned at once while a
+        background thread (or task, for ``async def``) recomputes it.
+        Defaults to 0 (callers wait for the recomputation).
 
     Example::
 
@@ -34,75 +626,95 @@ def disk_cache(cache_dir=None, max_cache_age=3600,  hex_length=32):
             time.sleep(5)
             return x * x
     """
-    import os, json, hashlib, time, atexit
+    import os, time, atexit, inspect, sqlite3
+    from functools import partial
     from pathlib import Path
 
-    cache_dir = cache_dir or Path(os.path.expanduser("~/.ptools/.cache"))
+    cache_dir = Path(cache_dir) if cache_dir else Path(os.path.expanduser(DEFAULT_CACHE_DIR))
     cache_dir.mkdir(parents=True, exist_ok=True)
 
     def decorator(func):
-        cache_file_path = cache_dir / f"{func.__name__}.json"
-        dirty = False
+        store = CacheStore(
+            cache_dir / f"{func.__name__}.sqlite3",
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            eviction=eviction,
+            memory_entries=memory_entries,
+            serializer=serializer,
+        )
+        make_key = key_fn or partial(structural_key, hex_length=hex_length)
+        flights = _SingleFlight()
 
-        def get_cache_from_disk() -> dict:
-            if cache_file_path.exists():
-                try:
-                    with open(cache_file_path, "r", encoding="utf-8") as f:
-                        return json.load(f)
-                except Exception:
-                    return {}
-            return {}
+        def lookup(args, kwargs):
+            """Return ``(key, entry, stale)`` for a call; the key is None
+            if the call cannot be cached."""
+            try:
+                cache_key = make_key(args, kwargs)
+            except UncacheableCall:
+                return None, None, False
+            try:
+                entry = store.get(cache_key, max_age=max_cache_age, stale=stale_while_revalidate)
+            except sqlite3.Error:
+                return None, None, False
+            stale = entry is not None and time.time() - entry[0] >= max_cache_age
+            return cache_key, entry, stale
 
-        l_persisted = Lazy(lambda: get_cache_from_disk())
+        def remember(cache_key, timestamp, result):
+            try:
+                store.put(cache_key, timestamp, result)
+            except sqlite3.Error:
+                pass
 
-        def make_key(args, kwargs):
-            key_str = json.dumps({'args': args, 'kwargs': kwargs}, sort_keys=True)
-            return hashlib.sha256(key_str.encode()).hexdigest()[:hex_length]
+        if inspect.iscoroutinefunction(func):
+            async def compute_async(cache_key, args, kwargs):
+                now = time.time()
+                result = await func(*args, **kwargs)
+                remember(cache_key, now, result)
+                return result
 
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            nonlocal dirty
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key, entry, stale = lookup(args, kwargs)
+                if cache_key is None:
+                    return await func(*args, **kwargs)
+                if entry is not None:
+                    if stale:
+                        flights.start(cache_key, lambda: compute_async(cache_key, args, kwargs))
+                    return entry[1]
+                return await flights.do_async(cache_key, lambda: compute_async(cache_key, args, kwargs))
 
-            cache_key = make_key(args, kwargs)
-            now = time.time()
-            persisted = l_persisted.value
-
-            if cache_key in persisted:
-                entry = persisted[cache_key]
-                if now - entry[Short.Timestamp.value] < max_cache_age:
-                    return entry[Short.Result.value]
-                else:
-                    del persisted[cache_key]
-                    dirty = True
-
-            result = func(*args, **kwargs)
-            persisted[cache_key] = {Short.Result.value: result, Short.Timestamp.value: now}
-            dirty = True
-            return result
+            wrapper = async_wrapper
+        else:
+            def compute(cache_key, args, kwargs):
+                now = time.time()
+                result = func(*args, **kwargs)
+                remember(cache_key, now, result)
+                return result
 
-        def _flush():
-            nonlocal dirty
-            if not dirty:
-                return
+            @wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                cache_key, entry, stale = lookup(args, kwargs)
+                if cache_key is None:
+                    return func(*args, **kwargs)
+                if entry is not None:
+                    if stale:
+                        # A failed refresh keeps the stale value; the next call retries.
+                        flights.spawn(cache_key, lambda: compute(cache_key, args, kwargs))
+                    return entry[1]
+                return flights.do(cache_key, lambda: compute(cache_key, args, kwargs))
 
-            persisted = l_persisted.value
-            now = time.time()
-            to_write = {
-                k: v for k, v in persisted.items()
-                if now - v[Short.Timestamp.value] < max_cache_age
-            }
+            wrapper = sync_wrapper
 
+        def _flush():
             try:
-                tmp = str(cache_file_path) + ".tmp"
-                with open(tmp, "w", encoding="utf-8") as f:
-                    json.dump(to_write, f)
-                os.replace(tmp, cache_file_path)
+                store.flush(max_age=max_cache_age + stale_while_revalidate)
             except Exception:
                 pass
 
         atexit.register(_flush)
         wrapper.flush = _flush # type: ignore
+        wrapper.store = store # type: ignore
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
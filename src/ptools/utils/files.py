@@ -7,8 +7,6 @@ import requests
 from functools import wraps
 from typing import Optional
 
-from ptools.utils.cache import disk_cache
-
 __version__ = "0.1.0"
 
 
@@ -72,29 +70,22 @@ def resolve_input(allow_stdin=True):
     return decorator
 
 
-@disk_cache(max_cache_age=3600)
-def get_size(path, ignore_hidden=False):
+def get_size(path, ignore_hidden=False, disk=False):
     """Return the total byte size of ``path`` (file or directory tree).
 
-    Results are cached on disk for one hour via :func:`disk_cache`.
+    Directory totals come from the persistent
+    :class:`~ptools.lib.fs.sizes.SizeIndex`, so only directories whose
+    mtime changed since the last call are listed again. Hard-linked
+    files are counted once.
 
     :param path: File or directory to measure.
     :param ignore_hidden: Skip dot-files when traversing directories.
+    :param disk: Count allocated disk blocks (like ``du``) instead of
+        apparent file sizes.
     """
-    total_size = 0
-    if os.path.isfile(path):
-        return os.path.getsize(path)
-
-    try:
-        with os.scandir(path) as it:
-            for entry in it:
-                if ignore_hidden and entry.name.startswith('.'):
-                    continue
-                if entry.is_dir(follow_symlinks=False):
-                    total_size += get_size(entry.path, ignore_hidden=ignore_hidden)
-                elif entry.is_file(follow_symlinks=False):
-                    total_size += get_size(entry.path, ignore_hidden=ignore_hidden)
-    except PermissionError:
-        pass
-
-    return total_size
\ No newline at end of file
+    from ptools.lib.fs.sizes import SizeIndex, Usage
+
+    usage = Usage(disk=disk)
+    if not os.path.isdir(path):
+        return usage.size(os.stat(path))
+    return SizeIndex.default(path).total(path, ignore_hidden=ignore_hidden, usage=usage)
@@ -9,15 +9,18 @@ def test(
     regex: bool = False,
 
 ):
-    """Test if a string matches a query, optionally using regex."""
-    def matcher(s: str) -> bool:
-        if regex:
-            return re.search(str(query), s) is not None
-        elif query is None:
-            return True
-        else:
-            return query in s
-    return matcher
+    """Test if a string matches a query, optionally using regex.
+
+    The regex is compiled once, when the matcher is built.
+
+    :raises re.error: if ``regex`` is set and ``query`` is not a valid pattern.
+    """
+    if regex:
+        search = re.compile(str(query)).search
+        return lambda s: search(s) is not None
+    if query is None:
+        return lambda s: True
+    return lambda s: query in s
 
 def filter_dict_by_key(
     dict: dict,
@@ -34,6 +34,35 @@ class FromHumanized:
                     raise ValueError(f"Invalid size format: {size_str}")
         raise ValueError(f"Unknown size unit in: {size_str}")
 
+    @staticmethod
+    def from_humanized_duration(duration_str: str) -> float:
+        """Parse a string like ``"5m"`` or ``"1.5h"`` into seconds.
+
+        A bare number is taken as seconds.
+
+        :raises ValueError: if the unit is unknown or the number is malformed.
+        """
+        nstr = duration_str.replace(' ', '').lower()
+        units = {
+            'ms': 0.001,
+            's': 1,
+            'm': 60,
+            'h': 3600,
+            'd': 86400,
+            'w': 604800,
+        }
+
+        for unit, multiplier in units.items():
+            if nstr.endswith(unit):
+                try:
+                    return float(nstr[:-len(unit)]) * multiplier
+                except ValueError:
+                    raise ValueError(f"Invalid duration format: {duration_str}")
+        try:
+            return float(nstr)
+        except ValueError:
+            raise ValueError(f"Unknown duration unit in: {duration_str}")
+
 if __name__ == "__main__":
     assert (FromHumanized.from_humanized_size("10B") == 10)
     assert (FromHumanized.from_humanized_size("1KB") == 1024)
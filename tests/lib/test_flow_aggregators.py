@@ -0,0 +1,110 @@
+"""Tests for ptools.lib.flow.aggregators and ptools.lib.flow.windows."""
+import random
+import statistics
+from datetime import datetime, timezone
+
+import pytest
+
+from ptools.lib.flow.aggregators import AGGREGATORS, AggregatorSet
+from ptools.lib.flow.windows import CountWindows, TimeWindows, to_timestamp
+
+
+def _batch(window, names, top_k):
+    expected = {
+        'count': len(window),
+        'sum': sum(window),
+        'mean': statistics.mean(window),
+        'min': min(window),
+        'max': max(window),
+        'var': statistics.variance(window) if len(window) > 1 else None,
+        'stddev': statistics.stdev(window) if len(window) > 1 else None,
+        'topk': sorted(window, reverse=True)[:top_k],
+    }
+    return {name: expected[name] for name in names}
+
+
+class TestAggregators:
+    def test_sliding_updates_match_batch(self):
+        rng = random.Random(7)
+        values = [rng.randint(-50, 50) for _ in range(300)]
+        names = list(AGGREGATORS)
+        aggs = AggregatorSet(names, top_k=3)
+        for i, value in enumerate(values):
+            aggs.add(value)
+            if i >= 10:
+                aggs.remove(values[i - 10])
+            got, want = aggs.result(), _batch(values[max(0, i - 9):i + 1], names, 3)
+            for name in names:
+                assert got[name] == pytest.approx(want[name]), name
+
+    def test_empty_results(self):
+        assert AggregatorSet(list(AGGREGATORS)).result() == {
+            'count': 0, 'sum': 0, 'mean': None, 'min': None, 'max': None,
+            'var': None, 'stddev': None, 'topk': [],
+        }
+
+    def test_non_numeric_rejected_before_any_update(self):
+        aggs = AggregatorSet(['count', 'sum'])
+        with pytest.raises(TypeError):
+            aggs.add("a")
+        assert aggs.result() == {'count': 0, 'sum': 0}
+
+    def test_min_max_accept_any_comparable(self):
+        aggs = AggregatorSet(['min', 'max', 'topk'], top_k=2)
+        for word in ["pear", "apple", "zoo"]:
+            aggs.add(word)
+        assert aggs.result() == {'min': "apple", 'max': "zoo", 'topk': ["zoo", "pear"]}
+
+
+class TestCountWindows:
+    def test_tumbling_emits_partial_tail(self):
+        windows = CountWindows(3, 3, ['sum'])
+        out = [w for v in range(1, 8) for w in windows.push(v)] + list(windows.close())
+        assert out == [
+            {'start': 0, 'end': 3, 'sum': 6},
+            {'start': 3, 'end': 6, 'sum': 15},
+            {'start': 6, 'end': 7, 'sum': 7},
+        ]
+
+    def test_sliding_covers_last_size_items(self):
+        windows = CountWindows(4, 2, ['min', 'max'])
+        out = [w for v in [5, 1, 4, 2, 3, 6] for w in windows.push(v)] + list(windows.close())
+        assert out == [
+            {'start': 0, 'end': 2, 'min': 1, 'max': 5},
+            {'start': 0, 'end': 4, 'min': 1, 'max': 5},
+            {'start': 2, 'end': 6, 'min': 2, 'max': 6},
+        ]
+
+
+class TestTimeWindows:
+    def test_tumbling_skips_empty_windows(self):
+        windows = TimeWindows(10, 10, ['count'])
+        out = [w for t in [1, 5, 12, 45] for w in windows.push(t, t)] + list(windows.close())
+        assert out == [
+            {'start': 0, 'end': 10, 'count': 2},
+            {'start': 10, 'end': 20, 'count': 1},
+            {'start': 40, 'end': 50, 'count': 1},
+        ]
+
+    def test_sliding_windows_overlap(self):
+        windows = TimeWindows(10, 5, ['sum'])
+        out = [w for t in [1, 6, 11] for w in windows.push(t, t)] + list(windows.close())
+        assert out == [
+            {'start': -5, 'end': 5, 'sum': 1},
+            {'start': 0, 'end': 10, 'sum': 7},
+            {'start': 5, 'end': 15, 'sum': 17},
+            {'start': 10, 'end': 20, 'sum': 11},
+        ]
+
+    def test_late_items_are_dropped(self, capsys):
+        windows = TimeWindows(10, 10, ['count'])
+        out = [w for t in [1, 15, 3, 16] for w in windows.push(t, t)] + list(windows.close())
+        assert [w['count'] for w in out] == [1, 2]
+        assert "late item" in capsys.readouterr().err
+
+    def test_timestamps(self):
+        dt = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert to_timestamp(dt) == to_timestamp(dt.isoformat()) == dt.timestamp()
+        assert to_timestamp(3) == 3.0
+        with pytest.raises(TypeError):
+            to_timestamp(True)
@@ -1,7 +1,15 @@
 """Tests for ptools.lib.flow.grammar - Lark parser + StreamTransformer."""
 import pytest
 
-from ptools.lib.flow.grammar import AttributeDict, StreamTransformer, parser
+from ptools.lib.flow.grammar import (
+    AttributeDict,
+    StreamTransformer,
+    fast_parse,
+    parse_json,
+    parse_python,
+    parse_value,
+    parser,
+)
 
 
 def _parse(text):
@@ -93,3 +101,63 @@ class TestQuoted:
 
     def test_backtick_quoted(self):
         assert _parse("`code`") == "code"
+
+
+def _same(a, b):
+    """Structural equality that also compares container types."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_same(a[k], b[k]) for k in a)
+    return a == b
+
+
+class TestParseValue:
+    @pytest.mark.parametrize("src", [
+        "42", "+5", "-0", "007", "1.", ".5", "1e3", "1E-2", "1.5e", "0x10", "1_000",
+        "true", "tRuE", "None", "null", "hello", "hello world", "true story", "1 2",
+        "-", "--5", "a:b", "x#y", "hello # c", "http://x.com",
+        '"a"', "'a'", "`x`", '"a\\"b"', '"""a"""', "'a' 'b'",
+        "[]", "[null]", "[1, null]", "[[null]]", "[1,foo]", "[1,2,]", "[1, 2] junk",
+        "{}", "{1}", "{1: 2}", '{"a": 1}', '{"a": {}}', '{"a":[null]}', '{"a": 1, "a": 2}',
+        '["a#b"]', '[1.0, 2e3]', '[true, false, null]', '{"a": 1}x',
+        "()", "(1)", "(1,)", "(1, 'a', [2])", "{'k': (1, 2)}",
+    ])
+    def test_matches_earley(self, src):
+        assert _same(parse_value(src), _parse(src))
+
+    def test_json_object_is_attribute_dict(self):
+        value = fast_parse('{"user": {"name": "ada"}}')
+        assert isinstance(value["user"], AttributeDict)
+        assert value.user.name == "ada"
+
+    def test_bareword_inside_list_falls_back_to_string(self):
+        assert parse_value("[1, foo]") == "[1, foo]"
+
+    def test_earley_errors_still_raise(self):
+        with pytest.raises(Exception):
+            parse_value("42 # comment")
+
+
+class TestStrictFlavors:
+    def test_json_objects_are_attribute_dicts(self):
+        value = parse_json('{"user": {"name": "ada"}, "tags": [null]}')
+        assert value.user.name == "ada"
+        assert value.tags == [None]
+
+    def test_json_handles_escapes(self):
+        assert parse_json(r'{"msg": "GET /a\\b \"q\""}') == {"msg": 'GET /a\\b "q"'}
+
+    def test_json_rejects_python_literals(self):
+        with pytest.raises(ValueError):
+            parse_json("{'a': 1}")
+
+    def test_python_literals(self):
+        assert parse_python("{'k': (1, 2), 's': {3}}") == {"k": (1, 2), "s": {3}}
+
+    @pytest.mark.parametrize("bad", ["hello", "[1,", "f(x)", "{[1]: 2}", "{{1}}"])
+    def test_python_rejects_non_literals(self, bad):
+        with pytest.raises(ValueError):
+            parse_python(bad)
@@ -0,0 +1,54 @@
+"""Tests for ptools.lib.flow.pipeline - fused multi-stage pipelines."""
+import pytest
+
+from ptools.lib.flow.pipeline import Pipeline
+from ptools.lib.flow.utils import create_global_scope
+
+
+def _run(tokens, values):
+    pipeline = Pipeline.parse(tokens, create_global_scope())
+    return pipeline, list(pipeline.run(iter(values)))
+
+
+class TestParse:
+    def test_splits_on_standalone_separator(self):
+        pipeline, out = _run(["map", "x[::2]", "::", "map", "x", "+", "'!'"], ["abcd"])
+        assert [s.name for s in pipeline.stages] == ["map", "map"]
+        assert out == ["ac!"]
+
+    @pytest.mark.parametrize("tokens", [[], ["map"], ["map", "x", "::"], ["nope", "x"], ["reduce", "-a"]])
+    def test_invalid(self, tokens):
+        with pytest.raises(ValueError):
+            Pipeline.parse(tokens, {})
+
+    def test_syntax_error(self):
+        with pytest.raises(SyntaxError):
+            Pipeline.parse(["map", "x", "+"], {})
+
+
+class TestStages:
+    def test_filter_map_group(self):
+        pipeline, out = _run(["filter", "x > 0", "::", "map", "x * 2", "::", "group", "x % 4"], [-1, 1, 2, 3])
+        assert pipeline.collects
+        assert out == [{2: [2, 6], 0: [4]}]
+
+    def test_reduce_with_accumulator(self):
+        _, out = _run(["reduce", "-a", "10", "acc + x"], [1, 2, 3])
+        assert out == [16]
+
+    def test_unique_and_foreach(self):
+        _, out = _run(["unique", "x % 3", "::", "foreach", "x if x > 1 else None"], [1, 4, 2, 5, 3])
+        assert out == [2, 3]
+
+    def test_list_values_bind_per_element(self):
+        _, out = _run(["map", "[x, x + 1]", "::", "map", "x * i"], [1, 5])
+        assert out == [0, 2, 0, 6]
+
+    def test_counters_and_errors(self, capsys):
+        pipeline, out = _run(["map", "10 // x", "::", "filter", "x > 2"], [1, 0, 2, 5])
+        assert out == [10, 5]
+        assert [s.counts for s in pipeline.stages] == [
+            {'in': 4, 'out': 3, 'errors': 1},
+            {'in': 3, 'out': 2, 'errors': 0},
+        ]
+        assert "Error:" in capsys.readouterr().err
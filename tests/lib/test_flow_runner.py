@@ -0,0 +1,131 @@
+"""Tests for ptools.lib.flow.runner and the compiled-expression cache."""
+import io
+
+import pytest
+
+from ptools.lib.flow.compiler import compile_expression
+from ptools.lib.flow.runner import FlowRunner
+from ptools.lib.flow.utils import create_global_scope
+from ptools.lib.flow.values import InputFlavorKind
+
+
+@pytest.fixture
+def stdin(monkeypatch):
+    def feed(text):
+        monkeypatch.setattr("sys.stdin", io.StringIO(text))
+    return feed
+
+
+class TestCompileExpression:
+    def test_returns_code_object(self):
+        assert eval(compile_expression("1 + 2")) == 3
+
+    def test_cached_by_source(self):
+        assert compile_expression("x * 2") is compile_expression("x * 2")
+
+    def test_syntax_error_propagates(self):
+        with pytest.raises(SyntaxError):
+            compile_expression("x +")
+
+
+class TestFlowRunner:
+    def test_run_evaluates_each_item(self, stdin):
+        stdin("1\n2\n3\n")
+        runner = FlowRunner(globals=create_global_scope())
+        assert [r for r, _ in runner.run("x * 10")] == [10, 20, 30]
+
+    def test_run_passes_vars(self, stdin):
+        stdin("1\n2\n")
+        runner = FlowRunner()
+        assert [r for r, _ in runner.run("x + y", vars={'y': 5})] == [6, 7]
+
+    def test_run_reports_syntax_error_once(self, stdin, capsys):
+        stdin("1\n2\n")
+        assert list(FlowRunner().run("x +")) == []
+        assert capsys.readouterr().err.count("Error:") == 1
+
+    def test_run_reports_item_errors_and_continues(self, stdin, capsys):
+        stdin("1\n0\n2\n")
+        assert [r for r, _ in FlowRunner().run("2 // x")] == [2, 1]
+        assert "Error:" in capsys.readouterr().err
+
+    def test_run_json_lines(self, stdin, capsys):
+        stdin('{"a": 1}\n{"a": "x\\ty"}\nnope\n')
+        runs = FlowRunner().run("obj.a", input_flavor=InputFlavorKind.json)
+        assert [r for r, _ in runs] == [1, "x\ty"]
+        assert "cannot decode 'nope'" in capsys.readouterr().err
+
+    def test_run_python_literals_skips_unbuildable(self, stdin, capsys):
+        stdin("{[1]: 2}\n(1, 2)\n")
+        runs = FlowRunner().run("x", input_flavor=InputFlavorKind.python)
+        assert [r for r, _ in runs] == [1, 2]
+        assert "cannot decode '{[1]: 2}'" in capsys.readouterr().err
+
+    def test_run_multiline(self, stdin):
+        stdin("[1,\n 2]\n")
+        runs = FlowRunner().run("x * 2", input_flavor=InputFlavorKind.json, multiline=True)
+        assert [r for r, _ in runs] == [2, 4]
+
+    def test_run_python_flavor(self, stdin):
+        stdin("(1, 2)\n")
+        runs = FlowRunner().run("arr", input_flavor=InputFlavorKind.python)
+        assert [r for r, _ in runs] == [(1, 2), (1, 2)]
+
+    def test_run_while(self, stdin):
+        stdin("")
+        results = list(FlowRunner().run_while("x + 1", initial="0", condition="x >= 3"))
+        assert results[-1] == [3, None, True]
+
+
+class TestParallel:
+    def test_preserves_order(self, stdin):
+        stdin("".join(f"{i}\n" for i in range(50)))
+        runner = FlowRunner(globals=create_global_scope())
+        results = [r for r, _ in runner.run("x * 2", jobs=2, chunk_size=3)]
+        assert results == [i * 2 for i in range(50)]
+
+    def test_unordered_yields_everything(self, stdin):
+        stdin("".join(f"{i}\n" for i in range(50)))
+        results = [r for r, _ in FlowRunner().run("x", jobs=2, chunk_size=4, ordered=False)]
+        assert sorted(results) == list(range(50))
+
+    def test_returns_flow_values(self, stdin):
+        stdin("[1, 2]\n")
+        pairs = list(FlowRunner().run("x", jobs=2))
+        assert [r for r, _ in pairs] == [1, 2]
+        assert all(fv.value == [1, 2] for _, fv in pairs)
+
+    def test_item_errors_reported(self, stdin, capsys):
+        stdin("1\n0\n2\n")
+        assert [r for r, _ in FlowRunner().run("2 // x", jobs=2, chunk_size=1)] == [2, 1]
+        assert capsys.readouterr().err.count("Error:") == 1
+
+    def test_unpicklable_results_match_serial(self, stdin, capsys):
+        stdin("abc\nxbc\naaa\n")
+        results = [r for r, _ in FlowRunner().run("re.match('a', x)", jobs=2, chunk_size=2)]
+        assert [m and m.group() for m in results] == ["a", None, "a"]
+        assert capsys.readouterr().err == ""
+
+
+class TestVectorize:
+    def test_matches_scalar_path(self, stdin):
+        stdin("".join(f"{i}\n" for i in range(10)))
+        results = [r for r, _ in FlowRunner().run("x * 3 - 1", vectorize=True, block_size=4)]
+        assert results == [i * 3 - 1 for i in range(10)]
+
+    def test_falls_back_for_non_numeric_blocks(self, stdin):
+        stdin("1\nfoo\n3\n")
+        results = [r for r, _ in FlowRunner().run("x * 2", vectorize=True)]
+        assert results == [2, "foofoo", 6]
+
+    def test_falls_back_with_per_item_errors(self, stdin, capsys):
+        stdin("1\n0\n2\n")
+        assert [r for r, _ in FlowRunner().run("2 // x", vectorize=True)] == [2, 1]
+        assert capsys.readouterr().err.count("Error:") == 1
+
+    def test_reduce_fold(self, stdin):
+        stdin("".join(f"{i}\n" for i in range(1, 11)))
+        vars = {'acc': 0}
+        for result, _ in FlowRunner().run("acc + x", vars=vars, vectorize=True, block_size=3):
+            vars['acc'] = result
+        assert vars['acc'] == 55
@@ -0,0 +1,77 @@
+"""Tests for ptools.lib.flow.spill - disk-backed group/unique."""
+import os
+
+from ptools.lib.flow.spill import SpillingGroups, SpillingUnique, approx_size
+
+
+def _keys(n, mod):
+    return [(i % mod, i) for i in range(n)]
+
+
+class TestApproxSize:
+    def test_counts_nested_containers(self):
+        flat = approx_size([])
+        assert approx_size([["a" * 100]]) > flat + 100
+
+
+class TestSpillingGroups:
+    def test_in_memory_matches_dict(self):
+        with SpillingGroups(max_bytes=1 << 30) as groups:
+            for key, value in _keys(20, 3):
+                groups.add(key, value)
+            assert not groups.spilled
+            assert dict(groups) == {0: list(range(0, 20, 3)), 1: list(range(1, 20, 3)), 2: list(range(2, 20, 3))}
+
+    def test_spilled_preserves_key_and_value_order(self):
+        expected = {}
+        for key, value in _keys(2000, 37):
+            expected.setdefault(key, []).append(value)
+
+        with SpillingGroups(max_bytes=2048, partitions=4) as groups:
+            for key, value in _keys(2000, 37):
+                groups.add(key, value)
+            assert groups.spilled
+            assert list(groups) == list(expected.items())
+
+    def test_oversized_partition_is_split(self):
+        expected = {}
+        for key, value in _keys(2000, 37):
+            expected.setdefault(key, []).append(value)
+
+        with SpillingGroups(max_bytes=2048, partitions=1) as groups:
+            for key, value in _keys(2000, 37):
+                groups.add(key, value)
+            assert list(groups) == list(expected.items())
+            assert groups._runs > 1
+
+    def test_close_removes_temp_dir(self):
+        groups = SpillingGroups(max_bytes=1)
+        groups.add("k", "v")
+        spill_dir = groups.dir
+        assert os.path.isdir(spill_dir)
+        groups.close()
+        assert not os.path.exists(spill_dir)
+
+
+class TestSpillingUnique:
+    def _run(self, items, max_bytes):
+        with SpillingUnique(max_bytes=max_bytes, partitions=4) as unique:
+            emitted = [value for key, value in items if unique.offer(key, value)]
+            return emitted, list(unique.remaining())
+
+    def test_in_memory(self):
+        emitted, remaining = self._run([(1, "a"), (1, "b"), (2, "c")], 1 << 30)
+        assert emitted == ["a", "c"]
+        assert remaining == []
+
+    def test_spilled_matches_exact_first_occurrence(self):
+        items = [(i * 7919 % 500, i) for i in range(3000)]
+        expected, seen = [], set()
+        for key, value in items:
+            if key not in seen:
+                seen.add(key)
+                expected.append(value)
+
+        emitted, remaining = self._run(items, 4096)
+        assert remaining
+        assert emitted + remaining == expected
@@ -1,11 +1,19 @@
-"""Tests for ptools.lib.flow.utils - yield_scope and global scope builder."""
-from ptools.lib.flow.utils import create_global_scope, yield_scope
+"""Tests for ptools.lib.flow.utils - Scope binding and global scope builder."""
+import tracemalloc
+
+import pytest
+
+from ptools.lib.flow.utils import LazyScope, Scope, create_global_scope
 from ptools.lib.flow.values import StreamValue
 
 
-class TestYieldScope:
+def _scopes(stream_value):
+    return [dict(s) for s in Scope().bind(stream_value)]
+
+
+class TestBind:
     def test_dict_yields_per_key(self):
-        scopes = list(yield_scope({"a": 1, "b": 2}))
+        scopes = _scopes({"a": 1, "b": 2})
         assert len(scopes) == 2
         keys = {s["k"] for s in scopes}
         assert keys == {"a", "b"}
@@ -14,27 +22,92 @@ class TestYieldScope:
             assert s["obj"] == {"a": 1, "b": 2}
 
     def test_list_yields_per_index(self):
-        scopes = list(yield_scope([10, 20, 30]))
+        scopes = _scopes([10, 20, 30])
         assert [s["x"] for s in scopes] == [10, 20, 30]
         assert [s["i"] for s in scopes] == [0, 1, 2]
         assert all(s["arr"] == [10, 20, 30] for s in scopes)
 
     def test_tuple(self):
-        scopes = list(yield_scope((1, 2)))
+        scopes = _scopes((1, 2))
         assert [s["x"] for s in scopes] == [1, 2]
 
     def test_scalar_wraps_in_single_scope(self):
-        scopes = list(yield_scope(42))
+        scopes = _scopes(42)
         assert len(scopes) == 1
         assert scopes[0]["x"] == 42
         assert scopes[0]["arr"] == [42]
 
     def test_accepts_stream_value(self):
         sv = StreamValue("[1, 2]")
-        scopes = list(yield_scope(sv))
+        scopes = _scopes(sv)
         assert [s["x"] for s in scopes] == [1, 2]
 
 
+class TestScope:
+    def test_reuses_one_mapping(self):
+        scope = Scope()
+        seen = [(id(s), s["x"], s["i"]) for s in scope.bind([1, 2, 3])]
+        assert [(x, i) for _, x, i in seen] == [(1, 0), (2, 1), (3, 2)]
+        assert {ident for ident, _, _ in seen} == {id(scope.locals)}
+
+    def test_vars_override_and_are_reread(self):
+        vars = {"acc": 0, "x": "shadowed"}
+        accs = []
+        for s in Scope(vars).bind([1, 2]):
+            accs.append((s["acc"], s["x"]))
+            vars["acc"] += 10
+        assert accs == [(0, "shadowed"), (10, "shadowed")]
+
+    def test_names_do_not_leak_between_values(self):
+        scope = Scope()
+        list(scope.bind({"a": 1}))
+        s = next(scope.bind([5]))
+        assert "k" not in s and "obj" not in s
+        assert s["arr"] == [5]
+
+    def test_assigned_names_do_not_leak_between_elements(self):
+        code = compile("(seen := x) if 'seen' not in dir() else seen", "<test>", "eval")
+        assert [eval(code, {}, s) for s in Scope().bind([1, 2, 3])] == [1, 2, 3]
+
+    def test_set_view_built_once(self):
+        value = set(range(100))
+        arrs = {id(s["arr"]) for s in Scope().bind(value)}
+        xs = [s["x"] for s in Scope().bind(value)]
+        assert len(arrs) == 1
+        assert xs == list(value)
+
+
+class TestScopeAllocations:
+    """Binding elements must not allocate per element.
+
+    Every yielded scope is kept alive, so a per-element dict (or a
+    per-element ``list(set)``) would show up as megabytes of growth.
+    """
+    N = 20_000
+
+    def _growth(self, value):
+        held = [None] * self.N
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            for j, s in enumerate(Scope({"acc": 0}).bind(value)):
+                held[j] = s
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return after - before
+
+    def test_list_elements(self):
+        assert self._growth(list(range(self.N))) < 16 * 1024
+
+    def test_dict_elements(self):
+        assert self._growth({i: i for i in range(self.N)}) < 16 * 1024
+
+    def test_set_elements(self):
+        # One list view of the set (8 bytes per slot) and nothing per element.
+        assert self._growth(set(range(self.N))) < 8 * self.N + 16 * 1024
+
+
 class TestGlobalScope:
     def test_has_core_helpers(self):
         g = create_global_scope()
@@ -89,3 +162,42 @@ class TestGlobalScope:
         g = create_global_scope()
         names = g["Globals"].dir()
         assert "to_json" in names
+
+
+class TestLazyScope:
+    def _scope(self, calls):
+        def load():
+            calls.append("mod")
+            return "loaded"
+        return LazyScope({"helper": len}, {"mod": load})
+
+    def test_loads_on_first_reference_only(self):
+        calls = []
+        scope = self._scope(calls)
+        assert calls == []
+        assert eval("mod + '!'", scope, {}) == "loaded!"
+        assert eval("[mod for _ in range(3)]", scope, {}) == ["loaded"] * 3
+        assert calls == ["mod"]
+
+    def test_membership_and_names(self):
+        scope = self._scope([])
+        assert "mod" in scope and "helper" in scope
+        assert "max" not in scope
+        assert sorted(scope.names()) == ["helper", "mod"]
+
+    def test_unknown_names_raise_name_error(self):
+        with pytest.raises(NameError):
+            eval("missing", self._scope([]), {})
+
+    def test_builtins_still_available(self):
+        assert eval("max(helper('ab'), 1)", self._scope([]), {}) == 2
+
+    def test_global_scope_defers_modules(self):
+        g = create_global_scope()
+        assert not dict.__contains__(g, "statistics")
+        assert eval("statistics.mean([1, 2])", g, {}) == 1.5
+        assert dict.__contains__(g, "statistics")
+
+    def test_helpers_shadow_builtins(self):
+        g = create_global_scope()
+        assert eval("round('2.5')", g, {}) == 2.0
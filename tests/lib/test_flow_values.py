@@ -1,4 +1,5 @@
 """Tests for ptools.lib.flow.values - StreamValue + OutputValue flavors."""
+import io
 import json
 
 import pytest
@@ -6,9 +7,11 @@ import pytest
 from ptools.lib.flow.values import (
     OutputFlavorKind,
     OutputJSONFlavor,
+    OutputJSONLinesFlavor,
     OutputNoneFlavor,
     OutputPlainFlavor,
     OutputPythonFlavor,
+    OutputStream,
     OutputUnflavoredFlavor,
     OutputValue,
     StreamValue,
@@ -46,6 +49,18 @@ class TestOutputFlavors:
     def test_json(self):
         assert json.loads(OutputJSONFlavor().format({"x": 1})) == {"x": 1}
 
+    def test_jsonl_list(self):
+        assert OutputJSONLinesFlavor().format([{"a": 1}, 2]) == '{"a": 1}\n2'
+
+    def test_json_item_is_compact(self):
+        assert OutputJSONFlavor().format_item({"x": [1, 2]}) == '{"x": [1, 2]}'
+
+    def test_plain_item_does_not_split_lists(self):
+        assert OutputPlainFlavor().format_item([1, 2]) == "[1, 2]"
+
+    def test_none_item_is_skipped(self):
+        assert OutputNoneFlavor().format_item(1) is None
+
     def test_python_repr(self):
         assert OutputPythonFlavor().format("hi") == "'hi'"
 
@@ -62,6 +77,7 @@ class TestOutputValue:
         [
             (OutputFlavorKind.plain, "OutputPlainFlavor"),
             (OutputFlavorKind.json, "OutputJSONFlavor"),
+            (OutputFlavorKind.jsonl, "OutputJSONLinesFlavor"),
             (OutputFlavorKind.python, "OutputPythonFlavor"),
             (OutputFlavorKind.none, "OutputNoneFlavor"),
             (OutputFlavorKind.unflavored, "OutputUnflavoredFlavor"),
@@ -74,3 +90,50 @@ class TestOutputValue:
     def test_format_delegates(self):
         ov = OutputValue(OutputFlavorKind.json)
         assert json.loads(ov.format([1, 2])) == [1, 2]
+
+
+class _ClosedPipe(io.StringIO):
+    def write(self, text):
+        raise BrokenPipeError()
+
+
+class TestOutputStream:
+    def test_writes_one_line_per_item(self):
+        buf = io.StringIO()
+        with OutputStream(OutputFlavorKind.jsonl, file=buf) as out:
+            out.write({"a": 1})
+            out.write([1, 2])
+        assert buf.getvalue() == '{"a": 1}\n[1, 2]\n'
+
+    def test_none_flavor_writes_nothing(self):
+        buf = io.StringIO()
+        with OutputStream(OutputFlavorKind.none, file=buf) as out:
+            out.write(1)
+        assert buf.getvalue() == ""
+
+    def test_broken_pipe_stops_quietly(self):
+        consumed = []
+
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        with OutputStream(file=_ClosedPipe()) as out:
+            for value in source():
+                out.write(value)
+        assert consumed == [0]
+
+    @pytest.mark.parametrize("kind", list(OutputFlavorKind))
+    @pytest.mark.parametrize("mapping", [{}, {"a": [1, 2]}, {1: "x", "b": {"c": None}}])
+    def test_entries_match_whole_mapping(self, kind, mapping):
+        buf = io.StringIO()
+        OutputStream(kind, file=buf).write_entries(iter(mapping.items()))
+        assert buf.getvalue() == OutputValue(kind).format(mapping) + "\n"
+
+    @pytest.mark.parametrize("kind", list(OutputFlavorKind))
+    @pytest.mark.parametrize("values", [[], [1], ["a", {"b": [1, 2]}, None]])
+    def test_elements_match_whole_list(self, kind, values):
+        buf = io.StringIO()
+        OutputStream(kind, file=buf).write_elements(iter(values))
+        assert buf.getvalue() == OutputValue(kind).format(values) + "\n"
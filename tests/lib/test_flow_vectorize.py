@@ -0,0 +1,90 @@
+"""Tests for ptools.lib.flow.vectorize - NumPy block evaluation."""
+import numpy as np
+
+from ptools.lib.flow.compiler import compile_expression
+from ptools.lib.flow.utils import create_global_scope
+from ptools.lib.flow.vectorize import FoldPlan, can_vectorize, eval_block, numeric_block
+
+
+def _eval(expression, values):
+    return eval_block(compile_expression(expression), create_global_scope(), {}, numeric_block(values))
+
+
+class TestNumericBlock:
+    def test_ints(self):
+        assert numeric_block([1, 2, 3]).dtype.kind == "i"
+
+    def test_floats(self):
+        assert numeric_block([1.5, 2.0]).dtype.kind == "f"
+
+    def test_mixed_numbers_rejected(self):
+        assert numeric_block([1, 2.5]) is None
+
+    def test_non_numbers_rejected(self):
+        assert numeric_block([1, "a"]) is None
+        assert numeric_block([True, False]) is None
+        assert numeric_block([1, None]) is None
+
+    def test_huge_ints_rejected(self):
+        assert numeric_block([1, 2 ** 80]) is None
+
+
+class TestEvalBlock:
+    def test_returns_python_scalars(self):
+        results = _eval("x * 2 + 1", [1, 2, 3])
+        assert results == [3, 5, 7]
+        assert all(type(r) is int for r in results)
+
+    def test_comparison(self):
+        assert _eval("x > 1", [1, 2]) == [False, True]
+
+    def test_true_division(self):
+        assert _eval("x / 2", [1, 3]) == [0.5, 1.5]
+
+    def test_true_division_beyond_float_precision_falls_back(self):
+        assert _eval("x / 3", [1, 2 ** 53 + 1]) is None
+        assert _eval("x / 3", [1, -(2 ** 53) - 1]) is None
+
+    def test_scalar_helpers_are_not_array_compatible(self):
+        assert _eval("sqrt(x)", [1, 4]) is None
+
+    def test_division_by_zero_falls_back(self):
+        assert _eval("6 // x", [1, 0]) is None
+
+    def test_int_overflow_falls_back(self):
+        assert _eval("x ** 40", [3, 4]) is None
+
+    def test_non_elementwise_result_falls_back(self):
+        assert _eval("str(x)", [1, 2]) is None
+        assert _eval("1", [1, 2]) is None
+
+
+class TestCanVectorize:
+    def test_plain_x(self):
+        assert can_vectorize(compile_expression("x * 2"))
+
+    def test_index_needs_scalar_path(self):
+        assert not can_vectorize(compile_expression("x * i"))
+
+
+class TestFoldPlan:
+    def _fold(self, expression, acc, values):
+        plan = FoldPlan.from_expression(expression, {})
+        terms = eval_block(plan.term, {}, {}, np.array(values))
+        for term in terms:
+            acc = plan.step(acc, term)
+        return acc
+
+    def test_sum(self):
+        assert self._fold("acc + x * 2", 0, [1, 2, 3]) == 12
+
+    def test_reversed_subtraction(self):
+        assert self._fold("x - acc", 0, [1, 2, 3]) == 2
+
+    def test_max(self):
+        assert self._fold("max(acc, x % 5)", 0, [3, 4, 9, 10]) == 4
+
+    def test_unsupported_shapes(self):
+        assert FoldPlan.from_expression("acc * acc + x", {}) is None
+        assert FoldPlan.from_expression("acc.append(x)", {}) is None
+        assert FoldPlan.from_expression("acc + x * i", {}) is None
@@ -0,0 +1,185 @@
+"""Tests for ptools.lib.fs.file_tree_app - lazy rendering, live updates and filtering."""
+import asyncio
+import shutil
+
+import pytest
+
+pytest.importorskip("textual")
+
+from textual.widgets import Tree
+
+from ptools.lib.fs.file_tree_app import FileTreeApp
+
+
+# d{i}/e{j}/f.txt holds i * 10 + j + 1 bytes
+TOTAL = sum(i * 10 + j + 1 for i in range(3) for j in range(3))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(3):
+        for j in range(3):
+            path = tmp_path / f"d{i}" / f"e{j}" / "f.txt"
+            path.parent.mkdir(parents=True)
+            path.write_text("x" * (i * 10 + j + 1))
+    return tmp_path
+
+
+def _run(app, scenario):
+    async def main():
+        async with app.run_test() as pilot:
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            await scenario(app, pilot, app.query_one(Tree))
+    asyncio.run(main())
+
+
+class TestLazyRendering:
+    def test_only_root_children_materialized(self, tree):
+        async def scenario(app, pilot, widget):
+            assert [str(c.label) for c in widget.root.children] == ["d0", "d1", "d2"]
+            assert len(app._node_meta) == 4
+            assert all(not c.children for c in widget.root.children)
+        _run(FileTreeApp(str(tree), max_depth=3), scenario)
+
+    def test_expand_materializes_children(self, tree):
+        async def scenario(app, pilot, widget):
+            first = widget.root.children[0]
+            first.expand()
+            await pilot.pause()
+            assert [str(c.label) for c in first.children] == ["e0", "e1", "e2"]
+            assert len(app._node_meta) == 7
+        _run(FileTreeApp(str(tree), max_depth=3), scenario)
+
+    def test_rerender_keeps_expanded_directories_only(self, tree):
+        async def scenario(app, pilot, widget):
+            widget.root.children[0].expand()
+            await pilot.pause()
+            app.sort_order = "desc"
+            app._render_from_data()
+            await pilot.pause()
+            assert [str(c.label) for c in widget.root.children] == ["d2", "d1", "d0"]
+            expanded = widget.root.children[2]
+            assert expanded.is_expanded
+            assert [str(c.label) for c in expanded.children] == ["e2", "e1", "e0"]
+            assert len(app._node_meta) == 7
+        _run(FileTreeApp(str(tree), max_depth=3, sort_by="size"), scenario)
+
+    def test_labels_cached(self, tree):
+        async def scenario(app, pilot, widget):
+            calls = []
+            make_label = app._make_label
+            app._make_label = lambda *a, **k: calls.append(a) or make_label(*a, **k)
+            app._render_from_data()
+            app._render_from_data()
+            assert calls == []
+        _run(FileTreeApp(str(tree), max_depth=3), scenario)
+
+
+class TestLiveUpdates:
+    def test_watcher_refreshes_changed_directory(self, tree):
+        async def scenario(app, pilot, widget):
+            await app.workers.wait_for_complete()
+            assert app._observer is not None
+            app._live.refresh = _spy(app._live.refresh, calls := [])
+            (tree / "d0" / "e0" / "f.txt").unlink()
+            for _ in range(50):
+                await asyncio.sleep(0.05)
+                await app.workers.wait_for_complete()
+                if app._tree_data["size"] == TOTAL - 1:
+                    break
+            assert app._tree_data["size"] == TOTAL - 1
+            assert calls and all(str(tree / "d0") in path for batch in calls for path in batch)
+        _run(FileTreeApp(str(tree), max_depth=3), scenario)
+
+    def test_watches_listed_directories_only(self, tree):
+        async def scenario(app, pilot, widget):
+            await app.workers.wait_for_complete()
+            assert set(app._watches) == {str(tree)} | {str(tree / f"d{i}") for i in range(3)}
+            assert not any(watch.is_recursive for watch in app._watches.values())
+            shutil.rmtree(tree / "d1")
+            app.refresh_paths([str(tree / "d1")])
+            await app.workers.wait_for_complete()
+            assert str(tree / "d1") not in app._watches
+        _run(FileTreeApp(str(tree), max_depth=1), scenario)
+
+    def test_render_does_not_reorder_data(self, tree):
+        async def scenario(app, pilot, widget):
+            before = [c["name"] for c in app._tree_data["children"]]
+            app.sort_order = "desc"
+            app._render_from_data()
+            assert [c["name"] for c in app._tree_data["children"]] == before
+            assert [str(c.label) for c in widget.root.children] == sorted(before, reverse=True)
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False, sort_by="name"), scenario)
+
+    def test_confirmed_delete_refreshes_only_its_path(self, tree):
+        from ptools.lib.fs.file_tree_app import ConfirmScreen
+
+        async def scenario(app, pilot, widget):
+            target = tree / "d2"
+            app._live.refresh = _spy(app._live.refresh, calls := [])
+            app.push_screen(ConfirmScreen("delete?", on_confirm=lambda: shutil.rmtree(target), paths=[str(target)]))
+            await pilot.pause()
+            await pilot.press("y")
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            assert calls[0] == [str(target)]
+            assert app._tree_data["size"] == TOTAL - (21 + 22 + 23)
+            assert [str(c.label) for c in widget.root.children] == ["d0", "d1"]
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False), scenario)
+
+
+class TestFilter:
+    def test_filter_shows_matches_and_ancestors(self, tree):
+        (tree / "d1" / "e2" / "needle.txt").write_text("x")
+
+        async def scenario(app, pilot, widget):
+            app.filter_text = "needle"
+            app._render_from_data()
+            await pilot.pause()
+            assert [str(c.label) for c in widget.root.children] == ["d1"]
+            d1 = widget.root.children[0]
+            d1.expand()
+            await pilot.pause()
+            assert [str(c.label) for c in d1.children] == ["e2"]
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False), scenario)
+
+    def test_no_match(self, tree):
+        async def scenario(app, pilot, widget):
+            app.filter_text = "nothing"
+            app._render_from_data()
+            assert str(widget.root.label) == "No files match filter."
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False), scenario)
+
+    def test_fuzzy_ranks_best_match_first(self, tree):
+        (tree / "d0" / "xyz.txt").write_text("x")
+        (tree / "d2" / "x_y_z.txt").write_text("x")
+
+        async def scenario(app, pilot, widget):
+            app.filter_text = "xyz"
+            app._render_from_data()
+            assert [str(c.label) for c in widget.root.children] == ["d0"]
+            app.fuzzy = True
+            app._render_from_data()
+            assert [str(c.label) for c in widget.root.children] == ["d0", "d2"]
+            app.sort_order = "desc"
+            app._render_from_data()
+            assert [str(c.label) for c in widget.root.children] == ["d0", "d2"]
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False), scenario)
+
+    def test_refresh_updates_index(self, tree):
+        async def scenario(app, pilot, widget):
+            app.filter_text = "fresh"
+            (tree / "d2" / "fresh.txt").write_text("x")
+            app.refresh_paths([str(tree / "d2" / "fresh.txt")])
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            assert [str(c.label) for c in widget.root.children] == ["d2"]
+        _run(FileTreeApp(str(tree), max_depth=3, watch_changes=False), scenario)
+
+
+def _spy(fn, calls):
+    def wrapper(paths):
+        calls.append(list(paths))
+        return fn(paths)
+    return wrapper
@@ -0,0 +1,67 @@
+"""Tests for ptools.lib.fs.ignore - gitignore-style walk filters."""
+import pytest
+
+from ptools.lib.fs.ignore import IgnoreRules, PathFilter
+
+
+def _rules(*patterns, base=''):
+    return IgnoreRules().extend(patterns, base)
+
+
+class TestIgnoreRules:
+    @pytest.mark.parametrize("pattern,path,is_dir,expected", [
+        ("node_modules", "node_modules", True, True),
+        ("node_modules", "web/node_modules", True, True),
+        ("*.log", "a/b/c.log", False, True),
+        ("*.log", "a/b/c.logx", False, False),
+        ("build/", "build", True, True),
+        ("build/", "build", False, False),
+        ("/dist", "dist", True, True),
+        ("/dist", "pkg/dist", True, False),
+        ("docs/*.md", "docs/a.md", False, True),
+        ("docs/*.md", "docs/sub/a.md", False, False),
+        ("**/cache", "a/b/cache", True, True),
+        ("**/cache", "cache", True, True),
+        ("logs/**", "logs/a/b", False, True),
+        ("file?.txt", "file1.txt", False, True),
+        ("file[0-9].txt", "filex.txt", False, False),
+        ("file[!0-9].txt", "filex.txt", False, True),
+        ("# comment", "# comment", False, False),
+    ])
+    def test_match(self, pattern, path, is_dir, expected):
+        assert _rules(pattern).match(path, is_dir) is expected
+
+    def test_last_match_wins(self):
+        rules = _rules("*.log", "!keep.log")
+        assert rules.match("x.log", False)
+        assert not rules.match("keep.log", False)
+
+    def test_base_scopes_nested_rules(self):
+        rules = _rules("*.tmp", "/out", base="pkg")
+        assert rules.match("pkg/a/b.tmp", False)
+        assert not rules.match("other/b.tmp", False)
+        assert rules.match("pkg/out", True)
+        assert not rules.match("pkg/a/out", True)
+
+    def test_with_gitignore(self, tmp_path):
+        (tmp_path / ".gitignore").write_text("# deps\nvendor/\n\n*.pyc\n")
+        rules = IgnoreRules().with_gitignore(str(tmp_path), "sub")
+        assert rules.match("sub/vendor", True)
+        assert rules.match("sub/x/y.pyc", False)
+        assert IgnoreRules().with_gitignore(str(tmp_path / "missing")).rules == ()
+
+
+class TestPathFilter:
+    def test_empty_filter_is_falsy(self):
+        assert not PathFilter()
+        assert PathFilter(gitignore=True)
+
+    def test_cli_excludes_beat_gitignore_negation(self):
+        f = PathFilter(exclude=["*.log"], gitignore=True)
+        rules = _rules("!keep.log")
+        assert f.excluded(rules, "keep.log", False)
+
+    def test_include_only_selects_files(self):
+        f = PathFilter(include=["*.py"])
+        assert f.included("a/b.py")
+        assert not f.included("a/b.txt")
@@ -0,0 +1,102 @@
+"""Tests for ptools.lib.fs.name_index - the interactive tree's filter index."""
+import shutil
+
+import pytest
+
+from ptools.lib.fs.name_index import NameIndex, fuzzy_score
+from ptools.lib.fs.sizes import LiveSizeTree, size_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in [
+        "src/main.py",
+        "src/lib/file_tree.py",
+        "src/lib/FileTreeApp.py",
+        "docs/readme.md",
+        "docs/filter_notes.txt",
+        "build/out.bin",
+    ]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    return tmp_path
+
+
+def _names(index, matches):
+    return sorted(index._nodes[i]["name"] for i in matches)
+
+
+class TestSearch:
+    def test_substring(self, tree):
+        index = NameIndex(size_tree(str(tree), 3))
+        assert _names(index, index.search("tree")) == ["FileTreeApp.py", "file_tree.py"]
+        assert _names(index, index.search("Py")) == ["FileTreeApp.py", "file_tree.py", "main.py"]
+        assert index.search("nothing") == {}
+
+    def test_backspace_reuses_earlier_result(self, tree):
+        index = NameIndex(size_tree(str(tree), 3))
+        first = index.search("tre")
+        index.search("tree")
+        assert index.search("tre") is first
+
+    def test_extending_query_narrows_previous_matches(self, tree, monkeypatch):
+        index = NameIndex(size_tree(str(tree), 3))
+        index.search("fil")
+        monkeypatch.setattr(index, "_postings", lambda gram: pytest.fail("re-read postings"))
+        assert _names(index, index.search("file")) == ["FileTreeApp.py", "file_tree.py"]
+
+    def test_visible_includes_ancestors(self, tree):
+        index = NameIndex(size_tree(str(tree), 3))
+        shown = index.visible("readme")
+        assert sorted(shown) == sorted([str(tree), str(tree / "docs"), str(tree / "docs" / "readme.md")])
+
+    def test_fuzzy_ranks_boundaries_first(self, tree):
+        index = NameIndex(size_tree(str(tree), 3))
+        matches = index.search("ft", fuzzy=True)
+        ranked = sorted(matches, key=matches.get, reverse=True)
+        assert _names(index, ranked[:2]) == ["FileTreeApp.py", "file_tree.py"]
+        assert "filter_notes.txt" in _names(index, matches)
+
+    def test_fuzzy_visible_carries_best_score(self, tree):
+        index = NameIndex(size_tree(str(tree), 3))
+        shown = index.visible("ft", fuzzy=True)
+        assert shown[str(tree / "src")] > shown[str(tree / "docs")]
+
+
+class TestFuzzyScore:
+    def test_no_match(self):
+        assert fuzzy_score("xyz", "file_tree.py") is None
+
+    def test_prefers_consecutive_and_boundaries(self):
+        assert fuzzy_score("tree", "file_tree.py") > fuzzy_score("tree", "the_rare_egg")
+        assert fuzzy_score("ft", "file_tree") > fuzzy_score("ft", "left")
+        assert fuzzy_score("ft", "FileTree") > fuzzy_score("ft", "fileatree")
+
+
+class TestUpdate:
+    def test_follows_live_refresh(self, tree):
+        live = LiveSizeTree(str(tree), 3)
+        index = NameIndex(live.scan())
+        # Cached postings must pick up the new name.
+        assert len(index.search("tree")) == 2
+        (tree / "src" / "lib" / "new_tree.py").write_text("x")
+        shutil.rmtree(tree / "docs")
+        for path in live.refresh([str(tree / "src" / "lib" / "new_tree.py"), str(tree / "docs")]):
+            node = live.node(path)
+            if node is not None:
+                index.update(node)
+            else:
+                index.remove(path)
+        assert _names(index, index.search("tree")) == ["FileTreeApp.py", "file_tree.py", "new_tree.py"]
+        assert index.search("readme") == {}
+        assert str(tree / "docs") not in index._dirs
+
+    def test_unchanged_subdirectories_keep_ids(self, tree):
+        live = LiveSizeTree(str(tree), 3)
+        index = NameIndex(live.scan())
+        before = index._dirs[str(tree / "src" / "lib")]
+        (tree / "top.txt").write_text("x")
+        index.update(live.node(live.refresh([str(tree / "top.txt")]).pop()))
+        assert index._dirs[str(tree / "src" / "lib")] == before
+        assert _names(index, index.search("top")) == ["top.txt"]
@@ -0,0 +1,77 @@
+"""Tests for ptools.lib.fs.scanner - the shared directory scanner."""
+import threading
+
+import pytest
+
+from ptools.lib.fs.scanner import Scanner
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in ["a/b/c/deep.txt", "a/one.txt", "x/y.txt", "top.txt", ".hidden/h.txt"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    return tmp_path
+
+
+def _paths(node):
+    out = []
+    for entry in node.entries:
+        out.append(entry.path)
+        child = node.child(entry)
+        if child is not None:
+            out.extend(_paths(child))
+    return out
+
+
+class TestScanner:
+    @pytest.mark.parametrize("workers", [2, 8, 0])
+    def test_order_independent_of_workers(self, tree, workers):
+        with Scanner(1) as serial, Scanner(workers) as parallel:
+            assert _paths(parallel.scan(str(tree), 10)) == _paths(serial.scan(str(tree), 10))
+
+    def test_max_depth(self, tree):
+        with Scanner(4) as scanner:
+            paths = _paths(scanner.scan(str(tree), 1))
+        assert str(tree / "a" / "one.txt") in paths
+        assert str(tree / "a" / "b") in paths
+        assert str(tree / "a" / "b" / "c") not in paths
+
+    def test_descend_prunes(self, tree):
+        def descend(entry, relpath, context):
+            return not entry.name.startswith('.') and relpath != 'a/b'
+        with Scanner(4, descend=descend) as scanner:
+            paths = _paths(scanner.scan(str(tree), 10))
+        assert str(tree / "a" / "b") in paths
+        assert str(tree / "a" / "b" / "c") not in paths
+        assert str(tree / ".hidden" / "h.txt") not in paths
+
+    def test_enter_threads_context(self, tree):
+        def enter(node, parent):
+            return (parent or ()) + (node.relpath,)
+        with Scanner(4, enter=enter) as scanner:
+            root = scanner.scan(str(tree), 10)
+            a = root.child(next(e for e in root.entries if e.name == 'a'))
+            b = a.child(next(e for e in a.entries if e.name == 'b'))
+        assert b.context == ('', 'a', 'a/b')
+
+    def test_unreadable_directory(self, tmp_path):
+        with Scanner(2) as scanner:
+            node = scanner.scan(str(tmp_path / "missing"), 3)
+        assert node.entries == [] and isinstance(node.error, OSError)
+
+    def test_serial_scans_lazily(self, tree):
+        entered = []
+        with Scanner(1, enter=lambda node, parent: entered.append(node.relpath)) as scanner:
+            root = scanner.scan(str(tree), 10)
+            assert entered == ['']
+            _paths(root)
+        assert sorted(entered) == ['', '.hidden', 'a', 'a/b', 'a/b/c', 'x']
+
+    def test_close_cancels_pending(self, tree):
+        scanner = Scanner(4)
+        root = scanner.scan(str(tree), 10)
+        scanner.close()
+        # Cancelled or stopped listings resolve to nothing instead of raising.
+        assert set(_paths(root)) >= {entry.path for entry in root.entries}
@@ -0,0 +1,282 @@
+"""Tests for ptools.lib.fs.sizes - single-pass size aggregation."""
+import os
+import shutil
+import time
+
+import pytest
+
+from ptools.lib.fs.sizes import LiveSizeTree, SizeIndex, Usage, size_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        "a/b/c/deep.bin": 1000,
+        "a/b/mid.bin": 100,
+        "a/top.bin": 10,
+        "x/y.bin": 1,
+        "root.bin": 5,
+        ".hidden/h.bin": 7,
+    }
+    for rel, size in files.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    return tmp_path
+
+
+def _child(node, name):
+    return next(c for c in node["children"] if c["name"] == name)
+
+
+class TestSizeTree:
+    def test_totals_include_levels_below_max_depth(self, tree):
+        root = size_tree(str(tree), 1, ignore_hidden=True)
+        assert root["size"] == 1116
+        a = _child(root, "a")
+        assert a["size"] == 1110 and a["children"] == []
+        assert _child(root, "root.bin")["size"] == 5
+
+    def test_hidden(self, tree):
+        assert size_tree(str(tree), 0)["size"] == 1123
+        assert size_tree(str(tree), 0, ignore_hidden=True)["size"] == 1116
+
+    def test_depths(self, tree):
+        root = size_tree(str(tree), 4, ignore_hidden=True)
+        deep = _child(_child(_child(_child(root, "a"), "b"), "c"), "deep.bin")
+        assert deep["depth"] == 4 and deep["size"] == 1000
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_scans_each_directory_once(self, tree, workers, monkeypatch):
+        calls = []
+        real = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda path: calls.append(path) or real(path))
+        size_tree(str(tree), 1, workers=workers)
+        assert sorted(calls) == sorted(set(calls))
+        assert len(calls) == 6
+
+    def test_directories_not_stat_again(self, tree, monkeypatch):
+        calls = []
+        real = os.lstat
+        monkeypatch.setattr(os, "lstat", lambda path, *a, **k: calls.append(path) or real(path, *a, **k))
+        size_tree(str(tree), 4)
+        assert calls == [str(tree)]
+
+    def test_symlinks_not_followed(self, tree):
+        os.symlink(tree / "a", tree / "link")
+        root = size_tree(str(tree), 1, ignore_hidden=True)
+        link = _child(root, "link")
+        assert link["is_symlink"] and not link["is_dir"]
+        assert root["size"] == 1116 + link["size"]
+
+    def test_file_root(self, tree):
+        node = size_tree(str(tree / "root.bin"), 2)
+        assert node["size"] == 5 and not node["is_dir"]
+
+
+class TestFileTreeAppScan:
+    def test_scan_tree_uses_aggregated_sizes(self, tree):
+        from ptools.lib.fs.file_tree_app import FileTreeApp
+
+        app = FileTreeApp(str(tree), max_depth=2, size_threshold=50)
+        data = app._scan_tree(str(tree), 0)
+        assert data["size"] == 1116
+        assert [c["name"] for c in data["children"] if app._visible(c)] == ["a"]
+        assert [c["name"] for c in _child(data, "a")["children"] if app._visible(c)] == ["b"]
+
+
+def _age(root, seconds=60):
+    """Backdate directory mtimes so the index treats them as settled."""
+    past = time.time() - seconds
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (past, past))
+
+
+class TestSizeIndex:
+    def test_unchanged_tree_is_not_rescanned(self, tree, tmp_path_factory):
+        _age(tree)
+        path = str(tmp_path_factory.mktemp("index") / "index.json")
+        first = SizeIndex(path)
+        assert first.total(str(tree)) == 1123
+        assert first.rescans == 6
+        first.save()
+
+        second = SizeIndex(path)
+        assert second.total(str(tree), ignore_hidden=True) == 1116
+        assert second.rescans == 0 and not second.dirty
+
+    def test_changed_directory_is_rescanned(self, tree, tmp_path_factory):
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        index.total(str(tree))
+        (tree / "a" / "b" / "new.bin").write_bytes(b"x" * 50)
+        index.rescans = 0
+        assert index.total(str(tree)) == 1173
+        assert index.rescans == 1
+
+    def test_removed_directories_are_forgotten(self, tree, tmp_path_factory):
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        index.total(str(tree))
+        shutil.rmtree(tree / "a")
+        _age(tree)
+        assert index.total(str(tree)) == 13
+        assert not any(key.startswith(str(tree / "a")) for key in index.dirs)
+
+    def test_recent_directories_are_not_persisted(self, tree, tmp_path_factory):
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        assert index.total(str(tree)) == 1123
+        assert str(tree) not in index.dirs
+
+    def test_size_tree_uses_index_below_max_depth(self, tree, tmp_path_factory):
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        assert size_tree(str(tree), 1, ignore_hidden=True, index=index) == size_tree(str(tree), 1, ignore_hidden=True)
+        index.rescans = 0
+        size_tree(str(tree), 1, ignore_hidden=True, index=index)
+        assert index.rescans == 0
+
+    def test_size_tree_lists_each_directory_once(self, tree, tmp_path_factory, monkeypatch):
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        listed = []
+        scandir = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda path: listed.append(str(path)) or scandir(path))
+        for depth in (0, 1, 2):
+            listed.clear()
+            index._dirs = {}
+            walked = size_tree(str(tree), depth, ignore_hidden=True)
+            listed.clear()
+            assert size_tree(str(tree), depth, ignore_hidden=True, index=index) == walked
+            assert len(listed) == len(set(listed))
+
+    def test_save_drops_unvisited_directories(self, tree, tmp_path_factory):
+        _age(tree)
+        path = str(tmp_path_factory.mktemp("index") / "index.json")
+        first = SizeIndex(path)
+        first.total(str(tree))
+        first.save()
+
+        second = SizeIndex(path)
+        second.total(str(tree / "a"))
+        second.save()
+        assert set(SizeIndex(path).dirs) == {str(tree / "a"), str(tree / "a" / "b"), str(tree / "a" / "b" / "c")}
+
+    def test_one_file_per_root(self, tree, isolated_home):
+        assert SizeIndex(root=str(tree / "a")).path != SizeIndex(root=str(tree / "x")).path
+        assert SizeIndex(root=str(tree / "a")).path == SizeIndex.path_for(str(tree / "a"))
+
+    def test_get_size(self, tree, isolated_home):
+        from ptools.utils.files import get_size
+
+        assert get_size(str(tree)) == 1123
+        assert get_size(str(tree / "root.bin")) == 5
+
+
+class TestUsage:
+    def test_hardlinks_charged_once(self, tree):
+        os.link(tree / "a" / "top.bin", tree / "x" / "top-link.bin")
+        root = size_tree(str(tree), 2, ignore_hidden=True)
+        assert root["size"] == 1116
+        # Each path still shows the file's own size.
+        assert _child(_child(root, "x"), "top-link.bin")["size"] == 10
+
+    def test_sparse_file_disk_usage(self, tmp_path):
+        with open(tmp_path / "sparse.bin", "wb") as f:
+            f.truncate(10 * 1024 * 1024)
+        apparent = size_tree(str(tmp_path), 1)
+        disk = size_tree(str(tmp_path), 1, usage=Usage(disk=True))
+        assert apparent["size"] >= 10 * 1024 * 1024
+        assert disk["size"] < 1024 * 1024
+
+    @pytest.mark.skipif(shutil.which("du") is None, reason="needs du")
+    def test_disk_usage_matches_du(self, tree):
+        import subprocess
+
+        os.link(tree / "a" / "top.bin", tree / "x" / "top-link.bin")
+        du = subprocess.run(["du", "-s", "-B1", str(tree)], capture_output=True, text=True, check=True)
+        assert size_tree(str(tree), 1, usage=Usage(disk=True))["size"] == int(du.stdout.split()[0])
+
+    def test_index_agrees_with_walk(self, tree, tmp_path_factory):
+        os.link(tree / "a" / "top.bin", tree / "x" / "top-link.bin")
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        for disk in (False, True):
+            walked = size_tree(str(tree), 0, usage=Usage(disk=disk))
+            indexed = size_tree(str(tree), 0, index=index, usage=Usage(disk=disk))
+            assert walked["size"] == indexed["size"]
+
+    def test_one_filesystem(self):
+        class St:
+            def __init__(self, dev):
+                self.st_dev = dev
+
+        usage = Usage(one_filesystem=True)
+        assert usage.enter(St(1)) and usage.enter(St(1))
+        assert not usage.enter(St(2))
+        assert Usage().enter(St(2))
+
+    def test_one_filesystem_walk(self, tree):
+        root = size_tree(str(tree), 2, ignore_hidden=True, usage=Usage(one_filesystem=True))
+        assert root["size"] == 1116
+
+
+class TestLiveSizeTree:
+    def _live(self, tree, **kwargs):
+        live = LiveSizeTree(str(tree), 2, ignore_hidden=True, **kwargs)
+        live.scan()
+        return live
+
+    def test_file_created_updates_ancestors(self, tree):
+        live = self._live(tree)
+        (tree / "a" / "b" / "new.bin").write_bytes(b"x" * 40)
+        assert live.refresh([str(tree / "a" / "b" / "new.bin")]) == {str(tree / "a" / "b")}
+        assert live.data["size"] == 1156
+        assert _child(live.data, "a")["size"] == 1150
+        assert _child(_child(live.data, "a"), "b")["size"] == 1140
+
+    def test_deep_change_retotals_boundary(self, tree):
+        live = self._live(tree)
+        (tree / "a" / "b" / "c" / "deep.bin").write_bytes(b"x" * 10)
+        live.refresh([str(tree / "a" / "b" / "c" / "deep.bin")])
+        assert live.data["size"] == 126
+        assert _child(_child(live.data, "a"), "b")["size"] == 110
+
+    def test_directory_removed(self, tree):
+        live = self._live(tree)
+        shutil.rmtree(tree / "a")
+        live.refresh([str(tree / "a")])
+        assert live.data["size"] == 6
+        assert sorted(c["name"] for c in live.data["children"]) == ["root.bin", "x"]
+        assert live.node(str(tree / "a" / "b")) is None
+
+    def test_directory_created(self, tree):
+        live = self._live(tree)
+        (tree / "x" / "sub" / "deeper").mkdir(parents=True)
+        (tree / "x" / "sub" / "deeper" / "f.bin").write_bytes(b"x" * 3)
+        live.refresh([str(tree / "x" / "sub")])
+        sub = _child(_child(live.data, "x"), "sub")
+        assert sub["size"] == 3 and sub["depth"] == 2
+        assert live.data["size"] == 1119
+
+    def test_hidden_and_outside_paths_ignored(self, tree, tmp_path_factory):
+        live = self._live(tree)
+        outside = tmp_path_factory.mktemp("outside")
+        assert live.refresh([str(tree / ".hidden" / "h.bin"), str(outside)]) == set()
+
+    def test_node_identity_kept(self, tree):
+        live = self._live(tree)
+        a = _child(live.data, "a")
+        (tree / "a" / "more.bin").write_bytes(b"x")
+        live.refresh([str(tree / "a" / "more.bin")])
+        assert _child(live.data, "a") is a and a["size"] == 1111
+
+    def test_with_index(self, tree, tmp_path_factory):
+        _age(tree)
+        index = SizeIndex(str(tmp_path_factory.mktemp("index") / "index.json"))
+        live = self._live(tree, index=index)
+        # In-place edit: the directory mtime does not change.
+        (tree / "a" / "b" / "c" / "deep.bin").write_bytes(b"x" * 10)
+        _age(tree)
+        live.refresh([str(tree / "a" / "b" / "c" / "deep.bin")])
+        assert live.data["size"] == 126
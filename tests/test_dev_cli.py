@@ -0,0 +1,69 @@
+"""Tests for the ``ptools dev`` commands."""
+import json
+import sqlite3
+
+from click.testing import CliRunner
+
+from ptools.dev import cli
+from ptools.utils.cache import disk_cache
+
+
+def test_cache_stats(tmp_path):
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def get_size(x):
+        return x
+
+    get_size(1)
+    get_size(1)
+    get_size(2)
+    get_size.flush()  # type: ignore[attr-defined]
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path), "-fv", "json"])
+    assert result.exit_code == 0
+    (row,) = json.loads(result.output)
+    assert row["cache"] == "get_size"
+    assert (row["entries"], row["hits"], row["misses"], row["evictions"]) == (2, 1, 2, 0)
+
+    result = runner.invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path)])
+    assert result.exit_code == 0
+    assert "get_size" in result.output and "33.3%" in result.output
+
+
+def test_cache_stats_empty(tmp_path):
+    result = CliRunner().invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path)])
+    assert result.exit_code == 0
+    assert "No caches" in result.output
+
+
+def test_cache_stats_leaves_other_versions_alone(tmp_path):
+    path = tmp_path / "old.sqlite3"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("INSERT INTO entries VALUES ('k', 'v')")
+        db.execute("PRAGMA user_version = 1")
+
+    result = CliRunner().invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path), "-fv", "json"])
+    assert result.exit_code == 0
+    assert json.loads(result.output) == [{"cache": "old", "error": "schema version 1, expected 3"}]
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT * FROM entries").fetchall() == [("k", "v")]
+
+
+def test_cache_stats_reports_unreadable_files(tmp_path):
+    (tmp_path / "junk.sqlite3").write_bytes(b"not a database" * 100)
+
+    result = CliRunner().invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path), "-fv", "json"])
+    assert result.exit_code == 0
+    (row,) = json.loads(result.output)
+    assert row["cache"] == "junk" and row["error"].startswith("unreadable")
+
+    result = CliRunner().invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path)])
+    assert result.exit_code == 0
+    assert "junk" in result.output and "unreadable" in result.output
+
+
+def test_cache_stats_rejects_unknown_flavor(tmp_path):
+    result = CliRunner().invoke(cli, ["cache-stats", "--cache-dir", str(tmp_path), "-fv", "yaml"])
+    assert result.exit_code != 0
+    assert "jsonl" in result.output
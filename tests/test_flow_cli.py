@@ -0,0 +1,194 @@
+"""Tests for the ptools.flow CLI commands."""
+from click.testing import CliRunner
+
+from ptools.flow import cli
+
+
+def _invoke(args, stdin):
+    return CliRunner().invoke(cli, args, input=stdin)
+
+
+class TestMap:
+    def test_buffered(self):
+        result = _invoke(["map", "x * 2"], "1\n2\n3\n")
+        assert result.exit_code == 0
+        assert result.output == "2\n4\n6\n"
+
+    def test_stream_plain(self):
+        result = _invoke(["map", "--stream", "x * 2"], "1\n2\n3\n")
+        assert result.exit_code == 0
+        assert result.output == "2\n4\n6\n"
+
+    def test_stream_jsonl(self):
+        result = _invoke(["map", "--stream", "-fv", "jsonl", "{'v': x}"], "1\n2\n")
+        assert result.output == '{"v": 1}\n{"v": 2}\n'
+
+    def test_stream_python(self):
+        result = _invoke(["map", "--stream", "-fv", "python", "str(x)"], "1\n")
+        assert result.output == "'1'\n"
+
+
+class TestFilter:
+    def test_stream(self):
+        result = _invoke(["filter", "--stream", "x > 1"], "1\n2\n3\n")
+        assert result.output == "2\n3\n"
+
+
+class TestUnique:
+    def test_stream(self):
+        result = _invoke(["unique", "--stream", "x % 2"], "1\n3\n2\n4\n")
+        assert result.output == "1\n2\n"
+
+
+class TestForeach:
+    def test_skips_empty_results(self):
+        result = _invoke(["foreach", "x if x > 1 else None"], "1\n2\n")
+        assert result.output == "2\n"
+
+
+class TestParallelOptions:
+    def test_map_jobs(self):
+        stdin = "".join(f"{i}\n" for i in range(20))
+        result = _invoke(["map", "--jobs", "2", "--chunk-size", "3", "x + 1"], stdin)
+        assert result.output == "".join(f"{i + 1}\n" for i in range(20))
+
+    def test_filter_jobs(self):
+        result = _invoke(["filter", "-j", "2", "x % 2"], "1\n2\n3\n")
+        assert result.output == "1\n3\n"
+
+
+class TestReduce:
+    def test_folds_accumulator(self):
+        result = _invoke(["reduce", "-a", "0", "acc + x"], "1\n2\n3\n")
+        assert result.output == "6\n"
+
+    def test_vectorized(self):
+        result = _invoke(["reduce", "--vectorize", "-a", "0", "acc + x * 2"], "1\n2\n3\n")
+        assert result.output == "12\n"
+
+
+class TestVectorizeOption:
+    def test_map(self):
+        result = _invoke(["map", "--vectorize", "x / 2"], "1\n2\n")
+        assert result.output == "0.5\n1.0\n"
+
+    def test_filter(self):
+        result = _invoke(["filter", "--vectorize", "x > 1"], "1\n2\n3\n")
+        assert result.output == "2\n3\n"
+
+
+class TestGroup:
+    def test_in_memory(self):
+        result = _invoke(["group", "x % 2"], "1\n2\n3\n")
+        assert result.exit_code == 0
+        assert result.output == "1: [1, 3]\n0: [2]\n"
+
+    def test_max_memory_matches_in_memory(self):
+        stdin = "".join(f"{i}\n" for i in range(500))
+        expected = _invoke(["group", "x % 13"], stdin).output
+        assert _invoke(["group", "--max-memory", "1KB", "x % 13"], stdin).output == expected
+
+    def test_max_memory_json_is_one_object(self):
+        stdin = "".join(f"{i}\n" for i in range(500))
+        expected = _invoke(["group", "-fv", "json", "x % 13"], stdin).output
+        assert _invoke(["group", "-fv", "json", "--max-memory", "1KB", "x % 13"], stdin).output == expected
+
+    def test_bad_max_memory(self):
+        result = _invoke(["group", "--max-memory", "lots", "x"], "1\n")
+        assert result.exit_code != 0
+
+
+class TestUniqueBudgets:
+    def test_max_memory_matches_in_memory(self):
+        stdin = "".join(f"{i * 31 % 97}\n" for i in range(500))
+        expected = _invoke(["unique", "x"], stdin).output
+        assert _invoke(["unique", "--max-memory", "1KB", "x"], stdin).output == expected
+
+    def test_max_memory_json_is_one_list(self):
+        stdin = "".join(f"{i * 31 % 97}\n" for i in range(500))
+        expected = _invoke(["unique", "-fv", "json", "x"], stdin).output
+        assert _invoke(["unique", "-fv", "json", "--max-memory", "1KB", "x"], stdin).output == expected
+
+    def test_max_memory_python_is_one_list(self):
+        stdin = "".join(f"{i * 31 % 97}\n" for i in range(500))
+        expected = _invoke(["unique", "-fv", "python", "x"], stdin).output
+        assert _invoke(["unique", "-fv", "python", "--max-memory", "1KB", "x"], stdin).output == expected
+
+    def test_approximate(self):
+        result = _invoke(["unique", "--approximate", "x"], "1\n2\n1\n3\n")
+        assert result.output == "1\n2\n3\n"
+
+
+class TestWindow:
+    def test_count_windows(self):
+        result = _invoke(["window", "x", "-n", "2", "-a", "sum"], "1\n2\n3\n")
+        assert result.exit_code == 0
+        assert result.output == "{'start': 0, 'end': 2, 'sum': 3}\n{'start': 2, 'end': 3, 'sum': 3}\n"
+
+    def test_time_windows(self):
+        stdin = "".join(f"{t}\n" for t in [0, 30, 70, 130])
+        result = _invoke(["window", "1", "--time", "x", "-n", "1m", "-a", "count", "-fv", "jsonl"], stdin)
+        assert result.output == (
+            '{"start": 0.0, "end": 60.0, "count": 2}\n'
+            '{"start": 60.0, "end": 120.0, "count": 1}\n'
+            '{"start": 120.0, "end": 180.0, "count": 1}\n'
+        )
+
+    def test_bad_size(self):
+        result = _invoke(["window", "x", "-n", "5m"], "1\n")
+        assert result.exit_code != 0
+        assert "--size" in result.output
+
+
+class TestAgg:
+    def test_whole_stream(self):
+        result = _invoke(["agg", "x", "-a", "count", "-a", "mean"], "1\n2\n3\n")
+        assert result.output == "{'count': 3, 'mean': 2.0}\n"
+
+    def test_every(self):
+        result = _invoke(["agg", "x", "-a", "sum", "--every", "2"], "1\n2\n3\n4\n")
+        assert result.output == "{'sum': 3}\n{'sum': 10}\n"
+
+
+class TestInputFlavor:
+    def test_json_lines(self):
+        stdin = '{"user": "ada", "n": 1}\n{"user": "bob", "n": 2}\n'
+        result = _invoke(["foreach", "--input-flavor", "json", "obj.user if k == 'n' else None"], stdin)
+        assert result.output == "ada\nbob\n"
+
+    def test_python_like_is_default(self):
+        result = _invoke(["map", "--help"], "")
+        assert "python-like" in result.output
+
+    def test_multiline_reduce(self):
+        result = _invoke(["reduce", "-m", "-ifv", "json", "-a", "0", "acc + x"], "[1,\n2,\n3]\n")
+        assert result.output == "6\n"
+
+
+class TestPipe:
+    def test_matches_chained_commands(self):
+        stdin = "".join(f"{i}\n" for i in range(-3, 10))
+        chained = _invoke(["filter", "x > 0"], stdin).output
+        chained = _invoke(["map", "x * 2"], chained).output
+        chained = _invoke(["group", "x % 3"], chained).output
+        result = _invoke(["pipe", "filter", "x > 0", "::", "map", "x * 2", "::", "group", "x % 3"], stdin)
+        assert result.exit_code == 0
+        assert result.output == chained
+
+    def test_reduce_accumulator_option(self):
+        result = _invoke(["pipe", "map", "x * 2", "::", "reduce", "-a", "0", "acc + x"], "1\n2\n3\n")
+        assert result.output == "12\n"
+
+    def test_stream_jsonl(self):
+        result = _invoke(["pipe", "--stream", "-fv", "jsonl", "map", "[x, -x]"], "1\n2\n")
+        assert result.output == "[1, -1]\n[2, -2]\n"
+
+    def test_debug_counters(self):
+        result = _invoke(["pipe", "--debug", "filter", "x > 1", "::", "map", "x"], "1\n2\n3\n")
+        assert "Stage 1: filter" in result.output
+        assert "Stage 2: map" in result.output
+
+    def test_unknown_stage(self):
+        result = _invoke(["pipe", "sort", "x"], "1\n")
+        assert result.exit_code == 2
+        assert "unknown stage" in result.output
@@ -0,0 +1,93 @@
+"""CLI tests for ptools fs walkdir / findfiles."""
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from ptools.fs import cli
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel in ["src/a/f.py", "src/a/g.log", "node_modules/x/i.js", "build/out.o", "README.md", "keep.log"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (tmp_path / ".gitignore").write_text("build/\n*.log\n!keep.log\n")
+    return tmp_path
+
+
+def _names(args, root):
+    result = CliRunner().invoke(cli, [*args, "--path", str(root), "--flavor", "json"])
+    assert result.exit_code == 0, result.output
+    return sorted(entry["path"][len(str(root)) + 1:] for entry in json.loads(result.output))
+
+
+class TestWalkdirFilters:
+    def test_exclude_prunes_directories(self, tree):
+        names = _names(["walkdir", "--exclude", "node_modules"], tree)
+        assert not any(name.startswith("node_modules") for name in names)
+        assert "src/a/f.py" in names
+
+    def test_gitignore(self, tree):
+        names = _names(["walkdir", "--gitignore"], tree)
+        assert "build" not in names and "src/a/g.log" not in names
+        assert "keep.log" in names
+
+    def test_include(self, tree):
+        assert _names(["findfiles", "--include", "*.py", "--include", "*.md"], tree) == ["README.md", "src/a/f.py"]
+
+    def test_invalid_regex(self, tree):
+        result = CliRunner().invoke(cli, ["findfiles", "[", "-g", "--path", str(tree)])
+        assert result.exit_code == 2
+        assert "invalid regex" in result.output
+
+
+class TestWorkers:
+    @pytest.mark.parametrize("command", ["walkdir", "findfiles"])
+    def test_output_matches_serial(self, tree, command):
+        def run(workers):
+            result = CliRunner().invoke(cli, [command, "--path", str(tree), "--flavor", "json", "--workers", workers])
+            assert result.exit_code == 0, result.output
+            return json.loads(result.output)
+        assert run("4") == run("1")
+
+    def test_tree(self, tree, isolated_home):
+        def run(workers):
+            result = CliRunner().invoke(cli, ["tree", str(tree), "name", "--workers", workers])
+            assert result.exit_code == 0, result.output
+            return result.output
+        serial = run("1")
+        assert "f.py" in serial
+        assert run("4") == serial
+
+
+class TestStreamingAndLimits:
+    def _invoke(self, tree, *args):
+        result = CliRunner().invoke(cli, [*args, "--path", str(tree)])
+        assert result.exit_code == 0, result.output
+        return result.output
+
+    def test_stream_writes_one_entry_per_line(self, tree):
+        lines = self._invoke(tree, "walkdir", "--stream", "--flavor", "jsonl").splitlines()
+        batch = json.loads(self._invoke(tree, "walkdir", "--flavor", "json"))
+        assert [json.loads(line) for line in lines] == batch
+
+    @pytest.mark.parametrize("workers", ["1", "4"])
+    def test_limit(self, tree, workers):
+        full = json.loads(self._invoke(tree, "findfiles", "--flavor", "json"))
+        limited = json.loads(self._invoke(tree, "findfiles", "--limit", "2", "--flavor", "json", "-w", workers))
+        assert limited == full[:2]
+
+    def test_first(self, tree):
+        entries = json.loads(self._invoke(tree, "findfiles", "f.py", "--first", "--flavor", "json"))
+        assert [entry["name"] for entry in entries] == ["f.py"]
+
+    def test_first_stops_walk(self, tree, monkeypatch):
+        import os
+
+        scanned = []
+        real = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda path: scanned.append(path) or real(path))
+        self._invoke(tree, "walkdir", "--first", "--stream")
+        assert len(scanned) <= 2
@@ -0,0 +1,43 @@
+"""Tests for ptools.utils.bloom."""
+import pytest
+
+from ptools.utils.bloom import BloomFilter, ScalableBloomFilter
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(i)
+        assert all(i in bloom for i in range(1000))
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"item-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives / 10000 < 0.03
+
+    def test_equal_objects_collide(self):
+        bloom = BloomFilter(capacity=10)
+        bloom.add(1)
+        assert 1.0 in bloom
+
+    @pytest.mark.parametrize("capacity,error_rate", [(0, 0.1), (10, 0), (10, 1)])
+    def test_rejects_bad_parameters(self, capacity, error_rate):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, error_rate)
+
+
+class TestScalableBloomFilter:
+    def test_add_reports_new_items(self):
+        bloom = ScalableBloomFilter(initial_capacity=16)
+        assert bloom.add("a") is True
+        assert bloom.add("a") is False
+
+    def test_grows_past_initial_capacity(self):
+        bloom = ScalableBloomFilter(initial_capacity=256, error_rate=0.01)
+        added = sum(bloom.add(i) for i in range(5000))
+        assert len(bloom.stages) > 1
+        assert added > 5000 * 0.98
+        assert all(i in bloom for i in range(1000))
@@ -1,8 +1,15 @@
 """Tests for ptools.utils.cache.disk_cache."""
-import json
+import asyncio
+import sqlite3
+import threading
 import time
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
 
-from ptools.utils.cache import disk_cache
+import pytest
+
+from ptools.utils.cache import CacheStore, CacheVersionError, Serializer, UncacheableCall, disk_cache, structural_key
 
 
 def test_caches_identical_calls(tmp_path):
@@ -55,14 +62,63 @@ def test_flush_writes_disk(tmp_path):
     fn("alpha")
     fn.flush()  # type: ignore[attr-defined]
 
-    cache_file = tmp_path / "fn.json"
+    cache_file = tmp_path / "fn.sqlite3"
     assert cache_file.exists()
-    data = json.loads(cache_file.read_text())
-    assert len(data) == 1
-    # One entry with "r" (result) and "t" (timestamp) shorts.
-    entry = next(iter(data.values()))
-    assert entry["r"] == {"value": "alpha"}
-    assert isinstance(entry["t"], (int, float))
+    with sqlite3.connect(cache_file) as db:
+        rows = db.execute("SELECT t, r FROM entries").fetchall()
+    assert len(rows) == 1
+    # One row with "r" (result) and "t" (timestamp) columns.
+    timestamp, result = rows[0]
+    assert Serializer.loads(result) == {"value": "alpha"}
+    assert isinstance(timestamp, float)
+
+
+def test_flush_writes_only_new_entries(tmp_path):
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def fn(x):
+        return x
+
+    fn(1)
+    fn.flush()  # type: ignore[attr-defined]
+    fn(1)
+    fn(2)
+    assert len(fn.store._pending) == 1  # type: ignore[attr-defined]
+    fn.flush()  # type: ignore[attr-defined]
+    assert len(fn.store) == 2  # type: ignore[attr-defined]
+
+
+def test_flushes_on_its_own_when_many_writes_pend(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheStore, "FLUSH_EVERY", 10)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def fn(x):
+        return x
+
+    for i in range(25):
+        fn(i)
+    assert len(fn.store._pending) == 5  # type: ignore[attr-defined]
+    assert fn(3) == 3
+
+
+def test_flush_drops_expired_and_unserializable(tmp_path):
+    store = CacheStore(tmp_path / "store.sqlite3")
+    store.put("old", time.time() - 100, 1)
+    store.put("obj", time.time(), lambda: None)
+    store.put("new", time.time(), [1, 2])
+    store.flush(max_age=50)
+    reopened = CacheStore(store.path)
+    assert reopened.get("old") is None
+    assert reopened.get("obj") is None
+    assert reopened.get("new")[1] == [1, 2]
+
+
+def test_unused_cache_creates_no_file(tmp_path):
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def fn(x):
+        return x
+
+    fn.flush()  # type: ignore[attr-defined]
+    assert not (tmp_path / "fn.sqlite3").exists()
 
 
 def test_cache_persists_across_decorations(tmp_path):
@@ -84,3 +140,408 @@ def test_cache_persists_across_decorations(tmp_path):
 
     assert fn(5) == 50
     assert call_count[0] == 0
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path):
+    store = CacheStore(tmp_path / "store.sqlite3", max_entries=2)
+    for key in "ab":
+        store.put(key, time.time(), key)
+        store.flush()
+    store.get("a")
+    store.put("c", time.time(), "c")
+    store.flush()
+    reopened = CacheStore(store.path)
+    assert [key for key in "abc" if reopened.get(key)] == ["a", "c"]
+    assert reopened.stats()["evictions"] == 1
+
+
+def test_lfu_keeps_frequently_hit_entries(tmp_path):
+    store = CacheStore(tmp_path / "store.sqlite3", max_entries=2, eviction="lfu")
+    store.put("hot", time.time(), 1)
+    store.put("cold", time.time(), 2)
+    store.flush()
+    for _ in range(3):
+        store.get("hot")
+    store.put("new", time.time(), 3)
+    store.flush()
+    reopened = CacheStore(store.path)
+    assert reopened.get("hot") and reopened.get("new") and reopened.get("cold") is None
+
+
+def test_max_bytes(tmp_path):
+    store = CacheStore(tmp_path / "store.sqlite3", max_bytes=250, serializer="json")
+    for i in range(10):
+        store.put(f"k{i}", time.time(), "x" * 48)
+        store.flush()
+    stats = store.stats()
+    assert stats["bytes"] <= 250 and stats["entries"] == 4
+
+
+def test_memory_tier_serves_repeated_hits(tmp_path):
+    store = CacheStore(tmp_path / "store.sqlite3")
+    store.put("k", time.time(), [1])
+    store.close()
+    reopened = CacheStore(store.path)
+    reopened.get("k")
+    reopened._db.value.execute("DELETE FROM entries")
+    assert reopened.get("k")[1] == [1]
+
+
+def test_counters_persist(tmp_path):
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def fn(x):
+        return x
+
+    fn(1)
+    fn(1)
+    fn(2)
+    fn.flush()  # type: ignore[attr-defined]
+    stats = CacheStore(tmp_path / "fn.sqlite3").stats()
+    assert stats == {"entries": 2, "bytes": stats["bytes"], "hits": 1, "misses": 2, "stale": 0, "evictions": 0}
+
+
+def test_read_only_store(tmp_path):
+    store = CacheStore(tmp_path / "c.sqlite3")
+    store.put("k", time.time(), 1)
+    store.close()
+
+    reader = CacheStore(tmp_path / "c.sqlite3", read_only=True)
+    assert reader.get("k")[1] == 1
+    assert reader.stats()["entries"] == 1
+    reader.close()
+    with pytest.raises(sqlite3.OperationalError):
+        CacheStore(tmp_path / "missing.sqlite3", read_only=True).stats()
+    assert not (tmp_path / "missing.sqlite3").exists()
+
+
+def test_read_only_store_reports_other_schema(tmp_path):
+    with sqlite3.connect(tmp_path / "c.sqlite3") as db:
+        db.execute("PRAGMA user_version = 1")
+    with pytest.raises(CacheVersionError) as info:
+        CacheStore(tmp_path / "c.sqlite3", read_only=True).stats()
+    assert (info.value.version, info.value.expected) == (1, CacheStore.SCHEMA_VERSION)
+
+
+def _fill_from_process(cache_dir, worker):
+    CacheStore.FLUSH_EVERY = 7
+
+    @disk_cache(cache_dir=cache_dir, max_cache_age=3600)
+    def shared(x):
+        return x
+
+    for i in range(100):
+        shared((worker, i))
+    shared(("common",))
+    shared.flush()  # type: ignore[attr-defined]
+
+
+def test_parallel_processes_merge_entries(tmp_path):
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_fill_from_process, args=(tmp_path, w)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    stats = CacheStore(tmp_path / "shared.sqlite3").stats()
+    assert stats["entries"] == 401
+    assert stats["hits"] + stats["misses"] == 404
+
+
+def test_threads_share_a_store(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(CacheStore, "FLUSH_EVERY", 5)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600, memory_entries=8)
+    def fn(x):
+        return x
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(fn, [i % 50 for i in range(2000)]))
+    assert results == [i % 50 for i in range(2000)]
+    fn.flush()  # type: ignore[attr-defined]
+    stats = fn.store.stats()  # type: ignore[attr-defined]
+    assert stats["entries"] == 50
+    assert stats["hits"] + stats["misses"] == 2000
+
+
+def test_failed_flush_keeps_changes_pending(tmp_path, monkeypatch):
+    store = CacheStore(tmp_path / "store.sqlite3")
+    store.put("k", time.time(), 1)
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_write", locked)
+    try:
+        store.flush()
+    except sqlite3.OperationalError:
+        pass
+    monkeypatch.undo()
+    store.flush()
+    assert CacheStore(store.path).get("k")[1] == 1
+
+
+@dataclass(frozen=True)
+class _Point:
+    x: int
+    y: int
+
+
+class _Color(Enum):
+    RED = 1
+
+
+def test_structural_key_distinguishes_and_matches():
+    key = lambda *args, **kwargs: structural_key(args, kwargs)  # noqa: E731
+    assert key(1, b=2) == key(1, b=2)
+    assert key(1) != key("1") != key(1.0)
+    assert key(True) != key(1)
+    assert key([1]) != key((1,))
+    assert key({"a": 1, "b": 2}) == key({"b": 2, "a": 1})
+    assert key({1, 2, 3}) == key({3, 2, 1})
+    assert key(b=1, c=2) == key(c=2, b=1)
+    assert len(key(1)) == 32 and len(structural_key((1,), {}, hex_length=9)) == 9
+
+
+def test_structural_key_supports_non_json_arguments():
+    key = lambda *args: structural_key(args, {})  # noqa: E731
+    assert key(Path("/a")) == key(Path("/a")) != key("/a")
+    assert key(_Point(1, 2)) == key(_Point(1, 2)) != key(_Point(2, 1))
+    assert key(_Color.RED) != key(1)
+    assert key((Path("/a"), {_Point(1, 2)})) == key((Path("/a"), {_Point(1, 2)}))
+
+
+def test_non_json_arguments_and_results_are_cached(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def stat_like(path, point):
+        calls.append(path)
+        return (path, point, {1, 2})
+
+    first = stat_like(Path("/x"), _Point(1, 2))
+    stat_like.flush()  # type: ignore[attr-defined]
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def stat_like(path, point):  # noqa: F811 - fresh decoration reads the disk
+        calls.append(path)
+
+    assert stat_like(Path("/x"), _Point(1, 2)) == first == (Path("/x"), _Point(1, 2), {1, 2})
+    assert calls == [Path("/x")]
+
+
+def test_unpicklable_arguments_run_uncached(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def locked(lock, x):
+        calls.append(x)
+        return x
+
+    lock = threading.Lock()
+    with pytest.raises(UncacheableCall):
+        structural_key((lock,), {})
+    assert locked(lock, 1) == 1
+    assert locked(lock, 1) == 1
+    assert calls == [1, 1]
+    assert len(locked.store) == 0  # type: ignore[attr-defined]
+
+
+def test_corrupt_cache_file_runs_uncached(tmp_path):
+    calls = []
+    (tmp_path / "square.sqlite3").write_bytes(b"not a database" * 100)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3, 3]
+    square.flush()  # type: ignore[attr-defined]
+
+
+def test_corrupt_cache_file_runs_async_uncached(tmp_path):
+    (tmp_path / "fetch.sqlite3").write_bytes(b"\xff" * 4096)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    async def fetch(x):
+        return {"x": x}
+
+    assert asyncio.run(fetch(1)) == {"x": 1}
+
+
+def test_custom_key_fn_and_json_payloads(tmp_path):
+    @disk_cache(cache_dir=tmp_path, key_fn=lambda args, kwargs: str(args[0] % 2), serializer="json")
+    def parity(x):
+        return [x]
+
+    assert parity(1) == [1]
+    assert parity(3) == [1]
+    parity.flush()  # type: ignore[attr-defined]
+    with sqlite3.connect(tmp_path / "parity.sqlite3") as db:
+        assert db.execute("SELECT key, r FROM entries").fetchall() == [("1", b"j[1]")]
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_stale_while_revalidate_serves_stale_then_refreshes(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=0.5, stale_while_revalidate=60)
+    def version(x):
+        calls.append(x)
+        return len(calls)
+
+    assert version(1) == 1
+    time.sleep(0.6)
+    assert version(1) == 1  # stale, returned at once
+    key = structural_key((1,), {})
+    assert _wait_for(lambda: version.store.get(key)[1] == 2)  # type: ignore[attr-defined]
+    assert version(1) == 2
+    assert calls == [1, 1]
+    assert version.store.stats()["stale"] == 1  # type: ignore[attr-defined]
+
+
+def test_stale_beyond_window_is_a_miss(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=0.02, stale_while_revalidate=0.03)
+    def version(x):
+        calls.append(x)
+        return len(calls)
+
+    version(1)
+    time.sleep(0.1)
+    assert version(1) == 2
+    assert calls == [1, 1]
+
+
+def test_concurrent_misses_call_once(tmp_path):
+    calls = []
+    start = threading.Barrier(8)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(slow(21))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [42] * 8
+    assert calls == [21]
+
+
+def test_stale_hits_start_one_refresh(tmp_path):
+    calls = []
+    release = threading.Event()
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=0.2, stale_while_revalidate=60)
+    def version(x):
+        calls.append(x)
+        if len(calls) > 1:
+            release.wait(5)
+        return len(calls)
+
+    version(1)
+    time.sleep(0.3)
+    threads = [threading.Thread(target=version, args=(1,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _wait_for(lambda: len(calls) == 2)
+    time.sleep(0.05)
+    release.set()
+    assert calls == [1, 1]
+
+
+def test_concurrent_failure_reaches_every_caller_and_is_not_cached(tmp_path):
+    calls = []
+    start = threading.Barrier(4)
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    def broken(x):
+        calls.append(x)
+        time.sleep(0.2)
+        raise ValueError(x)
+
+    errors = []
+
+    def worker():
+        start.wait()
+        try:
+            broken(1)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 4 and calls == [1]
+    with pytest.raises(ValueError):
+        broken(1)
+    assert calls == [1, 1]
+
+
+def test_async_function(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=3600)
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return {"x": x}
+
+    async def main():
+        first = await asyncio.gather(*(fetch(1) for _ in range(5)))
+        again = await fetch(1)
+        return first, again
+
+    assert asyncio.iscoroutinefunction(fetch)
+    first, again = asyncio.run(main())
+    assert first == [{"x": 1}] * 5 and again == {"x": 1}
+    assert calls == [1]
+
+
+def test_async_stale_while_revalidate(tmp_path):
+    calls = []
+
+    @disk_cache(cache_dir=tmp_path, max_cache_age=0.5, stale_while_revalidate=60)
+    async def version(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        assert await version(1) == 1
+        await asyncio.sleep(0.6)
+        assert await asyncio.gather(version(1), version(1)) == [1, 1]
+        await asyncio.sleep(0.05)
+        return await version(1)
+
+    assert asyncio.run(main()) == 2
+    assert calls == [1, 1]
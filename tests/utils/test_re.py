@@ -25,3 +25,13 @@ def test_regex_no_match_does_not_raise():
     match = make_matcher(query=r"\d+", regex=True)
     assert match("abc") is False
     assert match("abc123") is True
+
+
+def test_regex_compiled_once(monkeypatch):
+    import re
+    calls = []
+    real_compile = re.compile
+    monkeypatch.setattr(re, "compile", lambda *a, **k: calls.append(a) or real_compile(*a, **k))
+    match = make_matcher(query=r"\d", regex=True)
+    assert [match(s) for s in ["a1", "b", "c2"]] == [True, False, True]
+    assert len(calls) == 1
@@ -25,3 +25,25 @@ def test_from_humanized_size(text, expected):
 def test_from_humanized_size_invalid(bad):
     with pytest.raises(ValueError):
         FromHumanized.from_humanized_size(bad)
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("30", 30.0),
+        ("30s", 30.0),
+        ("250ms", 0.25),
+        ("5m", 300.0),
+        ("1.5h", 5400.0),
+        (" 2 d ", 172800.0),
+        ("1w", 604800.0),
+    ],
+)
+def test_from_humanized_duration(text, expected):
+    assert FromHumanized.from_humanized_duration(text) == expected
+
+
+@pytest.mark.parametrize("bad", ["5y", "xs", "abc", ""])
+def test_from_humanized_duration_invalid(bad):
+    with pytest.raises(ValueError):
+        FromHumanized.from_humanized_duration(bad)